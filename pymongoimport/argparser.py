@@ -7,9 +7,19 @@ from pymongoimport.logger import Logger
 from pymongoimport.version import __VERSION__
 from pymongoimport.linetodictparser import ErrorResponse
 from pymongoimport.doctimestamp import DocTimeStamp
+from pymongoimport.tokenizer import TokenizerType
+from pymongoimport.ingestprofile import IngestProfile
+from pymongoimport.memorybudget import parse_size
 from configargparse import ArgumentParser
 
 
+def split_columns(arg: str):
+    """
+    Turn a comma separated list of column names into a list of names.
+    """
+    return [c.strip() for c in arg.split(",") if c.strip()]
+
+
 def add_standard_args(parser):
     """
     Construct parser for pymongoimport return it as a list suitable for passing to the parents
@@ -22,21 +32,58 @@ def add_standard_args(parser):
     parser.add_argument('--host', default="mongodb://localhost:27017/test",
                         help='mongodb URI. [default: %(default)s]')
     parser.add_argument('--locator', default=False, action="store_true",
-                        help="add a locator field consisting of filename and \
-                        input record line to each doc [default: %(default)s]")
+                        help="add a locator field holding the input line number of each doc [default: %(default)s]")
     parser.add_argument('--batchsize', type=int, default=1000,
                         help='set mongodb batch size for bulk inserts [default: %(default)s]')
     parser.add_argument('--restart', default=False, action="store_true",
                         help="use record count insert to restart at last write also enable restart logfile [default: %(default)s]")
     parser.add_argument('--drop', default=False, action="store_true",
                         help="drop collection before loading [default: %(default)s]")
+    parser.add_argument('--deferindexes', default=False, action="store_true",
+                        help="Drop the collection's secondary indexes (except unique ones) before loading the "
+                             "first file and rebuild them after the last [default: %(default)s]")
+    parser.add_argument('--shardrouting', default=False, action="store_true",
+                        help="Split each batch into an insert per shard using the chunk ranges of a sharded "
+                             "collection [default: %(default)s]")
+    parser.add_argument('--presplit', default=0, type=int, metavar="CHUNKS",
+                        help="With --shardrouting split an empty collection into CHUNKS chunks at shard key "
+                             "values sampled from the first file and spread them across the shards "
+                             "[default: %(default)s]")
     #parser.add_argument('--ordered', default=False, action="store_true", help="forced ordered inserts")
     parser.add_argument("--fieldfile", default=None, type=str, help="Field and type mappings")
     parser.add_argument("--delimiter", default=",", type=str,
                         help="The delimiter string used to split fields [default: %(default)s]")
-    parser.add_argument("filenames", nargs="*", help='list of files')
+    parser.add_argument("--tokenizer", type=TokenizerType, default=TokenizerType.AUTO, choices=list(TokenizerType),
+                        help="How to split lines into columns: 'csv' handles quoting, 'split' is much faster "
+                             "but only for files without quotes, 'arrow' uses pyarrow if installed, "
+                             "'auto' picks 'split' or 'csv' from a sample of the file [default: %(default)s]")
+    parser.add_argument("--sheets", default=None, type=split_columns,
+                        help="Comma separated list of the sheets to import from Excel files [default: all sheets]")
+    parser.add_argument("--headerrow", default=None, type=int,
+                        help="Row number of the header in Excel sheets, 0 for no header [default: detect the header]")
+    parser.add_argument("filenames", nargs="*", help='list of files, directories or glob patterns')
     parser.add_argument("--filelist", default=None, help="Read files from an input file one per line")
+    parser.add_argument("--sortbysize", default=False, action="store_true",
+                        help="Import the largest files first [default: %(default)s]")
+    parser.add_argument("--watch", default=None, metavar="DIR",
+                        help="Keep running and import each file written to DIR [default: %(default)s]")
+    parser.add_argument("--pollinterval", default=1.0, type=float,
+                        help="Seconds between checks of the --watch directory or the end of a --follow file "
+                             "[default: %(default)s]")
+    parser.add_argument("--follow", default=False, action="store_true",
+                        help="Keep importing lines as they are appended to a CSV file, like tail -f [default: %(default)s]")
+    parser.add_argument("--flushinterval", default=1.0, type=float,
+                        help="With --follow insert a part filled batch once it is this many seconds old "
+                             "[default: %(default)s]")
+    parser.add_argument("--donedir", default=None, metavar="DIR",
+                        help="Move each file into DIR once it has been imported [default: %(default)s]")
+    parser.add_argument("--faileddir", default=None, metavar="DIR",
+                        help="With --watch move each file that fails to import into DIR [default: %(default)s]")
+    parser.add_argument("--skipimported", default=False, action="store_true",
+                        help="Skip files the audit collection records as already imported [default: %(default)s]")
     parser.add_argument('--addfilename', default=False, action="store_true", help="Add file name field to every entry")
+    parser.add_argument('--addbatchid', default=False, action="store_true",
+                        help="Add the --audit batch ID to every entry [default: %(default)s]")
     parser.add_argument('--addtimestamp', default=DocTimeStamp.NO_TIMESTAMP, type=DocTimeStamp, choices=list(DocTimeStamp),
                         help="Add a timestamp to each doc, either generate per doc('doc'), or per batch {'batch') [default: %(default)s]")
     parser.add_argument('--hasheader', default=False, action="store_true",
@@ -45,6 +92,13 @@ def add_standard_args(parser):
                         help="Generate a fieldfile from the data file, we set has_header to true [default: %(default)s]")
     parser.add_argument('--onerror', type=ErrorResponse,  default=ErrorResponse.Warn, choices=list(ErrorResponse),
                         help="What to do when we hit an error parsing a csv file [default: %(default)s]")
+    parser.add_argument('--rejectfile', default=None, metavar="FILE",
+                        help="Append rows that can't be imported and values that can't be converted to FILE "
+                             "as JSON lines, instead of stopping on rows with the wrong number of columns "
+                             "[default: %(default)s]")
+    parser.add_argument('--rejectcollection', default=None, metavar="COLLECTION",
+                        help="As --rejectfile but write the rejects to COLLECTION in --database "
+                             "[default: %(default)s]")
     parser.add_argument('--logname', default=Logger.LOGGER_NAME,
                         help="Logfile to write output to [default: %(default)s]")
     parser.add_argument('--loglevel', default="INFO", choices=["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"],
@@ -57,12 +111,28 @@ def add_standard_args(parser):
                         help="Turn on journaling [default: %(default)s]")
     parser.add_argument('--fsync', default=False, action="store_true",
                         help="Sync all nodes to disk [default: %(default)s]")
+    parser.add_argument('--profile', type=IngestProfile, default=None, choices=list(IngestProfile),
+                        help="Write settings tuned for a kind of load, overrides --writeconcern, --journal, "
+                             "--fsync and --batchsize: bulk is fastest, durable is majority acknowledged and "
+                             "journaled [default: %(default)s]")
+    parser.add_argument('--maxmemory', default=0, type=parse_size, metavar="SIZE",
+                        help="Keep the RSS of each import process under SIZE bytes (K, M and G suffixes "
+                             "are allowed) by waiting for inserts to complete rather than reading ahead. "
+                             "0 for no limit [default: %(default)s]")
     parser.add_argument('--audit', action="store_true", default=False, help="Capture audit records for an upload")
     parser.add_argument('--info', default="", help="Info string to be added to audit record")
     # parser.add_argument('--tag', default=False, action="store_true", help="Tag each record with filename:<record number>")
 
     parser.add_argument("--fieldinfo", default=None, type=str,
                         help="Report field info from a named field file e.g. --fieldinfo <filename>.tff")
+    parser.add_argument("--include", default=None, type=split_columns,
+                        help="Comma separated list of the only columns to import, all other columns "
+                             "are dropped before type conversion [default: all columns]")
+    parser.add_argument("--exclude", default=None, type=split_columns,
+                        help="Comma separated list of columns to drop before type conversion")
+    parser.add_argument("--where", default=None, type=str,
+                        help="Only import rows matching this expression e.g. \"Price > 1000 and raw_Date[:4] == '2018'\". "
+                             "Rows are tested before conversion so rejected rows cost little [default: all rows]")
     parser.add_argument("--limit", default=0, type=int,
                         help="Limit the number of records we read in (0 means read all records) [default: %(default)s]")
     #
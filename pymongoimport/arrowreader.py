@@ -0,0 +1,245 @@
+"""
+=====================================
+ArrowReader
+=====================================
+
+Read Parquet and Arrow IPC (Feather v2) files a record batch at a time. This
+is the columnar counterpart of `FileReader`: it provides the same `name`,
+`header_line` and `readline()` interface so it can be driven by `FileWriter`
+and `LineToDictParser`.
+
+Values are handed to the parser as native Python objects (ints, floats,
+datetimes) rather than strings. Arrow types are mapped onto `Converter`
+types when a field file is generated from the file schema (see
+`generate_field_file`) and the converters pass already typed values
+straight through, so there is no string round trip. Nested (list, struct,
+map) and binary columns get the `any` type and their values reach the doc
+unchanged as lists, dicts and bytes (a map as a list of (key, value) pairs).
+
+Only the columns the parser actually needs are read from the file. Columns
+in the field file that are not read are supplied as `None`.
+
+Work can be split across processes by row group (Parquet) or record batch
+(Arrow IPC) using `row_groups` and `partition`. `first_row_number` gives
+the row number of the first row of a part so errors are reported at the
+same row as when the whole file is read by one process.
+
+Requires `pyarrow`.
+"""
+import itertools
+import os
+from typing import Dict, Iterator, List
+
+from pymongoimport.fieldfile import FieldFile
+
+
+class ArrowReaderException(Exception):
+    pass
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+    except ImportError:
+        raise ArrowReaderException("Reading Parquet and Arrow files requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+class ArrowReader(object):
+
+    PARQUET_EXTENSIONS = [".parquet", ".pq"]
+    IPC_EXTENSIONS = [".arrow", ".feather", ".ipc"]
+    BATCH_SIZE = 64 * 1024
+
+    def __init__(self,
+                 name: str,
+                 fields: List[str] = None,
+                 columns: List[str] = None,
+                 row_groups: List[int] = None,
+                 limit: int = 0,
+                 batch_size: int = BATCH_SIZE,
+                 first_line_number: int = 1):
+        """
+        :param name: a .parquet or .arrow/.feather file
+        :param fields: the column order rows are returned in (default: schema order)
+        :param columns: the columns to actually read (default: all of fields)
+        :param row_groups: the row groups (record batches for IPC files) to read (default: all)
+        :param limit: Only read up to limit rows (0 for all rows)
+        :param batch_size: the rows converted to Python values at a time (Parquet only,
+               the record batches of an IPC file are as written)
+        :param first_line_number: the row number of the first row of row_groups
+        """
+        self._pa = import_pyarrow()
+        self._batch_size = batch_size
+        self._name = name
+        self._limit = limit
+        self._row_groups = row_groups
+        self._first_line_number = first_line_number
+
+        if ArrowReader.is_parquet_file(name):
+            self._parquet = self._pa.parquet.ParquetFile(name)
+            self._schema = self._parquet.schema_arrow
+        else:
+            self._parquet = None
+            self._schema = self._open_ipc().schema
+
+        if fields is None:
+            fields = self._schema.names
+        self._fields = fields
+
+        if columns is None:
+            columns = fields
+        wanted = set(columns)
+        self._columns = [k for k in fields if k in wanted and k in self._schema.names]
+
+    @staticmethod
+    def is_parquet_file(name: str) -> bool:
+        return os.path.splitext(name)[1].lower() in ArrowReader.PARQUET_EXTENSIONS
+
+    @staticmethod
+    def is_arrow_file(name: str) -> bool:
+        ext = os.path.splitext(name)[1].lower()
+        return ext in ArrowReader.PARQUET_EXTENSIONS or ext in ArrowReader.IPC_EXTENSIONS
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def header_line(self) -> List[str]:
+        return self._fields
+
+    @property
+    def columns(self) -> List[str]:
+        return self._columns
+
+    @property
+    def first_line_number(self) -> int:
+        return self._first_line_number
+
+    def _open_ipc(self):
+        try:
+            return self._pa.ipc.open_file(self._name)
+        except self._pa.ArrowInvalid:
+            return self._pa.ipc.open_stream(self._name)
+
+    def row_group_count(self) -> int:
+        if self._parquet:
+            return self._parquet.num_row_groups
+        reader = self._open_ipc()
+        if hasattr(reader, "num_record_batches"):
+            return reader.num_record_batches
+        return 1  # a stream can't be split
+
+    def partition(self, parts: int) -> List[List[int]]:
+        """
+        Split the row groups into (at most) `parts` contiguous lists of roughly equal length.
+        """
+        count = self.row_group_count()
+        parts = max(1, min(parts, count))
+        size, extra = divmod(count, parts)
+        result = []
+        start = 0
+        for i in range(parts):
+            end = start + size + (1 if i < extra else 0)
+            result.append(list(range(start, end)))
+            start = end
+        return result
+
+    def first_row_number(self, row_groups: List[int]) -> int:
+        """
+        The row number of the first row of a contiguous list of row groups
+        (e.g. from `partition`), counting rows from 1.
+        """
+        first = min(row_groups) if row_groups else 0
+        if self._parquet:
+            metadata = self._parquet.metadata
+            return 1 + sum(metadata.row_group(i).num_rows for i in range(first))
+        reader = self._open_ipc()
+        if not hasattr(reader, "get_batch"):
+            return 1
+        return 1 + sum(reader.get_batch(i).num_rows for i in range(first))
+
+    def field_types(self) -> Dict[str, str]:
+        """
+        Map each column of the file onto a Converter type name.
+        """
+        return {f.name: self.converter_type(f.type) for f in self._schema}
+
+    def converter_type(self, arrow_type) -> str:
+        types = self._pa.types
+        if types.is_boolean(arrow_type):
+            return "bool"
+        elif types.is_integer(arrow_type):
+            return "int"
+        elif types.is_floating(arrow_type) or types.is_decimal(arrow_type):
+            return "float"
+        elif types.is_timestamp(arrow_type) or types.is_date(arrow_type):
+            return "datetime"
+        elif types.is_nested(arrow_type) or types.is_binary(arrow_type) or \
+                types.is_large_binary(arrow_type) or types.is_fixed_size_binary(arrow_type):
+            return "any"
+        else:
+            return "str"
+
+    def _batches(self):
+        if self._parquet:
+            yield from self._parquet.iter_batches(batch_size=self._batch_size,
+                                                  row_groups=self._row_groups,
+                                                  columns=self._columns)
+        else:
+            reader = self._open_ipc()
+            if hasattr(reader, "get_batch"):
+                batches = (reader.get_batch(i) for i in (self._row_groups or range(reader.num_record_batches)))
+            else:
+                batches = reader
+            for batch in batches:
+                yield batch.select(self._columns)
+
+    def _to_python(self, array) -> list:
+        """
+        Convert a column to Python values that BSON can store. Dates become
+        datetimes and decimals become floats.
+        """
+        types = self._pa.types
+        if types.is_date(array.type):
+            array = array.cast(self._pa.timestamp("ms"))
+        elif types.is_decimal(array.type):
+            array = array.cast(self._pa.float64())
+        return array.to_pylist()
+
+    def readline(self, limit: int = 0) -> Iterator[List[object]]:
+        rows = self._rows()
+        if limit > 0:
+            yield from itertools.islice(rows, limit)
+        else:
+            yield from rows
+
+    def _rows(self) -> Iterator[List[object]]:
+        remaining = self._limit
+        for batch in self._batches():
+            if self._limit > 0:
+                if remaining <= 0:
+                    break  # don't read or convert any more batches
+                batch = batch.slice(0, remaining)
+                remaining = remaining - batch.num_rows
+            values = dict(zip(self._columns, (self._to_python(c) for c in batch.columns)))
+            yield from zip(*[values[k] if k in values else itertools.repeat(None, batch.num_rows)
+                             for k in self._fields])
+
+    @staticmethod
+    def generate_field_file(name: str, ff_filename: str = None) -> FieldFile:
+        """
+        Write a field file from the schema of a Parquet or Arrow file.
+        """
+        if ff_filename is None:
+            ff_filename = FieldFile.make_default_tff_name(name)
+
+        toml_dict = {}
+        for key, t in ArrowReader(name).field_types().items():
+            toml_dict[key] = {"type": t, "name": key.replace('$', '_').replace('.', '_')}
+
+        FieldFile.write_field_file(ff_filename, toml_dict)
+        return FieldFile(ff_filename)
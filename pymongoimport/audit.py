@@ -102,6 +102,35 @@ class Audit(object):
         self.add_batch_info(batchID, "command", {"name": cmd_name,
                                                  "args": args})
 
+    def add_imported_file(self, batchID, key, namespace):
+        """
+        Record that every unit of a local file has been imported into
+        `namespace` ("database.collection").
+
+        :param key: the `file_key` (absolute path, size, modification time)
+               of the file, taken before it was imported
+        """
+        path, size, mtime = key
+        self.add_batch_info(batchID, "imported", {"path": path,
+                                                  "size": size,
+                                                  "mtime": mtime,
+                                                  "namespace": namespace})
+
+    def imported_files(self, namespace=None):
+        """
+        The (absolute path, size, modification time) of every local file
+        recorded by `add_imported_file` as completely imported, into
+        `namespace` if it is given. This is the manifest used to skip files
+        that have already been loaded.
+        """
+        query = {"imported.path": {"$exists": 1}}
+        if namespace:
+            query["imported.namespace"] = namespace
+        cursor = self._auditCollection.find(query, {"_id": 0, "imported": 1})
+        return {(d["imported"]["path"],
+                 d["imported"]["size"],
+                 d["imported"]["mtime"]) for d in cursor}
+
     def end_batch(self, batchID):
 
         if not self.is_batch(batchID):
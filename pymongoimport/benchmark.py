@@ -0,0 +1,64 @@
+"""
+=======================================
+benchmark - compare ingest profiles
+=======================================
+
+Load the same files once with each ingest profile (see `ingestprofile`) and
+report the docs per second each achieved, so the profiles can be checked
+against a real cluster. The collection is dropped before each run.
+
+    python -m pymongoimport.benchmark --delimiter '|' --fieldfile test/data/10k.tff test/data/10k.txt
+
+Takes the same arguments as pymongoimport plus **--profiles**. The default
+collection is `benchmark` in the database `PYIM`.
+"""
+import argparse
+import sys
+import time
+from typing import Tuple
+
+from pymongoimport.argparser import add_standard_args
+from pymongoimport.filediscovery import discover_files
+from pymongoimport.ingestprofile import IngestProfile, available_compressors
+from pymongoimport.pymongoimport_main import Importer
+
+
+def run_profile(args, profile: IngestProfile, filenames) -> Tuple[int, float]:
+    """
+    Import the files with a profile.
+
+    :return: (docs inserted, seconds taken)
+    """
+    args.profile = profile
+    importer = Importer(None, None, args)
+    importer.client[args.database].drop_collection(args.collection)
+    start = time.time()
+    for f in filenames:
+        importer.run(f)
+    elapsed = time.time() - start
+    count = importer.collection.count_documents({})
+    importer.client.close()
+    return count, elapsed
+
+
+def benchmark(*argv):
+    parser = add_standard_args(argparse.ArgumentParser())
+    parser.add_argument("--profiles", type=IngestProfile, nargs="+", default=list(IngestProfile),
+                        choices=list(IngestProfile),
+                        help="profiles to compare [default: all]")
+    parser.set_defaults(database="PYIM", collection="benchmark", silent=True, loglevel="WARNING")
+    args = parser.parse_args(*argv)
+
+    filenames = list(discover_files(args.filenames))
+    if not filenames:
+        parser.error("no input files")
+
+    print(f"compressors: {','.join(available_compressors())}")
+    print(f"{'profile':<10}{'docs':>10}{'seconds':>10}{'docs/sec':>12}")
+    for profile in args.profiles:
+        count, elapsed = run_profile(args, profile, filenames)
+        print(f"{str(profile):<10}{count:>10}{elapsed:>10.2f}{count / elapsed if elapsed else 0:>12.0f}")
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1:])
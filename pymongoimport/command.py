@@ -7,6 +7,8 @@ Author: joe@joedrumgoole.com
 """
 import os
 import logging
+import time
+from typing import List, Tuple
 
 import pymongo
 
@@ -15,7 +17,20 @@ from pymongoimport.filewriter import FileWriter
 from pymongoimport.linetodictparser import LineToDictParser
 from pymongoimport.linetodictparser import ErrorResponse
 from pymongoimport.filereader import FileReader
+from pymongoimport.follower import FileFollower
+from pymongoimport.indexes import DeferredIndexes, field_file_indexes
+from pymongoimport import schemadrift, shardrouter
+from pymongoimport.shardrouter import ShardRouter
+from pymongoimport.timeseries import batch_order, ensure_timeseries_collection
+from pymongoimport.arrowreader import ArrowReader
+from pymongoimport.jsonreader import JSONLineReader
+from pymongoimport.xlsxreader import XLSXReader
+from pymongoimport.dicttodictparser import DictToDictParser
+from pymongoimport.tokenizer import TokenizerType
 from pymongoimport.doctimestamp import DocTimeStamp
+from pymongoimport.docdecorator import DocDecorator
+from pymongoimport.rejects import ParseErrors, RejectStream
+from pymongoimport.memorybudget import MemoryBudget, format_size, peak_rss
 
 
 class Command:
@@ -77,7 +92,14 @@ class GenerateFieldfileCommand(Command):
         return self._field_filename
 
     def execute(self, arg):
-        ff = FieldFile.generate_field_file(csv_filename=arg, ff_filename=self._field_filename)
+        if ArrowReader.is_arrow_file(arg):
+            ff = ArrowReader.generate_field_file(arg, ff_filename=self._field_filename)
+        elif JSONLineReader.is_json_file(arg):
+            ff = JSONLineReader.generate_field_file(arg, ff_filename=self._field_filename)
+        elif XLSXReader.is_xlsx_file(arg):
+            ff = XLSXReader.generate_field_file(arg, ff_filename=self._field_filename)
+        else:
+            ff = FieldFile.generate_field_file(csv_filename=arg, ff_filename=self._field_filename)
         self._field_filename = ff.field_filename
         return self._field_filename
 
@@ -96,6 +118,31 @@ class ImportCommand(Command):
                  limit: int = 0,
                  locator=False,
                  timestamp: DocTimeStamp = DocTimeStamp.NO_TIMESTAMP,
+                 include: List[str] = None,
+                 exclude: List[str] = None,
+                 where: str = None,
+                 tokenizer: TokenizerType = TokenizerType.AUTO,
+                 row_groups: List[int] = None,
+                 byte_range: Tuple[int, int] = None,
+                 first_line_number: int = 1,
+                 sheets: List[str] = None,
+                 header_row: int = None,
+                 field_files: dict = None,
+                 follow: bool = False,
+                 poll_interval: float = 1.0,
+                 flush_interval: float = None,
+                 batch_size: int = 1000,
+                 batch_bytes: int = 0,
+                 in_flight: int = 1,
+                 ordered: bool = True,
+                 defer_indexes: bool = False,
+                 build_indexes: bool = True,
+                 router: ShardRouter = None,
+                 pre_split: int = 0,
+                 add_filename: bool = False,
+                 add_batch_id: bool = False,
+                 rejects=None,
+                 max_memory: int = 0,
                  audit:bool= None,
                  id:object= None):
 
@@ -114,6 +161,35 @@ class ImportCommand(Command):
         self._limit = limit
         self._locator = locator
         self._timestamp = timestamp
+        self._include = include
+        self._exclude = exclude
+        self._where = where
+        self._tokenizer = tokenizer
+        self._row_groups = row_groups
+        self._byte_range = byte_range
+        self._first_line_number = first_line_number
+        self._sheets = sheets
+        self._header_row = header_row
+        self._field_files = field_files
+        self._follow = follow
+        self._poll_interval = poll_interval
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._batch_bytes = batch_bytes
+        self._in_flight = in_flight
+        self._ordered = ordered
+        self._defer_indexes = defer_indexes
+        self._build_indexes = build_indexes
+        self._indexes = DeferredIndexes(collection)
+        self._router = router
+        self._pre_split = pre_split
+        self._add_filename = add_filename
+        self._add_batch_id = add_batch_id
+        self._rejects = rejects
+        self._memory_budget = MemoryBudget(max_memory) if max_memory else None
+        self._errors = None
+        self._fieldinfo = None
+        self._ingest_seconds = 0.0
         self._total_written = 0
 
     def pre_execute(self, arg):
@@ -122,28 +198,177 @@ class ImportCommand(Command):
         self._log.info("Using collection:'{}'".format(self._collection.full_name))
 
         if self._field_filename is None:
+            if FileReader.is_stdin(arg):
+                raise OSError("A --fieldfile is required to import from stdin")
             self._field_filename = FieldFile.make_default_tff_name(arg)
 
+        if JSONLineReader.is_json_file(arg):
+            self.pre_execute_json(arg)
+            return
+
         self._log.info(f"Using field file:'{self._field_filename}'")
 
         if not os.path.isfile(self._field_filename):
-            raise OSError(f"No such field file:'{self._field_filename}'")
-
-        self._fieldinfo = FieldFile(self._field_filename)
+            if ArrowReader.is_arrow_file(arg):  # the schema tells us the types
+                self._log.info(f"Generating field file:'{self._field_filename}' from the schema of '{arg}'")
+                ArrowReader.generate_field_file(arg, self._field_filename)
+            elif XLSXReader.is_xlsx_file(arg):  # cells are typed and the header names them
+                self._log.info(f"Generating field file:'{self._field_filename}' from the header of '{arg}'")
+                XLSXReader.generate_field_file(arg, self._field_filename, self._sheets, self._header_row)
+            else:
+                raise OSError(f"No such field file:'{self._field_filename}'")
+
+        self._fieldinfo = self.load_field_file(self._field_filename)
+        if self._has_header and os.path.isfile(arg) and not FileReader.is_stdin(arg) and \
+                not (ArrowReader.is_arrow_file(arg) or XLSXReader.is_xlsx_file(arg)):
+            self._fieldinfo = self.match_header(arg)
 
-        self._reader = FileReader(arg,
-                                  limit=self._limit,
-                                  has_header=self._has_header,
-                                  delimiter=self._delimiter)
         self._parser = LineToDictParser(self._fieldinfo,
-                                        locator=self._locator,
-                                        timestamp=self._timestamp,
-                                        onerror=self._onerror)
-        self._writer = FileWriter(self._collection,self._reader,self._parser)
+                                        decorator=self.make_decorator(arg),
+                                        errors=self.make_errors(arg),
+                                        onerror=self._onerror,
+                                        include=self._include,
+                                        exclude=self._exclude,
+                                        where=self._where)
+
+        if ArrowReader.is_arrow_file(arg):
+            self._reader = ArrowReader(arg,
+                                       fields=self._fieldinfo.fields(),
+                                       columns=self._parser.input_fields,
+                                       row_groups=self._row_groups,
+                                       first_line_number=self._first_line_number,
+                                       limit=self._limit,
+                                       batch_size=self._batch_size if self._memory_budget else
+                                       ArrowReader.BATCH_SIZE)
+        elif XLSXReader.is_xlsx_file(arg):
+            self._reader = XLSXReader(arg,
+                                      sheets=self._sheets,
+                                      header_row=self._header_row,
+                                      limit=self._limit)
+        elif self._follow and not FileReader.is_stdin(arg):  # a pipe is already followed
+            self._reader = FileFollower(arg,
+                                        has_header=self._has_header,
+                                        delimiter=self._delimiter,
+                                        tokenizer=self._tokenizer,
+                                        poll_interval=self._poll_interval)
+        else:
+            self._reader = FileReader(arg,
+                                      limit=self._limit,
+                                      has_header=self._has_header,
+                                      delimiter=self._delimiter,
+                                      tokenizer=self._tokenizer)
+        self._writer = self.make_writer()
+
+    def make_errors(self, arg) -> ParseErrors:
+        """
+        :param arg: the input, recorded in each reject
+        """
+        rejects = RejectStream(self._rejects, self._batch_size) if self._rejects is not None else None
+        self._errors = ParseErrors(arg, rejects, self._log)
+        return self._errors
+
+    def make_decorator(self, arg) -> DocDecorator:
+        if self._add_batch_id and self._id is None:
+            self._log.warning("No batch ID to add, batch IDs come from the --audit batch")
+        return DocDecorator(locator=self._locator,
+                            timestamp=self._timestamp,
+                            filename=arg if self._add_filename else None,
+                            batch_id=self._id if self._add_batch_id else None)
+
+    def make_writer(self) -> FileWriter:
+        timeseries = self._fieldinfo.timeseries_options() if self._fieldinfo else None
+        if timeseries:
+            ensure_timeseries_collection(self._collection.database, self._collection.name, timeseries)
+
+        # a followed file is checkpointed after each insert so inserts can't overlap
+        return FileWriter(self._collection, self._reader, self._parser,
+                          batch_size=self._batch_size,
+                          flush_interval=self._flush_interval,
+                          batch_bytes=self._batch_bytes,
+                          in_flight=1 if self._follow else self._in_flight,
+                          ordered=self._ordered,
+                          router=self._router,
+                          sort_key=batch_order(timeseries) if timeseries else None,
+                          memory_budget=self._memory_budget)
+
+    def pre_split(self, arg, sample_size: int = 10000):
+        """
+        Pre-split an empty sharded collection at shard key values from the
+        first sample_size docs of arg (see `shardrouter.pre_split`).
+        """
+        if self._follow or FileReader.is_stdin(arg):
+            self._log.warning(f"Can't sample '{arg}' to pre-split the collection")
+            return
+        with self._errors.muted():
+            docs = [self._parser.parse_list(line, i)
+                    for i, line in enumerate(self._reader.readline(limit=sample_size), 1)]
+        shardrouter.pre_split(self._collection.database.client, self._collection.full_name, self._router,
+                              [d for d in docs if d is not None], self._pre_split)
+
+    def match_header(self, arg) -> FieldFile:
+        """
+        The field file to parse arg with: the field file, or an evolved copy
+        if arg's header has drifted from it (see `schemadrift`).
+        """
+        reader = FileReader(arg, has_header=True, delimiter=self._delimiter, tokenizer=self._tokenizer)
+        rows = list(reader.readline(limit=schemadrift.SAMPLE_ROWS))
+        if reader.header_line is None:
+            return self._fieldinfo
+        evolved = schemadrift.evolve_field_file(self._fieldinfo, reader.header_line, rows,
+                                                schemadrift.make_evolved_tff_name(self._field_filename, arg))
+        return evolved or self._fieldinfo
+
+    def load_field_file(self, field_filename: str) -> FieldFile:
+        """
+        Load a field file, reusing the copy in the `field_files` cache (shared
+        by the commands that import a list of files) if there is one.
+        """
+        if self._field_files is None:
+            return FieldFile(field_filename)
+        if field_filename not in self._field_files:
+            self._field_files[field_filename] = FieldFile(field_filename)
+        return self._field_files[field_filename]
+
+    def pre_execute_json(self, arg):
+        """
+        JSON documents are already typed so the field file is optional and
+        only used to coerce strings (e.g. dates) and rename fields.
+        """
+        if os.path.isfile(self._field_filename):
+            self._log.info(f"Using field file:'{self._field_filename}'")
+            self._fieldinfo = self.load_field_file(self._field_filename)
+        else:
+            self._fieldinfo = None
+
+        self._parser = DictToDictParser(self._fieldinfo,
+                                        decorator=self.make_decorator(arg),
+                                        errors=self.make_errors(arg),
+                                        onerror=self._onerror,
+                                        include=self._include,
+                                        exclude=self._exclude,
+                                        where=self._where)
+        self._reader = JSONLineReader(arg,
+                                      limit=self._limit,
+                                      byte_range=self._byte_range,
+                                      first_line_number=self._first_line_number)
+        self._writer = self.make_writer()
 
     def execute(self, arg):
 
-        self._total_written = self._writer.write()
+        if self._router and self._pre_split:
+            self.pre_split(arg)
+        if self._defer_indexes:
+            self._indexes.drop()
+        if self._build_indexes and self._follow:  # the load doesn't end, so index as it goes
+            self._indexes.build(field_file_indexes(self._fieldinfo))
+        start = time.time()
+        try:
+            self._total_written = self._writer.write()
+        finally:
+            self._ingest_seconds = time.time() - start
+            self._errors.end_batch()  # write the rejects of a failed load too
+            if self._build_indexes and not self._follow:  # including the dropped ones if the load failed
+                self._indexes.build(field_file_indexes(self._fieldinfo))
 
         return self._total_written
 
@@ -157,7 +382,37 @@ class ImportCommand(Command):
     def post_execute(self, arg):
         super().post_execute(arg)
         if self._audit:
-            self._audit.add_command(self._id, self.name(), {"filename": arg})
-
+            args = {"filename": arg,
+                    "count": self._total_written,
+                    "ingest_seconds": self._ingest_seconds}
+            if self._build_indexes:
+                args["index_seconds"] = self._indexes.build_seconds
+            if self._errors is not None:
+                args["errors"] = dict(self._errors.totals)
+                if self._errors.missing_totals:
+                    args["missing"] = dict(self._errors.missing_totals)
+                if self._errors.rejects is not None:
+                    args["rejected"] = self._errors.rejects.count
+            if peak_rss() is not None:
+                args["peak_rss"] = peak_rss()
+            self._audit.add_command(self._id, self.name(), args)
+
+        if self._errors is not None and self._errors.rejects is not None and self._errors.rejects.count:
+            self._log.warning(f"{self._errors.rejects.count} rejects from '{arg}' written to '{self._errors.rejects.name}'")
+        if isinstance(self._parser, LineToDictParser):
+            self.log_cache_stats(arg)
+        if peak_rss() is not None:
+            self._log.info(f"Peak RSS after importing '{arg}': {format_size(peak_rss())}")
         if self._log:
             self._log.info("imported file: '%s'", arg)
+
+    def log_cache_stats(self, arg):
+        """
+        Log the conversion cache hit rate of each column that had a cache,
+        best first.
+        """
+        stats = sorted(self._parser.cache_stats().items(),
+                       key=lambda s: -s[1][0] / max(1, s[1][0] + s[1][1]))
+        rates = [f"'{k}':{hits / (hits + misses):.1%}" for k, (hits, misses) in stats if hits + misses]
+        if rates:
+            self._log.info(f"Conversion cache hit rates for '{arg}': {', '.join(rates)}")
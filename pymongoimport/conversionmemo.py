@@ -0,0 +1,79 @@
+"""
+=====================================
+Conversion memo
+=====================================
+
+A column with too many distinct values for a `ValueDictionary` can still
+repeat itself locally: in a file sorted by time a date column holds one
+value for thousands of rows before moving on to the next. For such columns
+`LineToDictParser` keeps a `ConversionMemo`, a bounded LRU map of raw value
+to converted value.
+
+A memo pays for itself only if enough lookups hit, so its hit rate is
+measured every `WINDOW` lookups. If the rate falls below `MIN_HIT_RATE` the
+memo is cleared and the parser converts the column directly for the next
+`PAUSE_ROWS` rows before trying the memo again.
+
+Columns of type `str` don't get a memo, as there is no conversion to save.
+
+Both `ValueDictionary` and `ConversionMemo` count their `hits` and `misses`
+so the import can report which columns benefit (see
+`LineToDictParser.cache_stats`).
+"""
+from collections import OrderedDict
+
+
+class ConversionMemo(OrderedDict):
+
+    CAPACITY = 4096
+    WINDOW = 1000
+    MIN_HIT_RATE = 0.5
+    PAUSE_ROWS = 10000
+
+    def __init__(self, field: str, capacity: int = None):
+        """
+        :param field: the field file field the values belong to
+        :param capacity: the number of values kept (`CAPACITY` if None)
+        """
+        super().__init__()
+        self._field = field
+        self._capacity = capacity if capacity is not None else ConversionMemo.CAPACITY
+        self.hits = 0
+        self.misses = 0
+        self._window_lookups = 0
+        self._window_hits = 0
+
+    @property
+    def field(self) -> str:
+        return self._field
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __getitem__(self, raw):
+        value = super().__getitem__(raw)
+        self.move_to_end(raw)
+        return value
+
+    def add(self, raw: str, value) -> bool:
+        """
+        Remember the converted `value` of `raw`, forgetting the least recently
+        used value if the memo is full.
+
+        :return: False if the hit rate is too low and the memo should be paused
+        """
+        self.misses = self.misses + 1
+        self[raw] = value
+        if len(self) > self._capacity:
+            self.popitem(last=False)
+
+        lookups = self.hits + self.misses - self._window_lookups
+        if lookups >= ConversionMemo.WINDOW:
+            hit_rate = (self.hits - self._window_hits) / lookups
+            self._window_lookups = self.hits + self.misses
+            self._window_hits = self.hits
+            if hit_rate < ConversionMemo.MIN_HIT_RATE:
+                self.clear()
+                return False
+        return True
@@ -0,0 +1,126 @@
+import logging
+from typing import List
+
+from pymongoimport.fieldfile import FieldFile
+from pymongoimport.type_converter import Converter
+from pymongoimport.doctimestamp import DocTimeStamp
+from pymongoimport.docdecorator import DocDecorator
+from pymongoimport.jsonreader import InvalidJSON
+from pymongoimport.rejects import ParseErrors
+from pymongoimport.linetodictparser import ErrorResponse
+from pymongoimport.rowfilter import RowFilter
+
+
+class DictToDictParser:
+    """
+    Parse documents that arrive as dicts (e.g. from `JSONLineReader`) rather than
+    lists of strings. The field file is optional. If present, string values of
+    fields with a non `str` type are converted (so an ISO date string becomes a
+    datetime), fields are renamed and `skip = true` fields are dropped. Values
+    that are already typed by the JSON decoder are left alone.
+
+    The parse method is called `parse_list` to match `LineToDictParser` so that
+    `FileWriter` can drive either parser.
+    """
+
+    def __init__(self,
+                 field_file: FieldFile = None,
+                 locator: bool = True,
+                 timestamp: DocTimeStamp = DocTimeStamp.NO_TIMESTAMP,
+                 onerror: ErrorResponse = ErrorResponse.Warn,
+                 include: List[str] = None,
+                 exclude: List[str] = None,
+                 where: str = None,
+                 decorator: DocDecorator = None,
+                 errors: ParseErrors = None):
+
+        self._log = logging.getLogger(__name__)
+        self._onerror = onerror
+        self._converter = Converter(self._log)
+        self._field_file = field_file
+        self._decorator = decorator if decorator is not None else DocDecorator(locator, timestamp)
+        self._errors = errors if errors is not None else ParseErrors(log=self._log)
+
+        self._keep = set(include) if include else None
+        self._drop = set(exclude or [])
+        self._coerce = []
+
+        if field_file:
+            if self._keep is None:
+                self._drop.update(k for k in field_file.fields() if field_file.skip_value(k))
+            for k in field_file.fields():
+                type_field = field_file.type_value(k)
+                name = field_file.name_value(k)
+                if type_field != "str" or name != k:
+                    self._coerce.append((k, name, type_field, field_file.format_value(k)))
+
+        if where:
+            self._filter = RowFilter(where, field_file, by_name=True)
+        else:
+            self._filter = None
+
+    @property
+    def row_filter(self) -> RowFilter:
+        return self._filter
+
+    @property
+    def errors(self) -> ParseErrors:
+        return self._errors
+
+    def end_batch(self):
+        self._errors.end_batch()
+
+    def parse_list(self, doc: dict, line_number: int) -> dict:
+        """
+        :param doc: a decoded JSON document
+        :param line_number: the location of the document in the input file
+        :return: the new doc or None if the doc is rejected by the where filter
+                 or isn't a JSON object
+        """
+
+        if isinstance(doc, InvalidJSON):
+            if self._onerror == ErrorResponse.Fail:
+                raise ValueError(f"Invalid JSON at line {line_number}: {doc.reason}: {doc.line!r}")
+            self._errors.error(line_number, doc.line, f"invalid JSON: {doc.reason}")
+            return None
+
+        if not isinstance(doc, dict):  # e.g. a line holding an array or a number
+            msg = f"a JSON {type(doc).__name__}, not an object"
+            if self._onerror == ErrorResponse.Fail:
+                raise ValueError(f"Line {line_number} is {msg}: {doc!r:.200}")
+            self._errors.error(line_number, doc, msg)
+            return None
+
+        if self._filter and not self._filter(doc):
+            return None
+
+        if self._keep is not None:
+            doc = {k: v for k, v in doc.items() if k in self._keep}
+        elif self._drop:
+            doc = {k: v for k, v in doc.items() if k not in self._drop}
+
+        for k, name, type_field, fmt in self._coerce:
+            if k not in doc:
+                continue
+            v = doc[k]
+            if isinstance(v, str) and type_field not in ["str", "any"]:
+                try:
+                    if type_field in ["date", "datetime"]:
+                        v = self._converter.convert_time(type_field, v, fmt)
+                    else:
+                        v = self._converter.convert_strict(type_field, v)
+                except ValueError:
+                    if self._onerror == ErrorResponse.Fail:
+                        self._log.error("Error at line %i at field '%s'", line_number, k)
+                        self._log.error("type conversion error: Cannot convert '%s' to type %s", v, type_field)
+                        raise
+                    elif self._onerror == ErrorResponse.Warn:
+                        self._errors.error(line_number, dict(doc), f"Cannot convert '{v}' to {type_field}", k)
+            if name != k:
+                del doc[k]
+            doc[name] = v
+
+        if self._decorator:
+            self._decorator(doc, line_number)
+
+        return doc
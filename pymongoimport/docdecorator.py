@@ -0,0 +1,62 @@
+"""
+=====================================
+DocDecorator
+=====================================
+
+Add the fields that describe where a doc came from rather than what it
+contains, once per doc after its columns have been converted:
+
+locator
+    ``{"line": <input line number>}`` (**--locator**)
+timestamp
+    the time the doc was parsed (**--addtimestamp doc**) or the time the
+    import started (**--addtimestamp batch**)
+filename
+    the input file (**--addfilename**)
+batch_id
+    the audit batch ID of the import (**--addbatchid**)
+
+The values that are the same for every doc (the batch timestamp, the file
+name and the batch ID) are immutable so a single copy is shared by every
+doc rather than being rebuilt per doc.
+"""
+from datetime import datetime
+
+from pymongoimport.doctimestamp import DocTimeStamp
+
+
+class DocDecorator(object):
+
+    def __init__(self,
+                 locator: bool = False,
+                 timestamp: DocTimeStamp = DocTimeStamp.NO_TIMESTAMP,
+                 filename: str = None,
+                 batch_id: object = None):
+        self._locator = locator
+        self._doc_timestamp = timestamp == DocTimeStamp.DOC_TIMESTAMP
+        self._fixed = {}
+        if timestamp == DocTimeStamp.BATCH_TIMESTAMP:
+            self._fixed["timestamp"] = datetime.utcnow()
+        if filename is not None:
+            self._fixed["filename"] = filename
+        if batch_id is not None:
+            self._fixed["batch_id"] = batch_id
+
+    @property
+    def fields(self) -> dict:
+        """
+        The fields added with the same value to every doc.
+        """
+        return self._fixed
+
+    def __bool__(self):
+        return self._locator or self._doc_timestamp or bool(self._fixed)
+
+    def __call__(self, doc: dict, line_number: int) -> dict:
+        if self._locator:
+            doc["locator"] = {"line": line_number}
+        if self._fixed:
+            doc.update(self._fixed)
+        if self._doc_timestamp:
+            doc["timestamp"] = datetime.utcnow()
+        return doc
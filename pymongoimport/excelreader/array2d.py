@@ -0,0 +1,147 @@
+"""
+=====================================
+Array2d
+=====================================
+
+A rectangular block of cells (e.g. a cross tab read from a spreadsheet)
+stored as a single flat list in row major order. Cell (x, y) lives at
+`y * len_x() + x`, so a row is a contiguous run of the list and a column
+is every `len_x()`th element starting at x.
+
+Rows and columns are returned as `Array2dView` objects which are created
+in O(1) without copying. Iterating over a view uses a list slice, so the
+work is done in C rather than by indexing cell by cell in Python. This
+keeps column order (transposed) imports of wide sheets fast.
+"""
+from collections.abc import Sequence
+from typing import Iterable, Iterator, List
+
+
+class Array2dView(Sequence):
+    """
+    A read only view of a row or column of an Array2d.
+    """
+
+    def __init__(self, data: List, start: int, step: int, length: int):
+        self._data = data
+        self._start = start
+        self._step = step
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._length))]
+        if i < 0:
+            i = i + self._length
+        if not 0 <= i < self._length:
+            raise IndexError("Array2dView index out of range")
+        return self._data[self._start + i * self._step]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._data[self._start:self._start + self._step * self._length:self._step])
+
+    def __eq__(self, other):
+        if isinstance(other, (Array2dView, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Array2dView({list(self)})"
+
+
+class Array2d:
+
+    def __init__(self, tuples: Iterable):
+        """
+        :param tuples: an iterable of equal length rows. It is consumed a row
+                       at a time so it can be a generator such as
+                       `worksheet.iter_rows(values_only=True)`.
+        """
+        self._data = []
+        self._len_x = None
+        self._len_y = 0
+
+        for t in tuples:
+            if self._len_x is None:
+                self._len_x = len(t)
+            elif self._len_x != len(t):
+                raise ValueError("List of tuples to ctor are not uniform (lengths differ)")
+            self._data.extend(t)
+            self._len_y = self._len_y + 1
+
+        if self._len_x is None:
+            self._len_x = 0
+
+    @classmethod
+    def from_rows(cls, rows: Iterable, width: int = None) -> "Array2d":
+        """
+        Build an Array2d from rows of differing lengths, padding short rows
+        with None and truncating long rows to `width` (default: the length
+        of the first row).
+        """
+        def fit(rows):
+            nonlocal width
+            for row in rows:
+                row = tuple(row)
+                if width is None:
+                    width = len(row)
+                if len(row) < width:
+                    row = row + (None,) * (width - len(row))
+                yield row[:width]
+
+        return cls(fit(rows))
+
+    def xy(self, x, y):
+        if not (0 <= x < self._len_x and 0 <= y < self._len_y):
+            raise IndexError(f"({x}, {y}) is outside a {self._len_x}x{self._len_y} array")
+        return self._data[y * self._len_x + x]
+
+    def len_x(self):
+        return self._len_x
+
+    def len_y(self):
+        return self._len_y
+
+    def row(self, y) -> Array2dView:
+        if not 0 <= y < self._len_y:
+            raise IndexError(f"row {y} is outside a {self._len_x}x{self._len_y} array")
+        return Array2dView(self._data, y * self._len_x, 1, self._len_x)
+
+    def col(self, x) -> Array2dView:
+        if not 0 <= x < self._len_x:
+            raise IndexError(f"column {x} is outside a {self._len_x}x{self._len_y} array")
+        return Array2dView(self._data, x, self._len_x, self._len_y)
+
+    def row_first(self):
+        yield from self._data
+
+    def col_first(self):
+        for x in range(self._len_x):
+            yield from self._data[x::self._len_x]
+
+    def row_order(self):
+        for y in range(self._len_y):
+            yield self.row(y)
+
+    def col_order(self):
+        for x in range(self._len_x):
+            yield self.col(x)
+
+    def transpose(self) -> "Array2d":
+        t = Array2d(())
+        t._data = list(self.col_first())
+        t._len_x = self._len_y
+        t._len_y = self._len_x
+        return t
+
+    def __repr__(self):
+        s = "[\n"
+        for row in self.row_order():
+            for col in row:
+                s = f"{s} {col!s:5},"
+            s = f"{s}\n"
+        s = f"{s}]\n"
+        return s
@@ -98,7 +98,7 @@ class CensusWorkbook:
 
     @property
     def sheets(self):
-        return list(self._sheets.itervalues())
+        return list(self._sheets.values())
 
     def sheet(self, name):
         return self._sheets[name]
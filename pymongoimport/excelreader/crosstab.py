@@ -0,0 +1,375 @@
+"""
+=====================================
+CrossTab
+=====================================
+
+Import survey workbooks laid out as cross tabs: one question per sheet, a
+row of group labels ("Gender", "Age", ...) above a row of sub group labels
+("Male", "Female", "16-24", ...), a base row and then a block of responses,
+each a row of counts optionally followed by a row of percentages.
+
+The layout is described by a TOML cross tab file (extension `.xtab`), in
+the same spirit as a `.tff` field file, instead of being hard coded::
+
+    [layout]
+    sheets = ["Q*"]
+    question_cell = "A10"
+    statement_cell = "A11"
+    group_row = 12
+    subgroup_row = 13
+    base_row = 14
+    first_response_row = 16
+    response_column = "B"
+    response_step = 2
+    percent_offset = 1
+    first_value_column = "C"
+
+    # Optional. If absent the groups are read from group_row and
+    # subgroup_row. A group with no sub groups maps straight to a column.
+    [groups]
+    Total = "C"
+    Gender = {Male = "D", Female = "E"}
+
+Each sheet is read with a single `iter_rows` scan in openpyxl read only
+mode and becomes one document::
+
+    {"question_id": "Q3",
+     "question": "Q3. How strongly do you agree ...",
+     "statement": "...",
+     "base": {"Total": 1516, "Gender": {"Male": 1015, "Female": 501}, ...},
+     "responses": [{"response": "Strongly agree",
+                    "values": {"Total": {"count": 686, "percent": 0.453},
+                               "Gender": {"Male": {"count": 439, "percent": 0.433}, ...}}},
+                   ...]}
+
+Sheets are parsed in parallel by a pool of processes and the documents are
+written with `insert_many`.
+"""
+import argparse
+import fnmatch
+import multiprocessing
+import os
+import re
+import sys
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import toml
+
+
+class CrossTabException(Exception):
+    pass
+
+
+def column_index(column) -> int:
+    """
+    Turn a 1 based column number or a column letter ("B", "AA") into a 1 based column number.
+    """
+    if isinstance(column, int):
+        return column
+    if not isinstance(column, str) or not re.fullmatch(r"[A-Za-z]+", column):
+        raise CrossTabException(f"Invalid column '{column}'")
+    index = 0
+    for c in column.upper():
+        index = index * 26 + ord(c) - ord("A") + 1
+    return index
+
+
+def cell_index(cell: str) -> Tuple[int, int]:
+    """
+    Turn a cell reference like "A10" into a 1 based (row, column) pair.
+    """
+    m = re.fullmatch(r"([A-Za-z]+)([0-9]+)", cell or "")
+    if m is None:
+        raise CrossTabException(f"Invalid cell '{cell}'")
+    return int(m.group(2)), column_index(m.group(1))
+
+
+class CrossTabLayout(object):
+
+    DEFAULT_EXTENSION = ".xtab"
+
+    DEFAULTS = {
+        "sheets": ["*"],
+        "question_cell": "A10",
+        "statement_cell": "A11",
+        "group_row": 12,
+        "subgroup_row": 13,
+        "base_row": 14,
+        "first_response_row": 16,
+        "response_column": 2,
+        "response_step": 2,
+        "percent_offset": 1,
+        "first_value_column": 3,
+        "last_value_column": 0,
+        "missing": ["-"],
+    }
+
+    def __init__(self, layout: dict = None, groups: dict = None):
+        """
+        :param layout: values overriding `DEFAULTS`
+        :param groups: {group: column} or {group: {sub group: column}}
+                       (default: read from the group and sub group rows)
+        """
+        layout = layout or {}
+        for k in layout:
+            if k not in CrossTabLayout.DEFAULTS:
+                raise CrossTabException(f"Invalid layout key '{k}' (valid keys: {list(CrossTabLayout.DEFAULTS)})")
+        self._layout = dict(CrossTabLayout.DEFAULTS, **layout)
+
+        if self._layout["response_step"] < 1:
+            raise CrossTabException("response_step must be at least 1")
+
+        self._question_cell = cell_index(self._layout["question_cell"])
+        if self._layout["statement_cell"]:
+            self._statement_cell = cell_index(self._layout["statement_cell"])
+        else:
+            self._statement_cell = None
+        self._response_column = column_index(self._layout["response_column"])
+        self._first_value_column = column_index(self._layout["first_value_column"])
+        self._last_value_column = column_index(self._layout["last_value_column"])
+        self._missing = set(self._layout["missing"])
+
+        if groups:
+            self._columns = []
+            for group, v in groups.items():
+                if isinstance(v, dict):
+                    for sub_group, column in v.items():
+                        self._columns.append((column_index(column), group, sub_group))
+                else:
+                    self._columns.append((column_index(v), group, None))
+            self._columns.sort()
+        else:
+            self._columns = None
+
+    @staticmethod
+    def read(filename: str) -> "CrossTabLayout":
+        if not os.path.isfile(filename):
+            raise OSError(f"No such file {filename}")
+        with open(filename, "r") as xtab_file:
+            d = toml.load(xtab_file)
+        for k in d:
+            if k not in ["layout", "groups"]:
+                raise CrossTabException(f"Invalid section '[{k}]' in '{filename}'")
+        return CrossTabLayout(d.get("layout"), d.get("groups"))
+
+    @staticmethod
+    def make_default_xtab_name(name: str) -> str:
+        return f"{os.path.splitext(name)[0]}{CrossTabLayout.DEFAULT_EXTENSION}"
+
+    def __getitem__(self, key):
+        return self._layout[key]
+
+    def match_sheet(self, sheet_name: str) -> bool:
+        return any(fnmatch.fnmatchcase(sheet_name, p) for p in self._layout["sheets"])
+
+    @property
+    def max_column(self) -> int:
+        """
+        The last column a scan has to read, None if it depends on the sheet.
+        """
+        if self._columns:
+            last = self._columns[-1][0]
+        elif self._last_value_column:
+            last = self._last_value_column
+        else:
+            return None
+        return max(last, self._response_column, self._question_cell[1],
+                   self._statement_cell[1] if self._statement_cell else 0)
+
+    def value_columns(self, group_row: tuple, subgroup_row: tuple) -> List[Tuple[int, str, str]]:
+        """
+        The (0 based column, group, sub group) of each value column. A group label
+        applies to every column up to the next group label. The sub group is None
+        for a group that is a single column (e.g. "Total").
+        """
+        if self._columns:
+            return [(c - 1, g, s) for c, g, s in self._columns]
+
+        last = self._last_value_column or max(len(group_row), len(subgroup_row))
+        columns = []
+        group = None
+        for c in range(self._first_value_column - 1, last):
+            g = CrossTabLayout._label(group_row, c)
+            s = CrossTabLayout._label(subgroup_row, c)
+            if g is not None:
+                group = g
+            if group is None or (g is None and s is None):
+                continue
+            columns.append((c, group, s))
+        return columns
+
+    @staticmethod
+    def _label(row: tuple, c: int):
+        v = row[c] if c < len(row) else None
+        if isinstance(v, str):
+            v = v.strip("\ufeff \t\n")
+            if not v:
+                return None
+        return v
+
+    def _value(self, row: tuple, c: int):
+        v = row[c] if c < len(row) else None
+        if isinstance(v, str) and v.strip() in self._missing:
+            return None
+        return v
+
+    def parse(self, sheet_name: str, rows: Iterable[tuple]) -> dict:
+        """
+        Build the question document for a sheet from its rows (starting at row 1).
+        """
+        doc = {"question_id": sheet_name}
+        base = {}
+        responses = []
+        group_row = ()
+        subgroup_row = ()
+        columns = None
+        values = None
+
+        first_response_row = self._layout["first_response_row"]
+        step = self._layout["response_step"]
+        percent_offset = self._layout["percent_offset"]
+
+        for row_number, row in enumerate(rows, 1):
+            if row_number == self._question_cell[0]:
+                doc["question"] = CrossTabLayout._label(row, self._question_cell[1] - 1)
+            if self._statement_cell and row_number == self._statement_cell[0]:
+                doc["statement"] = CrossTabLayout._label(row, self._statement_cell[1] - 1)
+            if row_number == self._layout["group_row"]:
+                group_row = row
+            if row_number == self._layout["subgroup_row"]:
+                subgroup_row = row
+
+            if row_number == self._layout["base_row"] or row_number >= first_response_row:
+                if columns is None:
+                    columns = self.value_columns(group_row, subgroup_row)
+            else:
+                continue
+
+            if row_number == self._layout["base_row"]:
+                for c, g, s in columns:
+                    CrossTabLayout._set(base, g, s, self._value(row, c))
+
+            if row_number >= first_response_row:
+                offset = (row_number - first_response_row) % step
+                if offset == 0:
+                    response = CrossTabLayout._label(row, self._response_column - 1)
+                    if response is None:
+                        break
+                    values = {}
+                    responses.append({"response": response, "values": values})
+                    for c, g, s in columns:
+                        CrossTabLayout._set(values, g, s, {"count": self._value(row, c)})
+                elif offset == percent_offset:
+                    for c, g, s in columns:
+                        leaf = values[g] if s is None else values[g][s]
+                        leaf["percent"] = self._value(row, c)
+
+        if base:
+            doc["base"] = base
+        doc["responses"] = responses
+        return doc
+
+    @staticmethod
+    def _set(d: dict, group, sub_group, v):
+        if sub_group is None:
+            d[group] = v
+        else:
+            d.setdefault(group, {})[sub_group] = v
+
+
+class CrossTabWorkbook(object):
+
+    def __init__(self, filename: str, layout: CrossTabLayout = None):
+        # imported here so the layout can be used without openpyxl
+        from pymongoimport.xlsxreader import load_workbook
+
+        self._filename = filename
+        self._layout = layout or CrossTabLayout()
+        self._workbook = load_workbook(filename)
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def layout(self) -> CrossTabLayout:
+        return self._layout
+
+    def sheet_names(self) -> List[str]:
+        return [s for s in self._workbook.sheetnames if self._layout.match_sheet(s)]
+
+    def read_sheet(self, sheet_name: str) -> dict:
+        rows = self._workbook[sheet_name].iter_rows(max_col=self._layout.max_column, values_only=True)
+        return self._layout.parse(sheet_name, rows)
+
+    def docs(self, poolsize: int = 1) -> Iterator[dict]:
+        """
+        Yield a document per sheet, in sheet order, parsing sheets in up to
+        `poolsize` processes.
+        """
+        sheet_names = self.sheet_names()
+        if poolsize > 1 and len(sheet_names) > 1:
+            with multiprocessing.Pool(min(poolsize, len(sheet_names)),
+                                      initializer=_open_workbook,
+                                      initargs=(self._filename, self._layout)) as pool:
+                yield from pool.imap(_read_sheet, sheet_names)
+        else:
+            for s in sheet_names:
+                yield self.read_sheet(s)
+
+
+_workbook = None  # the CrossTabWorkbook of a pool worker process
+
+
+def _open_workbook(filename: str, layout: CrossTabLayout):
+    global _workbook
+    _workbook = CrossTabWorkbook(filename, layout)
+
+
+def _read_sheet(sheet_name: str) -> dict:
+    return _workbook.read_sheet(sheet_name)
+
+
+if __name__ == "__main__":
+
+    import pymongo
+
+    from pymongoimport.excelreader.excelreader import insert_batches
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--host", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="census")
+    parser.add_argument("--collection", default="survey")
+    parser.add_argument("--xtab", help="cross tab layout file [default: <excelfile>.xtab if present]")
+    parser.add_argument("--poolsize", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--batchsize", type=int, default=1000)
+    parser.add_argument("--drop", action="store_true", default=False)
+    parser.add_argument("excelfiles", nargs="+")
+    args = parser.parse_args()
+
+    client = pymongo.MongoClient(args.host)
+    db = client[args.database]
+    collection = db[args.collection]
+
+    if args.drop:
+        print(f"Dropping collection {args.collection}")
+        db.drop_collection(args.collection)
+
+    for excel_file in args.excelfiles:
+        if not os.path.isfile(excel_file):
+            print(f"{excel_file} is not a file")
+            sys.exit(1)
+
+        xtab = args.xtab or CrossTabLayout.make_default_xtab_name(excel_file)
+        if os.path.isfile(xtab):
+            layout = CrossTabLayout.read(xtab)
+        elif args.xtab:
+            print(f"{args.xtab} is not a file")
+            sys.exit(1)
+        else:
+            layout = CrossTabLayout()
+
+        workbook = CrossTabWorkbook(excel_file, layout)
+        doc_count = insert_batches(collection, workbook.docs(args.poolsize), args.batchsize)
+        print(f"Inserted {doc_count} questions from {excel_file} into {args.database}.{args.collection}")
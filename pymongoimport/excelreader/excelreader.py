@@ -6,58 +6,49 @@ from typing import List
 import pymongo
 from openpyxl import load_workbook,workbook, worksheet
 
-class Array2d:
-
-    def __init__(self, tuples:List):
-        self._array = []
-
-        compare = None
-        for i,t in enumerate(tuples):
-            self._array.append(t)
-            if compare is None:
-                compare = t
-            elif len(compare) != len(t) :
-                raise ValueError("List of tuples to ctor are not uniform (lengths differ")
-
-    def xy(self,  x, y):
-        return self.array[y][x]
-
-    def len_x(self):
-        return len(self._array[0])
-
-    def len_y(self):
-        return len(self._array)
-
-    def row_first(self):
-        for row in self._array:
-            for col in row:
-                yield col
-
-    def col_first(self):
-        for x in range(len(self._array)):
-            for y in range(len(self._array[0])):
-                yield self._array[y][x]
-
-    def row_order(self):
-        for row in self._array:
-            yield row
-
-    def col_order(self):
-
-        for x in range(len(self._array[0])):
-            col = []
-            for y in range(len(self._array)):
-                col.append(self._array[y][x])
-            yield col
-
-    def __repr__(self):
-        s="[\n"
-        for row in self._array:
-            for col in row:
-                s = f"{s} {col:5},"
-            s = f"{s}\n"
-        s=f"{s}]\n"
-        return s
+from pymongoimport.excelreader.array2d import Array2d
+
+
+def row_order_docs(rows, row_index, col_index):
+    """
+    Make a doc per row titled by the row key with a field per column key.
+    """
+    for row_count, row in enumerate(rows, 1):
+        doc = {"title": row_index[row_count]}
+        for col_count, v in enumerate(row, 1):
+            doc[col_index[col_count]] = v
+        yield doc
+
+
+def col_order_docs(a2d, row_index, col_index):
+    """
+    Make a doc per column titled by the column key with a field per row key.
+    """
+    for col_count, col in enumerate(a2d.col_order(), 1):
+        doc = {"title": col_index[col_count]}
+        for row_count, v in enumerate(col, 1):
+            doc[row_index[row_count]] = v
+        yield doc
+
+
+def insert_batches(collection, docs, batch_size=1000):
+    """
+    Insert docs with insert_many in batches of batch_size. Returns the number
+    of docs inserted.
+    """
+    total = 0
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) == batch_size:
+            collection.insert_many(batch)
+            total = total + len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+        total = total + len(batch)
+    return total
+
 
 class ExcelWorkbook:
 
@@ -77,7 +68,7 @@ class ExcelWorkbook:
 
     @property
     def sheets(self):
-        return list(self._sheets.itervalues())
+        return list(self._sheets.values())
 
     def sheet(self, name):
         return self._sheets[name]
@@ -117,6 +108,7 @@ if __name__ == "__main__":
     parser.add_argument("--lowerright")
     parser.add_argument("--drop", action="store_true", default=False)
     parser.add_argument("--colorder", action="store_true", default=False)
+    parser.add_argument("--batchsize", type=int, default=1000)
     args = parser.parse_args()
 
     client = pymongo.MongoClient(args.host)
@@ -197,69 +189,20 @@ if __name__ == "__main__":
 
     doc_count = 0
 
-    array2d = []
-    index = 1
-    for row in sh.sheet.iter_rows(min_row=args.minrow+1,
-                                  min_col=args.mincol+1,
-                                  max_row=args.maxrow,
-                                  max_col=args.maxcol,
-                                  values_only=True):
-        array2d.append(row)
-
-
-
-    # print(array2d[0][0])
-    # y = len(array2d)
-    # x= len(array2d[0])
-    # print(f"x={x} y={y}")
-    # print(f"x=3,y=2 {array2d[2][3]}")
-    a2d = Array2d(array2d)
-    # print(a2d)
-    # print("row_order")
-    # for i in a2d.row_order():
-    #     print(i)
-    #
-    # print("col_order")
-    # for i in a2d.col_order():
-    #     print(i)
-    #
-    # for i in a2d.row_first():
-    #     print(f"{i:5}", end=" ")
-    # print("")
-    #
-    # for i in a2d.col_first():
-    #     print(f"{i:5}", end=" ")
-    # print("")
+    rows = sh.sheet.iter_rows(min_row=args.minrow+1,
+                              min_col=args.mincol+1,
+                              max_row=args.maxrow,
+                              max_col=args.maxcol,
+                              values_only=True)
 
-
-    row_count = 1
-    col_count = 1
     if args.colorder:
-        for col in a2d.col_order():
-            doc = {}
-            doc_count = doc_count + 1
-            doc["title"] = col_index[col_count]
-            col_count = col_count + 1
-            row_count = 1
-            for v in col:
-                doc[row_index[row_count]] = v
-                row_count = row_count + 1
-                #print(f"colorder {doc}")
-            print(f"{doc_count} {doc}")
-            collection.insert_one(doc)
+        # transposing needs the whole block in memory
+        docs = col_order_docs(Array2d.from_rows(rows), row_index, col_index)
     else:
-        for row in a2d.row_order():
-            doc = {}
-            doc_count = doc_count + 1
-            doc["title"] = row_index[row_count]
-            row_count = row_count + 1
-            col_count = 1
-            for v in row:
-                doc[col_index[col_count]] = v
-                col_count = col_count + 1
-            print(f"{doc_count} {doc}")
-            collection.insert_one(doc)
+        docs = row_order_docs(rows, row_index, col_index)
 
+    doc_count = insert_batches(collection, docs, args.batchsize)
+    print(f"Inserted {doc_count} docs")
 
     # for row in sh.sheet.iter_rows(min_row=args.minrow+1,
     #                               min_col=args.mincol+1,
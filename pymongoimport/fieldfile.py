@@ -5,9 +5,9 @@ Created on 2 Mar 2016
 """
 
 import os
-import toml
 from enum import Enum
 from datetime import datetime
+from typing import List
 
 from pymongoimport.type_converter import Converter
 from pymongoimport.filereader import FileReader
@@ -30,6 +30,11 @@ class FieldNames(Enum):
     NAME = "name"
     TYPE = "type"
     FORMAT = "format"
+    SKIP = "skip"
+    INDEX = "index"
+    TIMESERIES = "timeseries"
+    GRANULARITY = "granularity"
+    CARDINALITY = "cardinality"
 
     def __str__(self):
         return self.value
@@ -43,6 +48,19 @@ class FieldFile(object):
       type = the type of this field, int, float, str, date,
       format = the way the content will be formatted for now really only used to date
       name = an optional name field. If not present the section name will be used.
+      skip = an optional boolean. If true the column is dropped before any type
+             conversion is done (see `projected_fields`).
+      index = an optional index on the field, created after the load:
+              true, 1, -1, "unique", "hashed", "text" or "2dsphere"
+              (see `pymongoimport.indexes`).
+      timeseries = "time" or "meta". Makes the collection a time-series collection
+              with this field as its timeField (which must be a datetime, date
+              or timestamp) or metaField. Only one of each is allowed.
+      granularity = "seconds", "minutes" or "hours". The time-series granularity,
+              only on the timeseries = "time" field.
+      cardinality = "low" or "high". Whether the parser keeps a dictionary of
+              the column's distinct values (see `pymongoimport.valuedictionary`).
+              If absent the column is sampled.
 
       If the name field is "_id" then this will be used as the _id field in the collection.
       Only one name =_id can be present in any fieldConfig file.
@@ -69,12 +87,18 @@ class FieldFile(object):
 
     DEFAULT_EXTENSION=".tff"
 
+    TIME_TYPES = ["datetime", "date", "timestamp"]
+    GRANULARITIES = ["seconds", "minutes", "hours"]
+    CARDINALITIES = ["low", "high"]
+
     def __init__(self, name):
 
         self._name = name
         self._fields = None
         self._field_dict = {}
         self._idField = None
+        self._time_field = None
+        self._meta_field = None
 
         if os.path.exists(self._name):
             self.read(self._name)
@@ -134,19 +158,27 @@ class FieldFile(object):
                 # ff_file.write(f"type={t}\n")
                 # ff_file.write(f"name={name}")
 
-            with open(ff_filename, "w") as ff_file:
-                #print(toml_dict)
-                toml_string = toml.dumps(toml_dict)
-                ff_file.write("#\n")
-                ts=datetime.utcnow()
-                ff_file.write(f"# Created '{ff_filename}' at UTC:{ts} by class {__name__}\n")
-                ff_file.write("#\n")
-                ff_file.write(toml_string)
-                ff_file.write(f"#end\n")
+            FieldFile.write_field_file(ff_filename, toml_dict)
 
         return FieldFile(ff_filename)
 
+    @staticmethod
+    def write_field_file(ff_filename, toml_dict):
+        import toml
+
+        with open(ff_filename, "w") as ff_file:
+            #print(toml_dict)
+            toml_string = toml.dumps(toml_dict)
+            ff_file.write("#\n")
+            ts=datetime.utcnow()
+            ff_file.write(f"# Created '{ff_filename}' at UTC:{ts} by class {__name__}\n")
+            ff_file.write("#\n")
+            ff_file.write(toml_string)
+            ff_file.write(f"#end\n")
+        return ff_filename
+
     def read(self, filename):
+        import toml
 
         toml_data = ""
 
@@ -172,14 +204,24 @@ class FieldFile(object):
             # print( "section: '%s'" % s )
             for field_name, field_value in column_value.items():
                 # print("option : '%s'" % o )
-                if FieldNames[field_name.upper()] not in FieldNames:
-                    raise ValueError(f"Invalid field name: {field_name} in section: {column_name}")
+                try:
+                    FieldNames[field_name.upper()]
+                except KeyError:
+                    raise FieldFileException(f"Invalid field name: {field_name} in section: {column_name}")
                 if field_name == "name":
                     if field_value == "_id":
                         if self._idField is None:
                             self._idField = column_name
                         else:
                             raise ValueError(f"Duplicate _id field:{column_name} appears more than once as _id")
+                if field_name == "timeseries":
+                    self._read_timeseries(column_name, column_value)
+                if field_name == "cardinality" and field_value not in FieldFile.CARDINALITIES:
+                    raise FieldFileException(f"Invalid cardinality: {field_value} in section: {column_name} "
+                                             f"(valid values: {FieldFile.CARDINALITIES})")
+                if field_name == "granularity" and column_value.get("timeseries") != "time":
+                    raise FieldFileException(f"granularity is only allowed on the timeseries = \"time\" field, "
+                                             f"not in section: {column_name}")
 
             if not "name" in column_value.keys():
                 toml_dict[column_name]["name"] = column_name
@@ -189,10 +231,52 @@ class FieldFile(object):
             if not "format" in column_value.keys():
                 toml_dict[column_name]["format"] = None
 
+            if not "skip" in column_value.keys():
+                toml_dict[column_name]["skip"] = False
+
+        if self._meta_field is not None and self._time_field is None:
+            raise FieldFileException(f"The meta field {self._meta_field} needs a timeseries = \"time\" field")
+
         self._field_dict = toml_dict
 
         return self._field_dict
 
+    def _read_timeseries(self, column_name, column_value):
+        role = column_value["timeseries"]
+        if role == "time":
+            if self._time_field is not None:
+                raise FieldFileException(f"Duplicate time field: {column_name} and {self._time_field}")
+            if column_value.get("type") not in FieldFile.TIME_TYPES:
+                raise FieldFileException(f"The time field {column_name} must have a type in {FieldFile.TIME_TYPES}")
+            granularity = column_value.get("granularity")
+            if granularity is not None and granularity not in FieldFile.GRANULARITIES:
+                raise FieldFileException(f"Invalid granularity: {granularity} in section: {column_name} "
+                                         f"(valid values: {FieldFile.GRANULARITIES})")
+            self._time_field = column_name
+        elif role == "meta":
+            if self._meta_field is not None:
+                raise FieldFileException(f"Duplicate meta field: {column_name} and {self._meta_field}")
+            self._meta_field = column_name
+        else:
+            raise FieldFileException(f"Invalid timeseries value: {role} in section: {column_name} "
+                                     f"(valid values: 'time', 'meta')")
+
+    def timeseries_options(self):
+        """
+        The `timeseries` options for creating the collection, None unless the
+        field file has a timeseries = "time" field. Fields are referred to by
+        the name they are written as.
+        """
+        if self._time_field is None:
+            return None
+        options = {"timeField": self.name_value(self._time_field)}
+        if self._meta_field is not None:
+            options["metaField"] = self.name_value(self._meta_field)
+        granularity = self._field_dict[self._time_field].get("granularity")
+        if granularity:
+            options["granularity"] = granularity
+        return options
+
     @property
     def field_dict(self):
         if self._field_dict is None:
@@ -218,5 +302,43 @@ class FieldFile(object):
         return self._field_dict[fieldName]["name"]
         # return self._cfg.get(fieldName, "name")
 
+    def skip_value(self, fieldName):
+        return self._field_dict[fieldName]["skip"]
+
+    def index_value(self, fieldName):
+        return self._field_dict[fieldName].get("index")
+
+    def cardinality_value(self, fieldName):
+        return self._field_dict[fieldName].get("cardinality")
+
+    def projected_fields(self, include: List[str] = None, exclude: List[str] = None) -> List[str]:
+        """
+        Return the fields that survive column projection in field file order.
+
+        If `include` is given only those fields are kept, otherwise all fields
+        are kept. Fields in `exclude`, fields marked `skip = true` and
+        `blank-` fields are then dropped. An explicit `include` overrides
+        a `skip = true` in the field file.
+
+        :param include: list of field names to keep (None for all fields)
+        :param exclude: list of field names to drop
+        :return: the list of field names to be converted
+        """
+        for name in (include or []) + (exclude or []):
+            if name not in self._field_dict:
+                raise FieldFileException(f"No such field '{name}' in {self._name}")
+
+        if include:
+            include = set(include)
+            fields = [k for k in self._fields if k in include]
+        else:
+            fields = [k for k in self._fields if not self.skip_value(k)]
+
+        if exclude:
+            exclude = set(exclude)
+            fields = [k for k in fields if k not in exclude]
+
+        return [k for k in fields if not k.startswith("blank-")]
+
     def __repr__(self):
         return f"filename:{self._name}\ndict:\n{self._field_dict}\n"
@@ -0,0 +1,107 @@
+"""
+=====================================
+File discovery
+=====================================
+
+Turn the names given on the command line (files, directories, glob patterns
+and URLs) into a stream of input files. Directories are walked lazily with
+`os.scandir` so the first file can be imported before the whole tree has
+been read. Field files (`.tff`, `.ff`) and hidden files found while walking
+a directory are ignored.
+
+Files can optionally be sorted largest first, which balances the load when
+they are handed to a pool of workers, but that means discovering every file
+before the first one is returned.
+"""
+import glob
+import os
+from typing import Iterable, Iterator, List, Set, Tuple
+
+IGNORED_EXTENSIONS = [".tff", ".ff"]
+
+
+def is_url(name: str) -> bool:
+    return name.startswith("http://") or name.startswith("https://")
+
+
+def file_key(name: str) -> Tuple[str, int, float]:
+    """
+    The (absolute path, size, modification time) that identifies a version of
+    a local file in the `Audit` manifest of imported files.
+    """
+    st = os.stat(name)
+    return os.path.abspath(name), st.st_size, st.st_mtime
+
+
+def read_filelist(filename: str) -> List[str]:
+    """
+    Read file names one per line, ignoring blank lines and lines starting with '#'.
+    """
+    with open(filename, "r") as input_file:
+        return [line.strip() for line in input_file if line.strip() and not line.lstrip().startswith("#")]
+
+
+def scan_directory(path: str) -> Iterator[str]:
+    """
+    Yield the files below `path` in sorted order, depth first.
+    """
+    try:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            yield from scan_directory(entry.path)
+        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() not in IGNORED_EXTENSIONS:
+            yield entry.path
+
+
+def expand_name(name: str) -> Iterator[str]:
+    """
+    Expand a single command line name into files. A name that doesn't exist
+    and isn't a pattern is passed through so that the importer reports it.
+    """
+    if is_url(name):
+        yield name
+    elif os.path.isdir(name):
+        yield from scan_directory(name)
+    elif glob.has_magic(name):
+        for match in sorted(glob.iglob(name, recursive=True)):
+            if os.path.isdir(match):
+                yield from scan_directory(match)
+            elif os.path.splitext(match)[1].lower() not in IGNORED_EXTENSIONS:
+                yield match
+    else:
+        yield name
+
+
+def discover_files(names: Iterable[str],
+                   sort_by_size: bool = False,
+                   skip: Set[Tuple[str, int, float]] = None) -> Iterator[str]:
+    """
+    Yield each input file once.
+
+    :param names: files, directories, glob patterns or URLs
+    :param sort_by_size: return local files largest first (after all have been found)
+    :param skip: `file_key` values of files that have already been imported
+    """
+    seen = set()
+
+    def found():
+        for name in names:
+            for f in expand_name(name):
+                key = f if is_url(f) else os.path.abspath(f)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if skip and os.path.isfile(f) and file_key(f) in skip:
+                    continue
+                yield f
+
+    if sort_by_size:
+        yield from sorted(found(), key=lambda f: os.path.getsize(f) if os.path.isfile(f) else 0, reverse=True)
+    else:
+        yield from found()
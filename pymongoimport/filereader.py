@@ -1,8 +1,10 @@
-import csv
+import io
+import itertools
+import sys
 from datetime import datetime
 from typing import Iterator, List
 
-import requests
+from pymongoimport.tokenizer import Tokenizer, TokenizerType, make_tokenizer, peek
 
 
 class FileReader:
@@ -13,17 +15,22 @@ class FileReader:
 
     UTF_ENCODING = "utf-8"
     URL_CHUNK_SIZE = 8192
+    SAMPLE_SIZE = 100  # lines used to pick a tokenizer for TokenizerType.AUTO
+    STDIN_NAMES = ["-", "/dev/stdin"]
 
     def __init__(self,
                  name: str,
                  has_header: bool = False,
                  delimiter: str = ",",
-                 limit: int = 0):
+                 limit: int = 0,
+                 tokenizer: TokenizerType = TokenizerType.CSV):
 
         self._name: str = name
         self._limit = limit
         self._has_header = has_header
         self._header_line = None
+        self._tokenizer_type = TokenizerType(tokenizer)
+        self._tokenizer = None
 
         if delimiter == "tab":
             self._delimiter = "\t"
@@ -42,8 +49,38 @@ class FileReader:
     def delimiter(self):
         return self._delimiter
 
+    @property
+    def tokenizer(self) -> Tokenizer:
+        """
+        The tokenizer in use. For TokenizerType.AUTO this is only known once
+        reading has started.
+        """
+        return self._tokenizer
+
+    def tokenize(self, iterator: Iterator[str]) -> Iterator[List[str]]:
+        if self._tokenizer_type is TokenizerType.AUTO:
+            sample, iterator = peek(iterator, FileReader.SAMPLE_SIZE)
+            self._tokenizer = make_tokenizer(self._tokenizer_type, self._delimiter, sample)
+        else:
+            self._tokenizer = make_tokenizer(self._tokenizer_type, self._delimiter)
+        return self._tokenizer.rows(iterator)
+
+    def limit_rows(self,
+                   reader: Iterator[List[str]],
+                   limit: int = 0) -> Iterator[List[str]]:
+        """
+        Strip the header line if there is one and stop after limit rows.
+        """
+        if self._has_header and self._header_line is None:
+            self._header_line = next(reader)
+
+        if limit > 0:
+            yield from itertools.islice(reader, limit)
+        else:
+            yield from reader
+
     def iterate_rows(self,
-                     iterator: Iterator[List[str]],
+                     iterator: Iterator[str],
                      limit: int = 0) -> Iterator[List[str]]:
         """
         Iterate rows in a presumed CSV file.
@@ -53,18 +90,7 @@ class FileReader:
         :return: An iterator providing parsed lines.
         """
 
-        # size = 0
-
-        reader = csv.reader(iterator, delimiter=self._delimiter)
-
-        if self._has_header and self._header_line is None:
-            self._header_line = next(reader)
-
-        for i, row in enumerate(reader, 1):
-            if (limit > 0) and (i > limit):
-                    break
-            else:
-                yield row
+        yield from self.limit_rows(self.tokenize(iterator), limit)
 
     def __iter__(self):
         return self
@@ -72,14 +98,41 @@ class FileReader:
     def __next__(self):
         yield from self.readline(limit=0)
 
+    @staticmethod
+    def is_stdin(name: str) -> bool:
+        return name in FileReader.STDIN_NAMES
+
     def readline(self, limit:int = 0) -> Iterator[List[str]]:
         if self._name.startswith("http"):
             yield from self.read_url_file(limit=limit)
+        elif FileReader.is_stdin(self._name):
+            yield from self.read_stdin(limit=limit)
         else:
             yield from self.read_local_file(limit=limit)
 
+    def read_stdin(self, limit: int = 0) -> Iterator[List[str]]:
+        """
+        Stream rows from standard input (e.g. `zcat data.csv.gz | pymongoimport -`)
+        without writing them to a temporary file. The arrow tokenizer needs a file
+        it can open by name so the csv tokenizer is used instead.
+        """
+        if self._tokenizer_type is TokenizerType.ARROW:
+            self._tokenizer_type = TokenizerType.CSV
+
+        if hasattr(sys.stdin, "buffer"):
+            stdin = io.TextIOWrapper(sys.stdin.buffer, encoding=FileReader.UTF_ENCODING, newline="")
+        else:  # already a text stream
+            stdin = sys.stdin
+        try:
+            yield from self.iterate_rows(stdin, limit=limit)
+        finally:
+            if stdin is not sys.stdin:
+                stdin.detach()  # don't close sys.stdin
+
     @staticmethod
     def read_remote_by_line(url: str) -> Iterator[List[str]]:
+        import requests  # only URL inputs need it and it is slow to import
+
         with requests.get(url, stream=True) as r:
             r.raise_for_status()
             residue=None
@@ -101,5 +154,9 @@ class FileReader:
 
     def read_local_file(self, limit: int = 0) -> Iterator[List[str]]:
 
-        with open(self._name, newline="") as csv_file:
-            yield from self.iterate_rows(csv_file, limit=limit)
+        if self._tokenizer_type is TokenizerType.ARROW:
+            self._tokenizer = make_tokenizer(self._tokenizer_type, self._delimiter)
+            yield from self.limit_rows(iter(self._tokenizer.read_file(self._name)), limit=limit)
+        else:
+            with open(self._name, newline="") as csv_file:
+                yield from self.iterate_rows(csv_file, limit=limit)
@@ -6,6 +6,8 @@ Created on 23 Jul 2017
 
 """
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import os
 import logging
@@ -16,6 +18,7 @@ from pymongo import errors
 
 from pymongoimport.filereader import FileReader
 from pymongoimport.linetodictparser import LineToDictParser
+from pymongoimport.memorybudget import MemoryBudget
 def seconds_to_duration(seconds):
     delta = timedelta(seconds=seconds)
     d = datetime(1, 1, 1) + delta
@@ -29,12 +32,40 @@ class FileWriter(object):
                  reader: FileReader,
                  parser: LineToDictParser,
                  audit_collection : pymongo.collection =None,
-                 batch_size: int = 1000):
+                 batch_size: int = 1000,
+                 flush_interval: float = None,
+                 batch_bytes: int = 0,
+                 in_flight: int = 1,
+                 ordered: bool = True,
+                 router=None,
+                 sort_key=None,
+                 memory_budget: MemoryBudget = None):
+        """
+        :param batch_size: the maximum number of docs in each insert_many
+        :param flush_interval: insert a part filled batch once it is this many
+               seconds old when the reader is idle (see `write`)
+        :param batch_bytes: also end a batch once its input rows add up to
+               about this many bytes (0 for no limit)
+        :param in_flight: the number of batches that may be being inserted
+               while the next one is parsed
+        :param ordered: passed to insert_many
+        :param router: a `ShardRouter` to split each batch into an insert per shard
+        :param sort_key: sort each batch by this key before it is inserted
+        :param memory_budget: end batches early and wait for in flight inserts
+               rather than read more input while it is exceeded
+        """
 
         self._logger = logging.getLogger(__name__)
         self._collection = doc_collection
         self._audit_collection = audit_collection
         self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._batch_bytes = batch_bytes
+        self._in_flight = max(1, in_flight)
+        self._ordered = ordered
+        self._router = router
+        self._sort_key = sort_key
+        self._memory_budget = memory_budget
         self._totalWritten = 0
         self._reader = reader
         self._parser = parser
@@ -75,45 +106,156 @@ class FileWriter(object):
                 dummy = f.readline()
         return line_count
 
+    def commit(self):
+        """
+        Tell a reader that keeps a checkpoint (e.g. `FileFollower`) that
+        everything it has returned so far has been written.
+        """
+        commit = getattr(self._reader, "commit", None)
+        if commit:
+            commit()
+
+    @staticmethod
+    def row_size(row) -> int:
+        """
+        The approximate size in bytes of an input row. Only used to limit
+        batches to batch_bytes so it doesn't need to be exact.
+        """
+        values = row.values() if isinstance(row, dict) else row
+        return sum(len(v) if isinstance(v, str) else 8 for v in values)
+
+    def _insert(self, docs):
+        return self._collection.insert_many(docs, ordered=self._ordered)
+
+    def _flush(self, docs, pending: deque, executor: ThreadPoolExecutor) -> int:
+        """
+        Insert a batch, as one insert per shard if there is a router. With
+        more than one batch in flight the inserts run on the executor and
+        this only waits for (and counts) the oldest once in_flight of them
+        are outstanding.
+
+        :return: the number of docs in inserts that have completed
+        """
+        if self._sort_key:
+            docs.sort(key=self._sort_key)
+        batches = self._router.group(docs).values() if self._router else [docs]
+        written = 0
+        if executor is None:
+            for batch in batches:
+                written = written + len(self._insert(batch).inserted_ids)
+            self.commit()
+            self.drained()
+            return written
+        for batch in batches:
+            pending.append(executor.submit(self._insert, batch))
+        while len(pending) >= self._in_flight or (pending and self.over_budget()):
+            written = written + len(pending.popleft().result().inserted_ids)
+        if not pending:
+            self.drained()
+        return written
+
+    def drained(self):
+        """
+        Nothing is buffered or being inserted, so the memory now in use is
+        what the process keeps (see `MemoryBudget.drained`).
+        """
+        if self._memory_budget is not None:
+            self._memory_budget.drained()
+
+    def over_budget(self, rows: int = 0) -> bool:
+        """
+        :param rows: the rows in the current batch, the budget is only
+               checked every `MemoryBudget.CHECK_ROWS` rows
+        """
+        if self._memory_budget is None or rows % MemoryBudget.CHECK_ROWS:
+            return False
+        return self._memory_budget.exceeded()
+
     def write(self, limit=0, restart=False):
+        """
+        Insert the docs parsed from the reader in batches of batch_size.
+
+        A reader may yield None when it has nothing new to read (e.g. a
+        `FileFollower` at the end of the file). If flush_interval is set a
+        part filled batch is then inserted once it is flush_interval seconds
+        old, so a slow trickle of lines still lands promptly.
+        """
 
         total_written = 0
-        time_start = time.time()
-        inserted_this_quantum = 0
+        load_start = time.time()
+        time_start = load_start
+        batch_start = time_start
+        batch_bytes = 0
         total_read = 0
         insert_list = []
+        pending = deque()
+        executor = ThreadPoolExecutor(self._in_flight) if self._in_flight > 1 else None
+        line_number = getattr(self._reader, "first_line_number", 1) - 1
         try:
-            for i, line in enumerate(self._reader.readline(limit=limit), 1):
-                insert_list.append(self._parser.parse_list(line, i))
-                if len(insert_list) % self._batch_size == 0:
-                    results = self._collection.insert_many(insert_list)
-                    total_written = total_written + len(results.inserted_ids)
-                    inserted_this_quantum = inserted_this_quantum + len(results.inserted_ids)
-
-                    time_now = time.time()
-                    elapsed = time_now - time_start
-                    docs_per_second = len(insert_list) / elapsed
-                    time_start = time_now
+            for line in self._reader.readline(limit=limit):
+                if line is not None:
+                    line_number = line_number + 1
+                    doc = self._parser.parse_list(line, line_number)
+                    if doc is None:  # rejected by the --where filter
+                        continue
+                    if not insert_list:
+                        batch_start = time.time()
+                    insert_list.append(doc)
+                    if self._batch_bytes:
+                        batch_bytes = batch_bytes + FileWriter.row_size(line)
+                    if len(insert_list) < self._batch_size and \
+                            not (self._batch_bytes and batch_bytes >= self._batch_bytes) and \
+                            not self.over_budget(len(insert_list)):
+                        continue
+                elif not (insert_list and self._flush_interval is not None and
+                          time.time() - batch_start >= self._flush_interval):
+                    continue
+
+                written = self._flush(insert_list, pending, executor)
+                total_written = total_written + written
+                self._parser.end_batch()
+
+                time_now = time.time()
+                elapsed = time_now - time_start
+                docs_per_second = written / elapsed
+                time_start = time_now
+                insert_list = []
+                batch_bytes = 0
+                self._logger.info(
+                        f"Input:'{self._reader.name}': docs per sec:{docs_per_second:7.0f}, \
+                        total docs:{total_written:>10}")
+
+            if len(insert_list) > 0:
+                # print(insert_list)
+                try:
+                    total_written = total_written + self._flush(insert_list, pending, executor)
                     insert_list = []
-                    self._logger.info(
-                            f"Input:'{self._reader.name}': docs per sec:{docs_per_second:7.0f}, \
-                            total docs:{total_written:>10}")
+                except errors.BulkWriteError as e:
+                    self._logger.error(f"pymongo.errors.BulkWriteError: {e.details}")
+
+            while pending:
+                try:
+                    total_written = total_written + len(pending.popleft().result().inserted_ids)
+                except errors.BulkWriteError as e:
+                    self._logger.error(f"pymongo.errors.BulkWriteError: {e.details}")
+            self._parser.end_batch()
+            self._logger.info("Input: '%s' : Inserted %i records", self._reader.name, total_written)
 
         except UnicodeDecodeError as exp:
             if self._logger:
                 self._logger.error(exp)
                 self._logger.error("Error on line:%i", total_read + 1)
             raise;
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
 
-        if len(insert_list) > 0:
-            # print(insert_list)
-            try:
-                results = self._collection.insert_many(insert_list)
-                total_written = total_written + len(results.inserted_ids)
-                self._logger.info("Input: '%s' : Inserted %i records", self._reader.name, total_written)
-            except errors.BulkWriteError as e:
-                self._logger.error(f"pymongo.errors.BulkWriteError: {e.details}")
+        if self._parser.row_filter:
+            self._logger.info("Input: '%s' : %i records rejected by --where '%s'",
+                              self._reader.name,
+                              self._parser.row_filter.rejected,
+                              self._parser.row_filter.expression)
 
         finish = time.time()
-        self._logger.info("Total elapsed time to upload '%s' : %s", self._reader.name, seconds_to_duration(finish - time_start))
+        self._logger.info("Total elapsed time to upload '%s' : %s", self._reader.name, seconds_to_duration(finish - load_start))
         return total_written
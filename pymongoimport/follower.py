@@ -0,0 +1,165 @@
+"""
+=====================================
+FileFollower
+=====================================
+
+Follow a CSV file that is being appended to, like `tail -f`. Complete lines
+(ones ending in a newline) are returned as they are written. A partial line
+at the end of the file is held back until the rest of it arrives.
+
+While there is nothing new to read `readline` yields `None` every
+`poll_interval` seconds so that `FileWriter` can flush a part filled batch
+when its deadline passes.
+
+The byte offset and line number of the last line returned are saved to a
+checkpoint file by `commit`, which `FileWriter` calls after each batch is
+inserted. A new follower resumes from the checkpoint instead of reading the
+file from the start. Lines read but not yet committed are read again after a
+restart, so no lines are lost. If the file is truncated or replaced (e.g. by
+log rotation) it is read again from the start.
+
+Each line is tokenized on its own so quoted fields can't contain newlines.
+"""
+import json
+import logging
+import os
+import time
+from typing import Iterator, List
+
+from pymongoimport.filereader import FileReader
+from pymongoimport.tokenizer import TokenizerType, make_tokenizer
+
+
+class FileFollower(FileReader):
+
+    CHECKPOINT_EXTENSION = ".offset"
+
+    def __init__(self,
+                 name: str,
+                 has_header: bool = False,
+                 delimiter: str = ",",
+                 tokenizer: TokenizerType = TokenizerType.CSV,
+                 poll_interval: float = 1.0,
+                 checkpoint: str = None):
+        """
+        :param name: a local file
+        :param poll_interval: seconds to wait at the end of the file before looking again
+        :param checkpoint: the checkpoint file (default: name + CHECKPOINT_EXTENSION)
+        """
+        # AUTO needs a sample of lines up front and ARROW reads whole files
+        if TokenizerType(tokenizer) in [TokenizerType.AUTO, TokenizerType.ARROW]:
+            tokenizer = TokenizerType.CSV
+        super().__init__(name, has_header=has_header, delimiter=delimiter, tokenizer=tokenizer)
+        self._log = logging.getLogger(__name__)
+        self._poll_interval = poll_interval
+        self._checkpoint = checkpoint or name + FileFollower.CHECKPOINT_EXTENSION
+        self._stopped = False
+        self._inode = None
+        self._offset = 0
+        self._line_number = 0
+        self.read_checkpoint()
+        self._first_line_number = self._line_number + 1
+
+    @property
+    def checkpoint(self) -> str:
+        return self._checkpoint
+
+    @property
+    def offset(self) -> int:
+        """
+        The byte offset just past the last line returned.
+        """
+        return self._offset
+
+    @property
+    def first_line_number(self) -> int:
+        """
+        The line number of the first line this follower returns.
+        """
+        return self._first_line_number
+
+    def stop(self):
+        self._stopped = True
+
+    def read_checkpoint(self):
+        if not os.path.isfile(self._checkpoint):
+            return
+        with open(self._checkpoint, "r") as checkpoint_file:
+            state = json.load(checkpoint_file)
+        try:
+            st = os.stat(self._name)
+        except FileNotFoundError:
+            return
+        if state.get("inode") == st.st_ino and state.get("offset", 0) <= st.st_size:
+            self._offset = state["offset"]
+            self._line_number = state.get("line", 0)
+            self._header_line = state.get("header")
+            self._log.info(f"Resuming '{self._name}' at line {self._line_number + 1} (byte {self._offset})")
+        else:
+            self._log.info(f"'{self._name}' has been replaced since checkpoint '{self._checkpoint}', reading from the start")
+
+    def commit(self):
+        """
+        Save the position after the last line returned to the checkpoint file.
+        """
+        state = {"offset": self._offset,
+                 "line": self._line_number,
+                 "inode": self._inode,
+                 "header": self._header_line}
+        temp = self._checkpoint + ".tmp"
+        with open(temp, "w") as checkpoint_file:
+            json.dump(state, checkpoint_file)
+        os.replace(temp, self._checkpoint)
+
+    def _reset(self):
+        self._offset = 0
+        self._line_number = 0
+        if self._has_header:
+            self._header_line = None
+
+    def _replaced(self, f) -> bool:
+        try:
+            st = os.stat(self._name)
+        except FileNotFoundError:  # being rotated, wait for the new file
+            return False
+        return st.st_ino != os.fstat(f.fileno()).st_ino or st.st_size < self._offset
+
+    def _row(self, line: bytes) -> List[str]:
+        return next(iter(self._tokenizer.rows([line.decode(FileReader.UTF_ENCODING)])), [])
+
+    def readline(self, limit: int = 0) -> Iterator[List[str]]:
+        """
+        Yield each complete row as it is appended, and None whenever there is
+        nothing new for poll_interval seconds, until `stop` is called.
+        """
+        self._tokenizer = make_tokenizer(self._tokenizer_type, self._delimiter)
+        while not self._stopped:
+            with open(self._name, "rb") as f:
+                if self._inode is not None and self._inode != os.fstat(f.fileno()).st_ino:
+                    self._log.info(f"'{self._name}' has been replaced, reading from the start")
+                    self._reset()
+                self._inode = os.fstat(f.fileno()).st_ino
+                f.seek(self._offset)
+                partial = b""
+                while not self._stopped:
+                    partial = partial + f.readline()
+                    if partial.endswith(b"\n"):
+                        line = partial
+                        partial = b""
+                        self._offset = self._offset + len(line)
+                        row = self._row(line)
+                        if not row:  # blank line
+                            continue
+                        if self._has_header and self._header_line is None:
+                            self._header_line = row
+                            continue
+                        self._line_number = self._line_number + 1
+                        yield row
+                    else:
+                        yield None
+                        time.sleep(self._poll_interval)
+                        if self._replaced(f):
+                            if os.stat(self._name).st_ino == self._inode:  # truncated in place
+                                self._log.info(f"'{self._name}' has been truncated, reading from the start")
+                                self._reset()
+                            break
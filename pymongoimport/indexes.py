@@ -0,0 +1,136 @@
+"""
+=====================================
+Index management
+=====================================
+
+Every insert into a collection also updates each of its secondary indexes,
+so loading into a collection with several indexes is much slower than
+loading into a bare one. With **--deferindexes** the secondary indexes are
+captured and dropped before the load and rebuilt afterwards, once for the
+whole run rather than once per file.
+
+Unique indexes are left in place: duplicates loaded while a unique index
+was missing would make its rebuild fail, after the load had succeeded.
+
+Indexes can also be declared in a field file with the `index` option and
+are created once the load has finished::
+
+    [Borough]
+    type = "str"
+    index = true        # or 1, -1, "unique", "hashed", "text", "2dsphere"
+
+All the indexes are rebuilt with a single `createIndexes` command so the
+server builds them together in one scan of the collection.
+"""
+import logging
+import time
+from typing import List
+
+import pymongo
+from pymongo import IndexModel
+
+from pymongoimport.fieldfile import FieldFile, FieldFileException
+
+# list_indexes fields that describe the index rather than being create_index options
+SPEC_FIELDS = ["key", "ns", "v"]
+
+
+def index_model(spec: dict) -> IndexModel:
+    """
+    Turn an index document from `list_indexes` back into an `IndexModel`.
+    """
+    options = {k: v for k, v in spec.items() if k not in SPEC_FIELDS}
+    return IndexModel(list(spec["key"].items()), **options)
+
+
+def field_index_model(name: str, index) -> IndexModel:
+    """
+    The `IndexModel` for a field file `index` option on the field `name`.
+    """
+    if index is True or index == 1:
+        return IndexModel([(name, pymongo.ASCENDING)])
+    elif index == -1:
+        return IndexModel([(name, pymongo.DESCENDING)])
+    elif index == "unique":
+        return IndexModel([(name, pymongo.ASCENDING)], unique=True)
+    elif index in [pymongo.HASHED, pymongo.TEXT, pymongo.GEOSPHERE]:
+        return IndexModel([(name, index)])
+    else:
+        raise FieldFileException(f"Invalid index '{index}' for field '{name}' (valid values: "
+                                 "true, 1, -1, 'unique', 'hashed', 'text', '2dsphere')")
+
+
+def field_file_indexes(field_file: FieldFile) -> List[IndexModel]:
+    """
+    The indexes declared in a field file, on the names the fields are written as.
+    """
+    if field_file is None:
+        return []
+    return [field_index_model(field_file.name_value(f), field_file.index_value(f))
+            for f in field_file.fields() if field_file.index_value(f) not in [None, False]]
+
+
+class DeferredIndexes(object):
+    """
+    Capture the secondary indexes of a collection so they can be dropped
+    before a load and rebuilt after it.
+    """
+
+    def __init__(self, collection: pymongo.collection.Collection):
+        self._log = logging.getLogger(__name__)
+        self._collection = collection
+        self._specs = []
+        self._build_seconds = 0.0
+
+    @property
+    def specs(self) -> List[dict]:
+        return self._specs
+
+    @property
+    def build_seconds(self) -> float:
+        """
+        How long the last `build` took.
+        """
+        return self._build_seconds
+
+    def capture(self) -> List[dict]:
+        """
+        Record the index documents of every index except the _id index and
+        unique indexes.
+        """
+        specs = [dict(i) for i in self._collection.list_indexes() if i["name"] != "_id_"]
+        for s in specs:
+            if s.get("unique"):
+                self._log.warning(f"Not dropping unique index '{s['name']}' on {self._collection.full_name}: "
+                                  f"duplicates loaded without it would make the rebuild fail")
+        self._specs = [s for s in specs if not s.get("unique")]
+        return self._specs
+
+    def drop(self) -> List[str]:
+        """
+        Capture and drop the secondary indexes that aren't unique.
+
+        :return: the names of the dropped indexes
+        """
+        names = [i["name"] for i in self.capture()]
+        for name in names:
+            self._log.info(f"Dropping index '{name}' on {self._collection.full_name} until the load is finished")
+            self._collection.drop_index(name)
+        return names
+
+    def build(self, extra: List[IndexModel] = None) -> List[str]:
+        """
+        Rebuild the captured indexes together with `extra` (e.g. the indexes
+        declared in a field file).
+
+        :return: the names of the indexes built
+        """
+        models = [index_model(s) for s in self._specs] + (extra or [])
+        self._build_seconds = 0.0
+        if not models:
+            return []
+        start = time.time()
+        names = self._collection.create_indexes(models)
+        self._build_seconds = time.time() - start
+        self._log.info(f"Built indexes {names} on {self._collection.full_name} in {self._build_seconds:.1f} seconds")
+        return names
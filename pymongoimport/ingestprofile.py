@@ -0,0 +1,82 @@
+"""
+=====================================
+Ingest profiles
+=====================================
+
+Named sets of write settings that trade throughput against durability so
+that users pick a profile rather than combining `--writeconcern`,
+`--journal`, `--batchsize` and friends by hand.
+
+bulk
+    Acknowledged by the primary only, no journal wait, unordered inserts,
+    large batches and several batches in flight. For initial loads that can
+    simply be rerun if they fail.
+
+balanced
+    Acknowledged by the primary, unordered inserts, default sized batches
+    with two in flight.
+
+durable
+    Acknowledged by a majority of the replica set and journaled, ordered
+    inserts and one batch in flight, so a failure stops at a known line.
+
+Every profile asks for wire compression with whichever of zstd and snappy
+are installed (`zstandard`, `python-snappy`), falling back to zlib.
+
+`python -m pymongoimport.benchmark` (or `make benchmark`) loads a file with
+each profile and reports the docs per second achieved against your cluster.
+"""
+from enum import Enum
+from typing import List, NamedTuple, Union
+
+
+class IngestProfile(Enum):
+    BULK = "bulk"
+    BALANCED = "balanced"
+    DURABLE = "durable"
+
+    def __str__(self):
+        return self.value
+
+
+class ProfileSettings(NamedTuple):
+    w: Union[int, str]      # write concern
+    j: bool                 # wait for the journal
+    ordered: bool           # stop at the first failed insert in a batch
+    batch_size: int         # docs per insert_many
+    batch_bytes: int        # approximate input bytes per insert_many
+    in_flight: int          # batches being inserted while the next is parsed
+
+
+PROFILES = {
+    IngestProfile.BULK: ProfileSettings(w=1, j=False, ordered=False,
+                                        batch_size=10000, batch_bytes=16 * 1024 * 1024, in_flight=4),
+    IngestProfile.BALANCED: ProfileSettings(w=1, j=False, ordered=False,
+                                            batch_size=1000, batch_bytes=4 * 1024 * 1024, in_flight=2),
+    IngestProfile.DURABLE: ProfileSettings(w="majority", j=True, ordered=True,
+                                           batch_size=1000, batch_bytes=4 * 1024 * 1024, in_flight=1),
+}
+
+
+def profile_settings(profile: IngestProfile) -> ProfileSettings:
+    return PROFILES[IngestProfile(profile)]
+
+
+def available_compressors() -> List[str]:
+    """
+    The wire compressors pymongo can use here, best first. zlib is in the
+    standard library so it is always available.
+    """
+    compressors = []
+    try:
+        import zstandard  # noqa: F401
+        compressors.append("zstd")
+    except ImportError:
+        pass
+    try:
+        import snappy  # noqa: F401
+        compressors.append("snappy")
+    except ImportError:
+        pass
+    compressors.append("zlib")
+    return compressors
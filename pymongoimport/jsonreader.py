@@ -0,0 +1,218 @@
+"""
+=====================================
+JSONLineReader
+=====================================
+
+Read JSON Lines (NDJSON) files, one JSON document per line. This is the JSON
+counterpart of `FileReader` and provides the same `name`, `header_line` and
+`readline()` interface so it can be driven by `FileWriter`.
+
+Lines are decoded with `orjson` if it is installed, otherwise with the
+standard library `json` module. Blank lines are skipped. A line that isn't
+valid JSON is returned as an `InvalidJSON` so that the parser can reject it
+(or stop the import with **--onerror fail**) and the rest of the file is
+still imported.
+
+Only one document per line is supported. A `.json` file holding a
+pretty-printed document or a top-level array is detected from its first
+line and raises a `JSONLineReaderException` rather than rejecting every
+line.
+
+A reader can be restricted to a `byte_range` of the file so that a single
+large file can be loaded by several processes. A line belongs to the range
+that contains its first byte, so a set of ranges that covers the file reads
+every line exactly once. `first_line_numbers` gives the line number of the
+first line of each range so that errors and rejects are reported at the
+same line as when the whole file is read by one process (line numbers count
+documents, so blank lines are not counted).
+"""
+import os
+from typing import Iterator, List, NamedTuple, Tuple
+
+from pymongoimport.fieldfile import FieldFile
+from pymongoimport.filereader import FileReader
+from pymongoimport.type_converter import Converter
+
+try:
+    import orjson
+
+    loads = orjson.loads
+    JSONDecodeError = orjson.JSONDecodeError
+except ImportError:
+    import json
+
+    loads = json.loads
+    JSONDecodeError = json.JSONDecodeError
+
+
+class JSONLineReaderException(Exception):
+    pass
+
+
+class InvalidJSON(NamedTuple):
+    line: str       # the line as read, up to 200 characters
+    reason: str     # the decoder's error
+
+
+class JSONLineReader(object):
+
+    EXTENSIONS = [".json", ".jsonl", ".ndjson"]
+
+    def __init__(self,
+                 name: str,
+                 limit: int = 0,
+                 byte_range: Tuple[int, int] = None,
+                 first_line_number: int = 1):
+        """
+        :param name: a local file or URL
+        :param limit: Only read up to limit lines (0 for all lines)
+        :param byte_range: (start, end) offsets of the part of a local file to read
+        :param first_line_number: the line number of the first line of the byte range
+        """
+        self._name = name
+        self._limit = limit
+        self._byte_range = byte_range
+        self._first_line_number = first_line_number
+
+    @staticmethod
+    def is_json_file(name: str) -> bool:
+        if name.startswith("http"):
+            name = name.split("?")[0]
+        return os.path.splitext(name)[1].lower() in JSONLineReader.EXTENSIONS
+
+    @staticmethod
+    def opens_document(line: bytes) -> bool:
+        """
+        True if a line that can't be decoded opens a document or array that
+        continues on the next line, e.g. `[`, `{` or `{"item": "Screws",`.
+        """
+        text = line.strip()
+        return text.startswith((b"[", b"{")) and text.endswith((b"[", b"{", b","))
+
+    @staticmethod
+    def byte_ranges(name: str, parts: int) -> List[Tuple[int, int]]:
+        """
+        Split a local file into (at most) `parts` byte ranges of roughly equal size.
+        """
+        size = os.path.getsize(name)
+        parts = max(1, min(parts, size))
+        step = -(-size // parts)  # ceiling division
+        return [(start, min(start + step, size)) for start in range(0, size, step)] or [(0, 0)]
+
+    @staticmethod
+    def first_line_numbers(name: str, byte_ranges: List[Tuple[int, int]]) -> List[int]:
+        """
+        The line number of the first line of each of `byte_ranges` (as
+        returned by `byte_ranges`), found by reading the file up to the start
+        of the last range.
+        """
+        starts = [start for start, _ in byte_ranges]
+        numbers = []
+        count = 0
+        pos = 0
+        with open(name, "rb") as json_file:
+            for line in json_file:
+                while len(numbers) < len(starts) and pos >= starts[len(numbers)]:
+                    numbers.append(count + 1)
+                if len(numbers) == len(starts):
+                    break
+                if line.strip():
+                    count = count + 1
+                pos = pos + len(line)
+        return numbers + [count + 1] * (len(starts) - len(numbers))
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def first_line_number(self) -> int:
+        return self._first_line_number
+
+    @property
+    def header_line(self) -> List[str]:
+        return None
+
+    def read_lines(self) -> Iterator[bytes]:
+        if self._name.startswith("http"):
+            yield from FileReader.read_remote_by_line(self._name)
+            return
+
+        with open(self._name, "rb") as json_file:
+            if self._byte_range is None:
+                yield from json_file
+                return
+
+            start, end = self._byte_range
+            if start > 0:
+                json_file.seek(start - 1)
+                json_file.readline()  # move to the first line that starts in this range
+            pos = json_file.tell()
+            while pos < end:
+                line = json_file.readline()
+                if not line:
+                    break
+                pos = pos + len(line)
+                yield line
+
+    def readline(self, limit: int = 0) -> Iterator[dict]:
+        """
+        Yield the document on each line, or an `InvalidJSON` for a line that
+        can't be decoded.
+        """
+        count = 0
+        first = self._byte_range is None or self._byte_range[0] == 0
+        for line in self.read_lines():
+            if not line.strip():
+                continue
+            try:
+                doc = loads(line)
+            except JSONDecodeError as e:
+                if first and JSONLineReader.opens_document(line):
+                    raise JSONLineReaderException(
+                        f"'{self._name}' looks like a multi-line JSON document or array, "
+                        f"only one JSON object per line (JSON Lines) is supported")
+                doc = InvalidJSON(line[:200].decode("utf-8", "replace"), str(e))
+            first = False
+            yield doc
+            count = count + 1
+            if count == limit:
+                break
+
+    @staticmethod
+    def guess_type(v) -> str:
+        """
+        The Converter type for a decoded JSON value. Strings are examined to
+        see if they hold a number or a date.
+        """
+        if isinstance(v, bool):
+            return "bool"
+        elif isinstance(v, int):
+            return "int"
+        elif isinstance(v, float):
+            return "float"
+        elif isinstance(v, str):
+            return Converter.guess_type(v)
+        else:
+            return "str"
+
+    @staticmethod
+    def generate_field_file(name: str, ff_filename: str = None) -> FieldFile:
+        """
+        Write a field file from the top level keys of the first document in
+        a JSON Lines file. Nested documents and arrays are left as they are
+        by the parser so they are recorded as `str`.
+        """
+        if ff_filename is None:
+            ff_filename = FieldFile.make_default_tff_name(name)
+
+        first_doc = next((d for d in JSONLineReader(name).readline() if isinstance(d, dict)), None)
+        if first_doc is None:
+            raise ValueError(f"No JSON objects in '{name}'")
+
+        toml_dict = {}
+        for key, value in first_doc.items():
+            toml_dict[key] = {"type": JSONLineReader.guess_type(value), "name": key}
+
+        FieldFile.write_field_file(ff_filename, toml_dict)
+        return FieldFile(ff_filename)
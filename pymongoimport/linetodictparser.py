@@ -1,6 +1,5 @@
 
 
-from datetime   import datetime
 import csv
 from enum import Enum
 import logging
@@ -9,6 +8,11 @@ from typing import List
 from pymongoimport.fieldfile import FieldFile
 from pymongoimport.type_converter import Converter
 from pymongoimport.doctimestamp import DocTimeStamp
+from pymongoimport.docdecorator import DocDecorator
+from pymongoimport.rejects import ParseErrors
+from pymongoimport.rowfilter import RowFilter
+from pymongoimport.valuedictionary import ValueDictionary
+from pymongoimport.conversionmemo import ConversionMemo
 
 
 class ErrorResponse(Enum):
@@ -25,22 +29,138 @@ class LineToDictParser:
     def __init__(self,
                  field_file : FieldFile,
                  locator: bool = True,
-                 timestamp : DocTimeStamp = DocTimeStamp.DOC_TIMESTAMP,
-                 onerror: ErrorResponse = ErrorResponse.Warn):
+                 timestamp : DocTimeStamp = DocTimeStamp.NO_TIMESTAMP,
+                 onerror: ErrorResponse = ErrorResponse.Warn,
+                 include: List[str] = None,
+                 exclude: List[str] = None,
+                 where: str = None,
+                 decorator: DocDecorator = None,
+                 errors: ParseErrors = None):
+        """
+        :param locator, timestamp: how to decorate each doc unless a decorator is given
+        :param decorator: adds the locator, timestamp, etc. to each doc (see `DocDecorator`)
+        :param errors: counts conversion errors and records rejects. Rows with the
+               wrong number of columns raise a ValueError unless errors has a
+               `RejectStream`.
+        """
 
         self._logger = logging.getLogger(__name__)
 
         self._onerror = onerror
         self._record_count = 0
         self._line_count = 0
-        self._timestamp = None
         self._idField = None  # section on which name == _id
         self._log = logging.getLogger(__name__)
         self._converter = Converter(self._log)
         self._field_file = field_file
-        self._locator = locator
-        if timestamp == DocTimeStamp.BATCH_TIMESTAMP:
-            self._batch_timestamp = datetime.utcnow()
+        self._decorator = decorator if decorator is not None else DocDecorator(locator, timestamp)
+        self._errors = errors if errors is not None else ParseErrors(log=self._log)
+        self._warned_one_field = False
+
+        #
+        # Work out once which columns we keep and how to convert them so that
+        # excluded columns cost nothing per line.
+        #
+        self._plan = self.make_plan(field_file, include, exclude)
+        self._caches = [p[-1] for p in self._plan if p[-1] is not None]
+        self._paused = []  # (row to resume at, memo) for memos with a low hit rate
+        self._rows = 0
+        self._field_count = len(field_file.fields())
+
+        if where:
+            self._filter = RowFilter(where, field_file)
+        else:
+            self._filter = None
+
+    @staticmethod
+    def make_plan(field_file: FieldFile, include: List[str] = None, exclude: List[str] = None):
+        """
+        Build the list of (column index, field, doc key, type, format, values)
+        tuples for the columns that survive projection. values is the
+        column's `ValueDictionary` or `ConversionMemo` or None (always None
+        for an `any` column as its values are passed through).
+        """
+        index = {k: i for i, k in enumerate(field_file.fields())}
+        plan = []
+        for k in field_file.projected_fields(include, exclude):
+            type_field = field_file.type_value(k)
+            plan.append((index[k],
+                         k,
+                         field_file.name_value(k),
+                         type_field,
+                         field_file.format_value(k),
+                         ValueDictionary.for_field(field_file, k) if type_field != "any" else None))
+        return plan
+
+    @property
+    def errors(self) -> ParseErrors:
+        return self._errors
+
+    def end_batch(self):
+        """
+        Called by `FileWriter` after each batch is inserted.
+        """
+        self._errors.end_batch()
+
+    @property
+    def plan(self):
+        return self._plan
+
+    def replace_values(self, values, replacement):
+        self._plan = [p[:-1] + (replacement,) if p[-1] is values else p for p in self._plan]
+
+    def drop_values(self, values):
+        """
+        Replace the dictionary of a column with too many distinct values with
+        a memo, or pause a memo with a low hit rate.
+        """
+        if isinstance(values, ConversionMemo):
+            self._log.debug(f"Field '{values.field}' has a low memo hit rate, "
+                            f"pausing its memo for {ConversionMemo.PAUSE_ROWS} rows")
+            self._paused.append((self._rows + ConversionMemo.PAUSE_ROWS, values))
+            self.replace_values(values, None)
+        else:
+            self._log.debug(f"Field '{values.field}' is not low cardinality, not keeping its values")
+            memo = None
+            if self._field_file.type_value(values.field) != "str":
+                memo = ConversionMemo(values.field)
+                self._caches.append(memo)
+            self.replace_values(values, memo)
+
+    def resume_memos(self):
+        """
+        Try the memos paused `ConversionMemo.PAUSE_ROWS` rows ago again.
+        """
+        while self._paused and self._paused[0][0] <= self._rows:
+            _, memo = self._paused.pop(0)
+            self._plan = [p[:-1] + (memo,) if p[1] == memo.field else p for p in self._plan]
+
+    def cache_stats(self) -> dict:
+        """
+        The conversion cache hits and misses per field, over the dictionaries and memos the field has had.
+
+        :return: {field: (hits, misses)} for the fields that had a cache
+        """
+        stats = {}
+        for cache in self._caches:
+            hits, misses = stats.get(cache.field, (0, 0))
+            stats[cache.field] = (hits + cache.hits, misses + cache.misses)
+        return stats
+
+    @property
+    def row_filter(self) -> RowFilter:
+        return self._filter
+
+    @property
+    def input_fields(self) -> List[str]:
+        """
+        The field file columns this parser reads, in field file order. A
+        reader that can skip columns (e.g. ArrowReader) only needs these.
+        """
+        used = {p[1] for p in self._plan}
+        if self._filter:
+            used.update(self._filter.fields)
+        return [k for k in self._field_file.fields() if k in used]
 
     def parse_list(self, csv_line: List[str], line_number: int)->dict:
         """
@@ -48,94 +168,87 @@ class LineToDictParser:
 
         :param csv_line: the line to be parsed (list of strs)
         :param record_number: the location of the line in the input file
-        :return: the new doc
+        :return: the new doc or None if the line is rejected by the where filter
 
         WIP
         Do we make gen id generate a compound key or another field instead of ID
         """
 
         doc = {}
+        self._rows = self._rows + 1
+        if self._paused and self._paused[0][0] <= self._rows:
+            self.resume_memos()
 
-        if len(csv_line) == 1:
+        if len(csv_line) == 1 and not self._warned_one_field:
             self._logger.warning("Warning: only one field in "
                                  "input line. Do you have the "
                                  "right delimiter set ?")
             self._logger.warning(f"input line : {csv_line}")
+            self._warned_one_field = True
 
-        if len(csv_line) != len(self._field_file.fields()):
+        if len(csv_line) != self._field_count:
+            msg = f"{len(csv_line)} columns, the field file has {self._field_count}"
+            if self._onerror != ErrorResponse.Fail and self._errors.rejects is not None:
+                self._errors.error(line_number, csv_line, msg)
+                return None
             raise ValueError(f"\nrecord: at line {line_number}:{csv_line}(len={len(csv_line)}) and fields required\n"
                              f"{self._field_file.fields()}(len={len(self._field_file.fields())})"
                              f"don't match in length")
 
-        # print( "dictEntry: %s" % dictEntry )
-        field_count = 0
+        if self._filter and not self._filter(csv_line):
+            return None
+
+        for i, k, name, type_field, fmt, values in self._plan:
 
-        for i,k in enumerate(self._field_file.fields()):
-            # print( "field: %s" % k )
-            # print( "value: %s" % dictEntry[ k ])
-            field_count = field_count + 1
+            if values is not None:
+                try:
+                    doc[name] = values[csv_line[i]]
+                    values.hits = values.hits + 1
+                    continue
+                except (KeyError, TypeError):  # a new value or an unhashable one (e.g. an Arrow list)
+                    pass
 
             if csv_line[i] is None:
 
-                msg = f"Value for field '{k}' at line {line_number} is 'None' which is not valid\n"
-                # print(dictEntry)
-                msg = msg + f"\t\t\tline:{line_number}:'{csv_line}'"
                 if self._onerror == ErrorResponse.Fail:
+                    msg = f"Value for field '{k}' at line {line_number} is 'None' which is not valid\n"
+                    msg = msg + f"\t\t\tline:{line_number}:'{csv_line}'"
                     if self._log:
                         self._log.error(msg)
                     raise ValueError(msg)
-                elif self._onerror == ErrorResponse.Warn:
-                    if self._log:
-                        self._log.warning(msg)
-                    continue
-                else:
-                    continue
-
-            if k.startswith("blank-") and self._onerror == ErrorResponse.Warn:  # ignore blank- columns
-                if self._log:
-                    self._log.info("Field %i is blank [blank-] : ignoring", field_count)
+                self._errors.missing(k)  # e.g. an Arrow null, not a parse error
                 continue
 
             # try:
             try:
-                type_field = self._field_file.type_value(k)
                 if type_field in ["date", "datetime"]:
-                    fmt = self._field_file.format_value(k)
                     v = self._converter.convert_time(type_field, csv_line[i], fmt)
                 else:
-                    v = self._converter.convert(type_field, csv_line[i])
+                    v = self._converter.convert_strict(type_field, csv_line[i])
 
             except ValueError:
 
                 if self._onerror == ErrorResponse.Fail:
                     if self._log:
-                        self._log.error("Error at line %i at field '%s'", self._record_count, k)
+                        self._log.error("Error at line %i at field '%s'", line_number, k)
                         self._log.error("type conversion error: Cannot convert '%s' to type %s", csv_line[i],
                                         type_field)
                     raise
                 elif self._onerror == ErrorResponse.Warn:
-                    msg = "Parse failure at line {} at field '{}'".format(self._record_count, k)
-                    msg = msg + " type conversion error: Cannot convert '{}' to type {} using string type instead".format(
-                        csv_line[i], type_field)
+                    self._errors.error(line_number, csv_line, f"Cannot convert '{csv_line[i]}' to {type_field}", k)
                     v = str(csv_line[i])
                 elif self._onerror == ErrorResponse.Ignore:
                     v = str(csv_line[i])
                 else:
                     raise ValueError("Invalid value for onerror: %s" % self._onerror)
-
-            if self._field_file.has_new_name(k):
-                assert (self._field_file.name_value(k) is not None)
-                doc[self._field_file.name_value(k)] = v
             else:
-                doc[k] = v
+                if values is not None and csv_line[i].__class__ is str and not values.add(csv_line[i], v):
+                    self.drop_values(values)
 
-            if self._locator:
-                doc['locator'] = {"line": line_number}
+            doc[name] = v
 
-            if self._timestamp == DocTimeStamp.DOC_TIMESTAMP:
-                doc['timestamp'] = datetime.utcnow()
-            elif self._timestamp == DocTimeStamp.BATCH_TIMESTAMP:
-                doc['timestamp'] = self._batch_timestamp
+        if self._decorator:
+            self._decorator(doc, line_number)
 
         return doc
 
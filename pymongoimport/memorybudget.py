@@ -0,0 +1,145 @@
+"""
+=====================================
+Memory budget
+=====================================
+
+With **--maxmemory** an import keeps the resident set size (RSS) of its
+process under a budget rather than letting it grow with the input:
+
+* `FileWriter` checks the RSS every `CHECK_ROWS` rows and after each batch.
+  Once the budget is exceeded it ends the current batch early and waits
+  for the batches being inserted to complete before it reads any more
+  input. A slow server therefore throttles reading, and parsed docs don't
+  pile up in memory.
+* The RSS rarely falls once the inserts have completed: the allocator keeps
+  the freed memory for reuse (and where only the peak RSS can be measured it
+  never falls). So each time no batches are left in flight the writer calls
+  `drained`, and the RSS at that point (but never more than the budget)
+  becomes the floor. The budget is then only exceeded again if the RSS
+  grows `slack` bytes past the floor. Otherwise a single excursion over the
+  budget would throttle the rest of the import. The limit is therefore at
+  most the budget plus `slack`; if the RSS is still over the budget with
+  nothing in flight a warning is logged once, as the budget is too small
+  for the process.
+* `ArrowReader` converts record batches of at most **--batchsize** rows to
+  Python values at a time, not `ArrowReader.BATCH_SIZE` rows.
+
+CSV, JSON lines and Excel files are already streamed a row at a time.
+
+The peak RSS of the process is logged (and audited) at the end of each
+import.
+
+The current RSS is read from `/proc/self/statm`. Where that isn't available
+only the peak RSS can be measured, and the budget is checked against that.
+"""
+import logging
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+UNITS = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_size(arg: str) -> int:
+    """
+    Parse a size in bytes with an optional K, M or G suffix e.g. "512M".
+    """
+    arg = arg.strip().lower().rstrip("b")
+    if arg and arg[-1] in UNITS:
+        return int(float(arg[:-1]) * UNITS[arg[-1]])
+    return int(arg)
+
+
+def peak_rss() -> int:
+    """
+    The peak RSS of this process in bytes, None if it can't be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # macOS reports bytes, Linux KB
+
+
+def current_rss() -> int:
+    """
+    The current RSS of this process in bytes, or the peak RSS if the current
+    RSS can't be measured.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return peak_rss()
+
+
+def format_size(size: int) -> str:
+    return f"{size / UNITS['m']:.1f}MB"
+
+
+class MemoryBudget(object):
+
+    CHECK_ROWS = 1000
+    SLACK_FRACTION = 8  # the default slack is max_bytes / SLACK_FRACTION
+
+    def __init__(self, max_bytes: int, rss=current_rss, slack: int = None):
+        """
+        :param max_bytes: the RSS the process should stay under
+        :param rss: a function returning the RSS in bytes
+        :param slack: how far the RSS may grow past the RSS at the last
+               `drained` before the budget is exceeded again
+               (max_bytes / `SLACK_FRACTION` if None)
+        """
+        self._max_bytes = max_bytes
+        self._rss = rss
+        self._slack = slack if slack is not None else max_bytes // MemoryBudget.SLACK_FRACTION
+        self._floor = 0
+        self._throttled = 0
+        self._warned_floor = False
+        self._log = logging.getLogger(__name__)
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def throttled(self) -> int:
+        """
+        The number of times the budget has been exceeded.
+        """
+        return self._throttled
+
+    @property
+    def limit(self) -> int:
+        """
+        The RSS above which the budget is exceeded: max_bytes, or slack past
+        the RSS left after the last `drained` if that is higher (at most
+        max_bytes + slack).
+        """
+        return max(self._max_bytes, self._floor + self._slack)
+
+    def drained(self):
+        """
+        Record the RSS once no batches are buffered or being inserted.
+        """
+        rss = self._rss()
+        if rss is None:
+            return
+        if rss > self._max_bytes and not self._warned_floor:
+            self._log.warning(f"RSS {format_size(rss)} is over --maxmemory {format_size(self._max_bytes)} "
+                              f"with no inserts in flight, --maxmemory is too small for this import")
+            self._warned_floor = True
+        self._floor = min(rss, self._max_bytes)
+
+    def exceeded(self) -> bool:
+        rss = self._rss()
+        if rss is None or rss <= self.limit:
+            return False
+        if self._throttled == 0:
+            self._log.warning(f"RSS {format_size(rss)} is over --maxmemory {format_size(self._max_bytes)}, "
+                              f"throttling reads until inserts complete")
+        self._throttled = self._throttled + 1
+        return True
@@ -12,23 +12,39 @@ Created on 19 Feb 2016
 
 import argparse
 import os
+import shutil
 import sys
 from multiprocessing import Process
 import logging
 
 import pymongo
-from requests import exceptions
 
 from pymongoimport.argparser import add_standard_args
 from pymongoimport.audit import Audit
 from pymongoimport.command import Drop_Command, GenerateFieldfileCommand, ImportCommand
 from pymongoimport.logger import Logger
 from pymongoimport.fieldfile import FieldFile
+from pymongoimport.filereader import FileReader
+from pymongoimport.filediscovery import discover_files, file_key, read_filelist
+from pymongoimport.indexes import DeferredIndexes, field_file_indexes
+from pymongoimport.shardrouter import ConfigChunkSource, ShardRouter, ShardRouterException
+from pymongoimport.ingestprofile import ProfileSettings, available_compressors, profile_settings
+from pymongoimport.watcher import DirectoryWatcher
 
 
 class Importer(object):
+    """
+    Import one or more files into a single collection. One MongoClient (and
+    so one connection pool) and the field files are shared by every file the
+    Importer loads, so loading many small files is not dominated by
+    connection setup and topology discovery.
+
+    With `build_indexes` False the caller handles --deferindexes and the
+    field file indexes (pymongomultiimport builds them once, after every
+    process has finished).
+    """
 
-    def __init__(self, audit, batch_ID, args):
+    def __init__(self, audit, batch_ID, args, client: pymongo.MongoClient = None, build_indexes: bool = True):
 
         self._audit = audit
         self._batch_ID = batch_ID
@@ -37,7 +53,7 @@ class Importer(object):
         self._write_concern = args.writeconcern
         self._fsync = args.fsync
         self._journal = args.journal
-        self._audit = args.audit
+        self._audit_enabled = audit is not None
         self._database_name = args.database
         self._collection_name = args.collection
         self._field_filename = args.fieldfile
@@ -47,54 +63,215 @@ class Importer(object):
         self._limit = args.limit
         self._locator = args.locator
         self._timestamp = args.addtimestamp
-        self._locator = args.locator
+        self._include = args.include
+        self._exclude = args.exclude
+        self._where = args.where
+        self._tokenizer = args.tokenizer
+        self._sheets = args.sheets
+        self._header_row = args.headerrow
         self._args = args
-
+        self._client = client
+        self._client_pid = os.getpid() if client else None
+        self._collection = None
+        self._field_files = {}
+        self._build_indexes = build_indexes
+        self._shard_routing = args.shardrouting
+        self._pre_split = args.presplit
+        self._router = None
+        self._log_handlers = False
+
+    def __getstate__(self):
+        # A MongoClient can't be pickled (e.g. to start a spawned Process) so the
+        # child makes its own.
+        state = self.__dict__.copy()
+        state["_client"] = None
+        state["_client_pid"] = None
+        state["_collection"] = None
+        state["_audit"] = None
+        state["_router"] = None
+        return state
+
+    @staticmethod
+    def make_client(args) -> pymongo.MongoClient:
+        if args.profile:
+            settings = profile_settings(args.profile)
+            return pymongo.MongoClient(args.host, w=settings.w, journal=settings.j,
+                                       compressors=",".join(available_compressors()))
+        elif args.writeconcern == 0:  # pymongo won't allow other args with w=0 even if they are false
+            return pymongo.MongoClient(args.host, w=args.writeconcern)
+        else:
+            return pymongo.MongoClient(args.host, w=args.writeconcern, fsync=args.fsync, journal=args.journal)
+
+    @property
+    def client(self) -> pymongo.MongoClient:
+        """
+        The client is created on first use. A forked child process creates its
+        own as a MongoClient is not fork safe.
+        """
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = Importer.make_client(self._args)
+            self._client_pid = os.getpid()
+            self._collection = None
+            self._audit = None
+            self._router = None
+            if self._args.profile:
+                self._log.info(f"profile       : {self._args.profile}")
+            else:
+                self._log.info(f"Write concern : {self._write_concern}")
+                self._log.info(f"journal       : {self._journal}")
+                self._log.info(f"fsync         : {self._fsync}")
+        return self._client
+
+    @property
+    def collection(self) -> pymongo.collection.Collection:
+        client = self.client
+        if self._collection is None:
+            self._collection = client[self._database_name][self._collection_name]
+        return self._collection
+
+    @property
+    def audit(self) -> Audit:
+        client = self.client
+        if self._audit is None and self._audit_enabled:
+            self._audit = Audit(client=client)
+        return self._audit
+
+    @property
+    def router(self) -> ShardRouter:
+        """
+        With --shardrouting a `ShardRouter` for the collection, read from the
+        config database on first use. None if routing is off or the collection
+        can't be routed (e.g. it isn't sharded).
+        """
+        if self._shard_routing and self._router is None:
+            try:
+                self._router = ShardRouter(ConfigChunkSource(self.client, self.collection.full_name))
+            except ShardRouterException as e:
+                self._log.warning(f"Not routing by shard: {e}")
+                self._shard_routing = False
+        return self._router
 
     def setup_log_handlers(self):
+        if self._log_handlers:
+            return
         self._log = Logger(self._args.logname, self._args.loglevel).log()
 
         # Logger.add_file_handler(args.logname)
 
         if not self._args.silent:
             Logger.add_stream_handler(self._args.logname)
+        self._log_handlers = True
 
-    def run(self, filename):
-        if not self._log:
-            self._log = Logger(self._args.logname, self._args.loglevel).log()
-
-        if not self._args.silent:
-            Logger.add_stream_handler(self._args.logname)
-
-        self._log.info("Started pymongoimport")
+    def command(self, filename, row_groups=None, byte_range=None, sheets=None,
+                first_line_number=1) -> ImportCommand:
+        field_filename = self._field_filename
+        if field_filename is None and not FileReader.is_stdin(filename):
+            field_filename = FieldFile.make_default_tff_name(filename)
 
-        if self._field_filename is None:
-            self._field_filename = FieldFile.make_default_tff_name(filename)
+        self._log.info(f"has header    : {self._has_header}")
 
-        if self._write_concern == 0:  # pymongo won't allow other args with w=0 even if they are false
-            client = pymongo.MongoClient(self._host, w=self._write_concern)
+        if self._args.profile:
+            settings = profile_settings(self._args.profile)
         else:
-            client = pymongo.MongoClient(self._host, w=self._write_concern, fsync=self._fsync, j=self._journal)
+            settings = ProfileSettings(w=self._write_concern, j=self._journal, ordered=True,
+                                       batch_size=self._args.batchsize, batch_bytes=0, in_flight=1)
 
-        database = client[self._database_name]
-        self._collection = database[self._collection_name]
+        if self._args.rejectcollection:
+            rejects = self.collection.database[self._args.rejectcollection]
+        else:
+            rejects = self._args.rejectfile
+
+        # only the first file is used to pre-split the collection
+        pre_split, self._pre_split = self._pre_split, 0
+
+        return ImportCommand(collection=self.collection,
+                             field_filename=field_filename,
+                             delimiter=self._delimiter,
+                             has_header=self._has_header,
+                             onerror=self._onerror,
+                             limit=self._limit,
+                             audit=self.audit,
+                             locator=self._locator,
+                             timestamp=self._timestamp,
+                             include=self._include,
+                             exclude=self._exclude,
+                             where=self._where,
+                             tokenizer=self._tokenizer,
+                             row_groups=row_groups,
+                             byte_range=byte_range,
+                             first_line_number=first_line_number,
+                             sheets=sheets or self._sheets,
+                             header_row=self._header_row,
+                             field_files=self._field_files,
+                             follow=self._args.follow,
+                             poll_interval=self._args.pollinterval,
+                             flush_interval=self._args.flushinterval if self._args.follow else None,
+                             batch_size=settings.batch_size,
+                             batch_bytes=settings.batch_bytes,
+                             in_flight=settings.in_flight,
+                             ordered=settings.ordered,
+                             defer_indexes=self._args.deferindexes and self._build_indexes,
+                             build_indexes=self._build_indexes,
+                             router=self.router,
+                             pre_split=pre_split,
+                             add_filename=self._args.addfilename,
+                             add_batch_id=self._args.addbatchid,
+                             rejects=rejects,
+                             max_memory=self._args.maxmemory,
+                             id=self._batch_ID)
+
+    def pre_split(self, filename):
+        """
+        Pre-split the collection from a sample of filename without loading it.
+        """
+        cmd = self.command(filename)
+        cmd.pre_execute(filename)
+        cmd.pre_split(filename)
+
+    @property
+    def namespace(self) -> str:
+        return f"{self._database_name}.{self._collection_name}"
+
+    def record_imported(self, filename, key=None):
+        """
+        Add filename to the audit manifest of completely imported files, if
+        there is an audit collection. A run cut short by --limit isn't a
+        complete import and isn't recorded, nor is stdin (`/dev/stdin` is a
+        file when stdin is redirected from one).
+
+        :param key: the `file_key` of the file taken before it was imported
+        """
+        if FileReader.is_stdin(filename) or not os.path.isfile(filename):
+            return
+        if self.audit is None or self._limit:
+            return
+        self.audit.add_imported_file(self._batch_ID, key or file_key(filename), self.namespace)
+
+    def field_file_indexes(self) -> list:
+        """
+        The indexes declared in the field files this Importer has loaded.
+        """
+        return [i for ff in self._field_files.values() for i in field_file_indexes(ff)]
+
+    def warm_up(self):
+        """
+        Do the set up that every file would otherwise pay for in a new
+        process: read the --fieldfile and connect to the server (DNS, TLS
+        and authentication).
+        """
+        if self._field_filename and os.path.isfile(self._field_filename):
+            self._field_files[self._field_filename] = FieldFile(self._field_filename)
+        try:
+            self.client.admin.command("ping")
+        except pymongo.errors.PyMongoError as e:
+            self._log.warning(f"Can't connect to '{self._host}' yet: {e}")
 
-        self._log.info(f"Write concern : {self._write_concern}")
-        self._log.info(f"journal       : {self._journal}")
-        self._log.info(f"fsync         : {self._fsync}")
-        self._log.info(f"has header    : {self._has_header}")
+    def run(self, filename, row_groups=None, byte_range=None, sheets=None, first_line_number=1):
+        self.setup_log_handlers()
 
-        cmd = ImportCommand(collection=self._collection,
-                            field_filename=self._field_filename,
-                            delimiter=self._delimiter,
-                            has_header=self._has_header,
-                            onerror=self._onerror,
-                            limit=self._limit,
-                            audit=self._audit,
-                            locator=self._locator,
-                            timestamp=self._timestamp,
-                            id=self._batch_ID)
+        self._log.info("Started pymongoimport")
 
+        cmd = self.command(filename, row_groups, byte_range, sheets, first_line_number)
         cmd.run(filename)
 
         return 1
@@ -114,6 +291,63 @@ class Importer(object):
         return files[pool_size:]
 
 
+def import_file(importer: Importer, filename: str, log, done_dir: str = None) -> bool:
+    """
+    Import a file, logging rather than raising if it can't be read, record it
+    in the audit manifest and then move it into `done_dir` if one is given.
+    """
+    try:
+        key = file_key(filename) if os.path.isfile(filename) and not FileReader.is_stdin(filename) else None
+        importer.run(filename)
+    except OSError as e:  # including the HTTPError of a URL
+        log.error(f"{e}")
+        return False
+
+    importer.record_imported(filename, key)
+
+    if done_dir:
+        move_file(filename, done_dir, log)
+    return True
+
+
+def move_file(filename: str, target_dir: str, log):
+    """
+    Move a local file into target_dir, creating it if need be.
+    """
+    if os.path.isfile(filename) and not FileReader.is_stdin(filename):
+        os.makedirs(target_dir, exist_ok=True)
+        target = shutil.move(filename, os.path.join(target_dir, os.path.basename(filename)))
+        log.info(f"Moved '{filename}' to '{target}'")
+
+
+def watch_directory(importer: Importer, path: str, log, poll_interval: float = 1.0,
+                    done_dir: str = None, imported: set = None, failed_dir: str = None):
+    """
+    Import each file that is written to `path` until interrupted. The
+    importer's client and field files stay warm between files. A file that
+    fails to import is logged (and moved into `failed_dir` if one is given)
+    and the watcher carries on.
+    """
+    watcher = DirectoryWatcher(path, poll_interval=poll_interval)
+    log.info(f"Watching '{path}' ({'inotify' if watcher.uses_inotify else 'polling'}), press Ctrl-C to stop")
+    try:
+        for i in watcher.files():
+            try:
+                if imported and file_key(i) in imported:
+                    continue
+                ok = import_file(importer, i, log, done_dir)
+            except Exception as e:  # e.g. FieldFileException, RowFilterException, BulkWriteError
+                log.error(f"Failed to import '{i}': {type(e).__name__}: {e}")
+                ok = False
+            if not ok and failed_dir:
+                try:
+                    move_file(i, failed_dir, log)
+                except OSError as e:
+                    log.error(f"Can't move '{i}' to '{failed_dir}': {e}")
+    except KeyboardInterrupt:
+        log.info(f"Stopped watching '{path}'")
+
+
 def pymongoimport_main(input_args=None):
     """
     Expect to recieve an array of args
@@ -160,6 +394,10 @@ def pymongoimport_main(input_args=None):
         cmd_args = " ".join(cmd)
     # print("args: %s" % args)
 
+    if args.deferindexes and (args.watch or args.follow):
+        parser.error("--deferindexes can't be used with --watch or --follow: the collection would "
+                     "have no secondary indexes until the import is stopped")
+
     log = Logger(args.logname, args.loglevel).log()
 
     # Logger.add_file_handler(args.logname)
@@ -171,22 +409,17 @@ def pymongoimport_main(input_args=None):
 
     if args.filelist:
         try:
-            with open(args.filelist) as input_file:
-                for line in input_file.readlines():
-                    args.filenames.append(line)
+            args.filenames.extend(read_filelist(args.filelist))
         except OSError as e:
             log.error(f"{e}")
 
-    if args.writeconcern == 0:  # pymongo won't allow other args with w=0 even if they are false
-        client = pymongo.MongoClient(args.host, w=args.writeconcern)
-    else:
-        client = pymongo.MongoClient(args.host, w=args.writeconcern, fsync=args.fsync, j=args.journal)
+    client = Importer.make_client(args)
 
     if args.genfieldfile:
         args.has_header = True
         log.info('Forcing has_header true for --genfieldfile')
         cmd = GenerateFieldfileCommand(field_filename=args.fieldfile, delimiter=args.delimiter)
-        for i in args.filenames:
+        for i in discover_files(args.filenames):
             cmd.run(i)
 
     if args.audit:
@@ -224,25 +457,39 @@ def pymongoimport_main(input_args=None):
         print(f"Total fields: {len(cfg.fields())}")
 
     if not args.genfieldfile:
-        if args.filenames :
-
-            if args.audit:
-                audit = Audit(client=client)
-                batch_ID = audit.start_batch({"command": sys.argv})
+        if args.filenames or args.watch:
+
+            # Indexes are dropped once before the first file and built once
+            # after the last, not around each file. --watch and --follow don't
+            # have a last file, so each file builds its declared indexes.
+            long_running = bool(args.watch or args.follow)
+            process = Importer(audit, batch_ID, args, client=client, build_indexes=long_running)
+            indexes = DeferredIndexes(collection)
+            if args.deferindexes:
+                indexes.drop()
+
+            if args.skipimported:
+                imported = (audit or Audit(client=client)).imported_files(f"{args.database}.{args.collection}")
             else:
-                audit = None
-                batch_ID = None
-
-            process = Importer(audit, batch_ID, args)
+                imported = None
 
-            for i in args.filenames:
+            try:
                 try:
-                    process.run(i)
-                except OSError as e:
-                    log.error(f"{e}")
-                except exceptions.HTTPError as e:
-                    log.error(f"{e}")
-
+                    for i in discover_files(args.filenames, sort_by_size=args.sortbysize, skip=imported):
+                        import_file(process, i, log, args.donedir)
+                except KeyboardInterrupt:
+                    if not args.follow:
+                        raise
+                    log.info("Stopped following")  # the checkpoint has the last line inserted
+
+                if args.watch:
+                    watch_directory(process, args.watch, log, args.pollinterval, args.donedir, imported,
+                                    args.faileddir)
+            finally:
+                built = [] if long_running else indexes.build(process.field_file_indexes())
+                if args.audit and built:
+                    audit.add_batch_info(batch_ID, "indexes", {"names": built,
+                                                               "index_seconds": indexes.build_seconds})
 
             if args.audit:
                 audit.end_batch(batch_ID)
@@ -2,19 +2,26 @@
 @author: jdrumgoole
 """
 import argparse
+import itertools
+import logging
 import multiprocessing
 import os
 import sys
 import time
-from collections import OrderedDict
-from multiprocessing import Process
+from collections import Counter, OrderedDict
 
 import pymongo
 
 from pymongoimport.argparser import add_standard_args
 from pymongoimport.audit import Audit
 from pymongoimport.logger import Logger
-from pymongoimport.pymongoimport_main import SubProcess
+from pymongoimport.pymongoimport_main import Importer
+from pymongoimport.arrowreader import ArrowReader
+from pymongoimport.jsonreader import JSONLineReader
+from pymongoimport.xlsxreader import XLSXReader
+from pymongoimport.fieldfile import FieldFile
+from pymongoimport.filediscovery import discover_files, file_key, read_filelist
+from pymongoimport.indexes import DeferredIndexes, field_file_indexes
 
 
 def strip_arg(arg_list, remove_arg, has_trailing=False):
@@ -45,6 +52,109 @@ def chunker(seq, size):
     return (seq[pos:pos + size] for pos in range(0, len(seq), size))
 
 
+def work_units(filenames, poolsize, field_filename=None, sheets=None, log=None, header_row=None):
+    """
+    Turn the input files into a list of (filename, kwargs) units of work where
+    kwargs are passed to `Importer.run`. CSV files are a single unit. Parquet
+    and Arrow files are split by row group, JSON Lines files by byte range and
+    Excel workbooks by sheet so that a single large file can be spread across
+    `poolsize` processes.
+    Field files for Arrow and Excel inputs are generated here, before any
+    process is started, so that children don't race to create them.
+    Each part carries the line number of its first line so that errors are
+    reported at the same line as when the file is imported in one piece.
+    Units are yielded as the files are discovered.
+    """
+    for i in filenames:
+        if not os.path.isfile(i):
+            if log:
+                log.warning(f"No such file: '{i}' ignoring")
+            continue
+        if ArrowReader.is_arrow_file(i):
+            ff_name = field_filename or FieldFile.make_default_tff_name(i)
+            if not os.path.isfile(ff_name):
+                ArrowReader.generate_field_file(i, ff_name)
+            reader = ArrowReader(i)
+            for row_groups in reader.partition(poolsize):
+                yield (i, {"row_groups": row_groups,
+                           "first_line_number": reader.first_row_number(row_groups)})
+        elif XLSXReader.is_xlsx_file(i):
+            ff_name = field_filename or FieldFile.make_default_tff_name(i)
+            if not os.path.isfile(ff_name):
+                XLSXReader.generate_field_file(i, ff_name, sheets, header_row)
+            for sheet in sheets or XLSXReader.sheet_names(i):
+                yield (i, {"sheets": [sheet]})
+        elif JSONLineReader.is_json_file(i):
+            byte_ranges = JSONLineReader.byte_ranges(i, poolsize)
+            for byte_range, first in zip(byte_ranges, JSONLineReader.first_line_numbers(i, byte_ranges)):
+                yield (i, {"byte_range": byte_range, "first_line_number": first})
+        else:
+            yield (i, {})
+
+
+PRELOAD_MODULES = ["pymongoimport.pymongoimport_main"]
+
+_worker = None  # the Importer of a pool worker process
+
+
+def init_worker(importer: Importer):
+    """
+    Set up a pool worker once, before it runs any units of work: keep the
+    importer and warm it up (see `Importer.warm_up`) so each unit only has
+    to parse and insert.
+    """
+    global _worker
+    _worker = importer
+    _worker.setup_log_handlers()
+    _worker.warm_up()
+
+
+def run_unit(unit):
+    """
+    Run a unit of work from `work_units` in a pool worker.
+
+    :return: (unit, True if it was imported)
+    """
+    filename, part = unit
+    try:
+        _worker.run(filename, **part)
+        return unit, True
+    except Exception as e:
+        logging.getLogger(__name__).exception(f"Failed to import '{filename}' {part}: {e}")
+        return unit, False
+
+
+def run_pool(units, poolsize, importer, context=multiprocessing, log=None, completed: Counter = None) -> int:
+    """
+    Run each unit of work on a pool of `poolsize` worker processes. The
+    workers are started and set up once (see `init_worker`) and then take
+    the next unit as soon as they finish one, so a unit costs no process
+    start up however small its file is.
+
+    :param completed: if given, counts the units of each file that were imported
+    :return: the number of units that failed. A KeyboardInterrupt stops the
+             workers and is raised again, as the run is incomplete.
+    """
+    failed = 0
+    pool = context.Pool(poolsize, initializer=init_worker, initargs=(importer,))
+    try:
+        for (i, part), ok in pool.imap_unordered(run_unit, units):
+            if log:
+                log.info(f"Processed:'{i}' {part}" if ok else f"Failed:'{i}' {part}")
+            failed = failed + (not ok)
+            if ok and completed is not None:
+                completed[i] = completed[i] + 1
+        pool.close()
+    except KeyboardInterrupt:
+        if log:
+            log.info("Keyboard interrupt... terminating the worker processes")
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return failed
+
+
 def multi_import(*argv):
     """
 .. function:: multi_import ( *argv )
@@ -67,12 +177,16 @@ def multi_import(*argv):
     parser = add_standard_args(parser)
     parser.add_argument("--poolsize", type=int, default=multiprocessing.cpu_count(),
                         help="The number of parallel processes to run")
-    parser.add_argument("--forkmethod", choices=["spawn", "fork", "forkserver"], default="spawn",
-                        help="The model used to define how we create subprocesses (default:'spawn')")
+    default_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    parser.add_argument("--forkmethod", choices=["spawn", "fork", "forkserver"], default=default_method,
+                        help="How the worker processes are started. A forkserver imports pymongoimport "
+                             "once and forks each worker from it [default: %(default)s]")
 
     args = parser.parse_args(*argv)
 
-    multiprocessing.set_start_method(args.forkmethod)
+    context = multiprocessing.get_context(args.forkmethod)
+    if args.forkmethod == "forkserver":
+        context.set_forkserver_preload(PRELOAD_MODULES)
 
     log = Logger("multi_import").log()
 
@@ -82,6 +196,9 @@ def multi_import(*argv):
     child_args = sys.argv[1:]
     children = OrderedDict()
 
+    if args.filelist:
+        args.filenames.extend(read_filelist(args.filelist))
+
     log.info("filenames:%s", args.filenames)
     if len(args.filenames) == 0:
         log.info("no input files")
@@ -112,46 +229,80 @@ def multi_import(*argv):
     log.info("Poolsize:{}".format(poolsize))
 
     log.info("Fork using:'%s'", args.forkmethod)
-    if args.forkmethod == "fork":
-        subprocess = SubProcess(log=log, audit=audit, batch_ID=batch_ID, args=args)
-    elif args.forkmethod == "spawn":
-        subprocess = SubProcess(log=None, audit=audit, batch_ID=batch_ID, args=args)
-    elif args.forkmethod == "forkserver":
-        subprocess = SubProcess(log=None, audit=audit, batch_ID=batch_ID, args=args)
+    #
+    # The Importer only carries args across to the workers. Each worker
+    # connects and reads the --fieldfile once (see init_worker) and builds a
+    # parser and --where filter per file.
+    #
+    # Indexes are dropped and built here, not by each child, so that no index
+    # is built while other children are still loading.
+    indexes = DeferredIndexes(Importer.make_client(args)[args.database][args.collection])
+    if args.deferindexes:
+        indexes.drop()
+
+    subprocess = Importer(audit=audit, batch_ID=batch_ID, args=args, build_indexes=False)
 
     subprocess.setup_log_handlers()
 
+    namespace = f"{args.database}.{args.collection}"
+    if args.skipimported:
+        imported = (audit or Audit(pymongo.MongoClient(args.host))).imported_files(namespace)
+    else:
+        imported = None
+
+    loaded = []
+    keys = {}  # the file_key of each local file before it is imported
+
+    def record(files):
+        for f in files:
+            loaded.append(f)
+            if os.path.isfile(f):
+                keys[f] = file_key(f)
+            yield f
+
+    unit_counts = Counter()
+    completed = Counter()
+
+    def count(units):
+        for unit in units:
+            unit_counts[unit[0]] = unit_counts[unit[0]] + 1
+            yield unit
+
+    filenames = record(discover_files(args.filenames, sort_by_size=args.sortbysize, skip=imported))
+    if args.presplit and args.shardrouting:
+        # split once from the first file, before the children start loading
+        first = next(filenames, None)
+        if first:
+            subprocess.pre_split(first)
+            filenames = itertools.chain([first], filenames)
+    units = count(work_units(filenames, poolsize, args.fieldfile, args.sheets, log, args.headerrow))
     try:
-
-        #
-        # Should use a Pool here but Pools need top level functions which is
-        # ugly.
-        #
-        proc_list = []
-
-        for arg_list in chunker(args.filenames, poolsize):  # blocks of poolsize
-            proc_list = []
-            for i in arg_list:
-                if os.path.isfile(i):
-                    log.info(f"Processing:'{i}'")
-                    proc = Process(target=subprocess.run, args=(i,), name=i)
-                    proc.start()
-                    proc_list.append(proc)
-                else:
-                    log.warning("No such file: '{i}' ignoring")
-
-            for proc in proc_list:
-                proc.join()
-
+        failed = run_pool(units, poolsize, subprocess, context, log, completed)
+        if failed:
+            log.error(f"{failed} files or parts of files failed to import")
+        # a file is in the manifest once all of its units have been imported
+        # (a --limit run is never a complete import)
+        if audit and not args.limit:
+            for f in loaded:
+                if f in keys and unit_counts[f] and completed[f] == unit_counts[f]:
+                    audit.add_imported_file(batch_ID, keys[f], namespace)
     except KeyboardInterrupt:
-        log.info("Keyboard interrupt...")
-        for i in proc_list:
-            log.info("terminating process: '%s'", proc_list[i].name)
-            proc_list[i].terminate()
+        log.error("Interrupted, the import is incomplete")
+        sys.exit(1)  # once the indexes are built
+    finally:
+        field_filenames = {args.fieldfile} if args.fieldfile else {FieldFile.make_default_tff_name(f) for f in loaded}
+        field_indexes = [i for ff in sorted(field_filenames) if os.path.isfile(ff)
+                         for i in field_file_indexes(FieldFile(ff))]
+        built = indexes.build(field_indexes)
+        if audit and built:
+            audit.add_batch_info(batch_ID, "indexes", {"names": built,
+                                                       "index_seconds": indexes.build_seconds})
 
     finish = time.time()
 
     log.info("Total elapsed time:%f" % (finish - start))
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,157 @@
+"""
+=====================================
+Rejects
+=====================================
+
+Rows that can't be imported (the wrong number of columns) and values that
+can't be converted to their field file type are recorded without stopping
+the import or logging a line per bad cell:
+
+* `ParseErrors` counts the errors per field in memory and logs one summary
+  line per batch (see `FileWriter`).
+* A `RejectStream` (**--rejectfile** or **--rejectcollection**) records each
+  error with its line number, raw row and reason. The records are buffered
+  and written a batch at a time. A reject file has one JSON document per
+  line.
+
+A malformed row is skipped. A value that can't be converted is imported as
+a string (with **--onerror warn**) and also recorded, so the reject set
+shows every row that didn't import cleanly.
+
+A missing value (a null in an Arrow or Parquet column, an empty Excel cell)
+is not an error: the field is left out of the doc. Missing values are only
+counted per field (see `ParseErrors.missing`), not rejected.
+"""
+import json
+import logging
+import os
+from collections import Counter
+from contextlib import contextmanager
+from typing import List
+
+
+class RejectStream(object):
+
+    def __init__(self, target, batch_size: int = 1000):
+        """
+        :param target: a file name or a pymongo collection
+        :param batch_size: the number of rejects to buffer before writing them
+        """
+        self._target = target
+        self._batch_size = batch_size
+        self._buffer: List[dict] = []
+        self._count = 0
+
+    @property
+    def count(self) -> int:
+        """
+        The number of rejects recorded so far.
+        """
+        return self._count
+
+    @property
+    def name(self) -> str:
+        if isinstance(self._target, str):
+            return self._target
+        return self._target.full_name
+
+    def reject(self, record: dict):
+        self._buffer.append(record)
+        self._count = self._count + 1
+        if len(self._buffer) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        if not isinstance(self._target, str):  # a collection
+            self._target.insert_many(self._buffer, ordered=False)
+        else:
+            lines = "".join(json.dumps(r, default=str) + "\n" for r in self._buffer)
+            # one write per batch so processes sharing the file don't interleave lines
+            fd = os.open(self._target, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, lines.encode("utf-8"))
+            finally:
+                os.close(fd)
+        self._buffer = []
+
+
+class ParseErrors(object):
+    """
+    Per field error counts for one input, and optionally a `RejectStream`.
+    """
+
+    MALFORMED = "<row>"  # the field name malformed rows are counted under
+
+    def __init__(self, name: str = None, rejects: RejectStream = None, log: logging.Logger = None):
+        """
+        :param name: the input file, recorded in each reject
+        """
+        self._name = name
+        self._rejects = rejects
+        self._log = log or logging.getLogger(__name__)
+        self._batch = Counter()
+        self._total = Counter()
+        self._missing = Counter()
+        self._muted = False
+
+    @property
+    def rejects(self) -> RejectStream:
+        return self._rejects
+
+    @property
+    def totals(self) -> Counter:
+        """
+        The error count per field, including the current batch.
+        """
+        return self._total + self._batch
+
+    @property
+    def missing_totals(self) -> Counter:
+        """
+        The missing value count per field.
+        """
+        return self._missing
+
+    def missing(self, field: str):
+        """
+        Count a missing value of field, which is left out of its doc.
+        """
+        if not self._muted:
+            self._missing[field] += 1
+
+    @contextmanager
+    def muted(self):
+        """
+        Ignore errors while rows are parsed more than once (e.g. sampled before the load).
+        """
+        self._muted = True
+        try:
+            yield
+        finally:
+            self._muted = False
+
+    def error(self, line_number: int, raw, reason: str, field: str = MALFORMED):
+        if self._muted:
+            return
+        self._batch[field] += 1
+        if self._rejects is not None:
+            record = {"line": line_number, "raw": raw, "reason": reason}
+            if self._name is not None:
+                record["filename"] = self._name
+            if field != ParseErrors.MALFORMED:
+                record["field"] = field
+            self._rejects.reject(record)
+
+    def end_batch(self):
+        """
+        Log this batch's error counts (if any) and write its rejects.
+        """
+        if self._batch:
+            counts = ", ".join(f"'{k}':{v}" for k, v in self._batch.most_common())
+            self._log.warning(f"Input:'{self._name}': errors in batch: {counts}")
+            self._total.update(self._batch)
+            self._batch.clear()
+        if self._rejects is not None:
+            self._rejects.flush()
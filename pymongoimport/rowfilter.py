@@ -0,0 +1,227 @@
+"""
+=====================================
+RowFilter
+=====================================
+
+Compile a **--where** expression into a predicate that is evaluated against
+the raw columns of each input line before any other conversion is done. Rows
+that don't match are never converted or sent to the server.
+
+The expression is a restricted Python expression. Column names are used
+as variables, with any characters that are not valid in a Python identifier
+replaced by '_' (so `Date of Transfer` becomes `Date_of_Transfer`).
+Only the columns named in the expression are converted (using the type
+from the field file). Prefixing a column name with `raw_` gives the
+unconverted string, which is the cheapest possible test::
+
+    --where "Price > 250000 and Postcode.startswith('NG')"
+    --where "raw_tpep_pickup_datetime[:4] == '2018'"
+    --where "test_date >= date('2013-06-01')"
+
+Calls with constant arguments such as `date('2013-06-01')` are evaluated once
+when the expression is compiled, not once per row.
+
+A row for which the expression raises a `TypeError`, `ValueError`,
+`ArithmeticError`, `AttributeError` or `LookupError` (for instance comparing
+a column that failed type conversion with a number, dividing by a zero
+column or slicing a missing value) does not match. A constant call that
+fails, such as `int('x')`, is reported when the expression is compiled.
+
+Rows may be lists (indexed by field file position) or, with `by_name=True`,
+dicts such as JSON documents (indexed by field name). Without a field file
+names in the expression are dict keys and values are not converted.
+
+The filter only holds the expression text and the field file so it can be
+rebuilt in each worker process by `pymultiimport`.
+"""
+import ast
+import re
+from typing import List
+
+from pymongoimport.fieldfile import FieldFile
+from pymongoimport.type_converter import Converter
+
+
+class RowFilterException(Exception):
+    pass
+
+
+class RowFilter(object):
+
+    RAW_PREFIX = "raw_"
+
+    FUNCTIONS = ["int", "float", "str", "len", "abs", "min", "max", "date"]
+
+    ATTRIBUTES = ["startswith", "endswith", "lower", "upper", "strip",
+                  "year", "month", "day", "hour", "minute", "second", "weekday"]
+
+    NODES = (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not,
+             ast.USub, ast.UAdd, ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div,
+             ast.Mod, ast.FloorDiv, ast.Compare, ast.Eq, ast.NotEq, ast.Lt,
+             ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+             ast.Name, ast.Load, ast.Constant, ast.Tuple, ast.List, ast.Set,
+             ast.Call, ast.Attribute, ast.Subscript, ast.Slice, ast.IfExp)
+
+    def __init__(self, expression: str, field_file: FieldFile = None, by_name: bool = False):
+
+        self._expression = expression
+        self._converter = Converter()
+        self._matched = 0
+        self._rejected = 0
+
+        try:
+            tree = ast.parse(expression.strip(), mode="eval")
+        except SyntaxError as e:
+            raise RowFilterException(f"Invalid --where expression '{expression}': {e.msg}")
+
+        self._check(tree)
+
+        if field_file:
+            identifiers = {RowFilter.identifier(k): k for k in field_file.fields()}
+            if by_name:
+                index = {k: k for k in field_file.fields()}
+            else:
+                index = {k: i for i, k in enumerate(field_file.fields())}
+        else:
+            identifiers = {}
+
+        self._columns = []
+        self._fields = []
+        for name in sorted({n.id for n in ast.walk(tree) if isinstance(n, ast.Name)}):
+            if name in RowFilter.FUNCTIONS:
+                continue
+            if field_file is None:  # a dict key, used as is
+                self._fields.append(name)
+                self._columns.append((name, name, None, None))
+                continue
+            if name in identifiers:
+                field, raw = identifiers[name], False
+            elif name.startswith(RowFilter.RAW_PREFIX) and name[len(RowFilter.RAW_PREFIX):] in identifiers:
+                field, raw = identifiers[name[len(RowFilter.RAW_PREFIX):]], True
+            else:
+                raise RowFilterException(f"Unknown column '{name}' in --where expression '{expression}'")
+
+            self._fields.append(field)
+            if raw:
+                self._columns.append((index[field], name, None, None))
+            else:
+                self._columns.append((index[field],
+                                      name,
+                                      field_file.type_value(field),
+                                      field_file.format_value(field)))
+
+        self._globals = {"__builtins__": {},
+                         "int": int,
+                         "float": float,
+                         "str": str,
+                         "len": len,
+                         "abs": abs,
+                         "min": min,
+                         "max": max,
+                         "date": self._converter.to_datetime}
+
+        try:
+            tree = ast.fix_missing_locations(_ConstantCallFolder(self._globals).visit(tree))
+        except Exception as e:
+            raise RowFilterException(f"Can't evaluate a constant in --where expression '{expression}': "
+                                     f"{type(e).__name__}: {e}")
+        self._code = compile(tree, "<where>", "eval")
+
+    @staticmethod
+    def identifier(field: str) -> str:
+        """
+        Map a column name onto the identifier used for it in an expression.
+        """
+        name = re.sub(r"\W", "_", field)
+        if name[:1].isdigit():
+            name = f"_{name}"
+        return name
+
+    def _check(self, tree):
+        for node in ast.walk(tree):
+            if not isinstance(node, RowFilter.NODES):
+                raise RowFilterException(f"'{type(node).__name__}' is not allowed in "
+                                         f"--where expression '{self._expression}'")
+            if isinstance(node, ast.Attribute) and node.attr not in RowFilter.ATTRIBUTES:
+                raise RowFilterException(f"Attribute '{node.attr}' is not allowed in "
+                                         f"--where expression '{self._expression}'")
+            if isinstance(node, ast.Call):
+                if isinstance(node.func, ast.Name) and node.func.id not in RowFilter.FUNCTIONS:
+                    raise RowFilterException(f"Function '{node.func.id}' is not allowed in "
+                                             f"--where expression '{self._expression}'")
+                if node.keywords:
+                    raise RowFilterException(f"Keyword arguments are not allowed in "
+                                             f"--where expression '{self._expression}'")
+
+    @property
+    def expression(self) -> str:
+        return self._expression
+
+    @property
+    def columns(self) -> List[str]:
+        return [name for _, name, _, _ in self._columns]
+
+    @property
+    def fields(self) -> List[str]:
+        """
+        The field file columns the expression reads.
+        """
+        return self._fields
+
+    @property
+    def matched(self) -> int:
+        return self._matched
+
+    @property
+    def rejected(self) -> int:
+        return self._rejected
+
+    def __call__(self, csv_line: List[str]) -> bool:
+        values = {}
+        for i, name, type_field, fmt in self._columns:
+            try:
+                v = csv_line[i]
+            except (KeyError, IndexError):
+                v = None
+            if type_field is None or v is None:
+                values[name] = v
+                continue
+            try:
+                if type_field in ["date", "datetime"]:
+                    values[name] = self._converter.convert_time(type_field, v, fmt)
+                else:
+                    values[name] = self._converter.convert(type_field, v)
+            except ValueError:
+                values[name] = v
+
+        try:
+            result = bool(eval(self._code, self._globals, values))
+        except (TypeError, ValueError, ArithmeticError, AttributeError, LookupError):
+            result = False
+
+        if result:
+            self._matched = self._matched + 1
+        else:
+            self._rejected = self._rejected + 1
+        return result
+
+
+class _ConstantCallFolder(ast.NodeTransformer):
+    """
+    Replace calls whose arguments are all constants with a reference to
+    the precomputed value so that `date('2018-01-01')` is parsed once.
+    """
+
+    def __init__(self, namespace: dict):
+        self._namespace = namespace
+        self._count = 0
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Name) and all(isinstance(a, ast.Constant) for a in node.args):
+            value = self._namespace[node.func.id](*[a.value for a in node.args])
+            name = f"__const_{self._count}"
+            self._count = self._count + 1
+            self._namespace[name] = value
+            return ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+        return node
@@ -0,0 +1,128 @@
+"""
+=====================================
+Schema drift
+=====================================
+
+Files from the same source drift over time: columns are added, reordered or
+dropped. `LineToDictParser` maps columns to the field file by position, so
+a file whose header no longer matches its field file would fail on every
+row.
+
+Before a CSV file with a header is imported its header is compared with the
+field file. If they differ an evolved field file is written next to the
+original, named for the input (`taxi.tff` and `trips-2024-02.csv` give
+`taxi.trips-2024-02.tff`), and used for the import:
+
+* its fields are in header order, so columns are matched by header name
+  rather than by position;
+* fields the header no longer has are left out;
+* new columns are added with a type guessed from a sample of rows (widened
+  until it covers every sampled value).
+
+A header column matches a field if it is the field's section name or its
+`name`. A blank header column is `blank-<position>`, as in a generated field
+file, so it matches by position. A renamed column looks like a dropped
+column plus a new one. If no header column matches any field the header is
+assumed not to be related to the field file (e.g. a field file written by
+hand for a file without names) and columns are matched by position as
+before.
+"""
+import logging
+import os
+from typing import List, NamedTuple
+
+from pymongoimport.fieldfile import FieldFile
+from pymongoimport.type_converter import Converter
+
+SAMPLE_ROWS = 100
+
+
+class SchemaDrift(NamedTuple):
+    columns: List[str]      # the field for each header column (None if it is new)
+    added: List[str]        # header columns not in the field file
+    missing: List[str]      # field file fields not in the header
+
+
+def column_key(name: str, index: int) -> str:
+    """
+    The field file section name for the header column at `index`, as
+    `FieldFile.generate_field_file` makes it. A blank column is `blank-<index>`
+    so it is matched by position.
+    """
+    name = name.strip() if name is not None else ""
+    if name == "":
+        return f"blank-{index}"
+    return name.replace('$', '_').replace('.', '_')
+
+
+def detect_drift(field_file: FieldFile, header: List[str]) -> SchemaDrift:
+    """
+    Compare a header with a field file.
+
+    :return: None if the header matches the field file (or doesn't match it at all)
+    """
+    fields = field_file.fields()
+    by_name = {}
+    for k in fields:
+        by_name.setdefault(k, k)
+        by_name.setdefault(field_file.name_value(k), k)
+
+    keys = [column_key(h, i) for i, h in enumerate(header)]
+    columns = [by_name.get(k) for k in keys]
+    if columns == fields or not any(columns):
+        return None
+
+    added = [k for k, c in zip(keys, columns) if c is None]
+    missing = [k for k in fields if k not in set(columns)]
+    return SchemaDrift(columns, added, missing)
+
+
+def guess_column_type(values) -> str:
+    t = None
+    for v in values:
+        if v is not None and v.strip() != "":
+            t = Converter.widen_type(t, Converter.guess_type(v.strip()))
+    return t or "str"
+
+
+def make_evolved_tff_name(field_filename: str, name: str) -> str:
+    """
+    The evolved field file for the input `name`. It is per input so that
+    files with different headers never share (or race to write) one.
+    """
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f"{os.path.splitext(field_filename)[0]}.{stem}{FieldFile.DEFAULT_EXTENSION}"
+
+
+def evolve_field_file(field_file: FieldFile, header: List[str], rows: List[List[str]],
+                      ff_filename: str) -> FieldFile:
+    """
+    Write a field file for `header` from `field_file` to ff_filename, typing
+    new columns from `rows`.
+
+    :return: the evolved field file, or None if the header matches field_file
+    """
+    log = logging.getLogger(__name__)
+    drift = detect_drift(field_file, header)
+    if drift is None:
+        return None
+
+    toml_dict = {}
+    for i, (h, k) in enumerate(zip(header, drift.columns)):
+        if k is not None and k not in toml_dict:
+            toml_dict[k] = {o: v for o, v in field_file.field_dict[k].items() if v is not None}
+        else:
+            k = column_key(h, i)
+            if k in toml_dict or k in field_file.fields():  # a duplicate header name
+                k = f"{k}_{i}"
+            toml_dict[k] = {"type": guess_column_type(r[i] for r in rows if i < len(r)), "name": k}
+
+    FieldFile.write_field_file(ff_filename, toml_dict)
+    if drift.added:
+        log.warning(f"New columns {drift.added} added to '{ff_filename}' as "
+                    f"{[toml_dict[k]['type'] for k in toml_dict if k not in field_file.fields()]}")
+    if drift.missing:
+        log.warning(f"Columns {drift.missing} of '{field_file.field_filename}' are not in the header")
+    log.warning(f"The header doesn't match '{field_file.field_filename}', "
+                f"importing by column name with '{ff_filename}'")
+    return FieldFile(ff_filename)
@@ -0,0 +1,256 @@
+"""
+=====================================
+ShardRouter
+=====================================
+
+Group each batch of documents by the shard that owns their shard key so
+that every `insert_many` sent to mongos is shard local instead of being
+scattered across all the shards.
+
+The chunk ranges are read once from the config database
+(`config.collections` and `config.chunks`) by a `ConfigChunkSource`. Any
+object with the same `shard_key`, `chunks` and `shards` methods can be used
+instead, e.g. a `StaticChunkSource` in tests. If chunks move while the
+import is running the routing is stale, which costs efficiency but not
+correctness as mongos still sends each document to the right shard.
+
+An empty collection can be pre-split (`pre_split`) at shard key values
+sampled from the input and its chunks spread round robin across the
+shards before the load, so the balancer doesn't have to move data while
+the import runs.
+
+Hashed shard keys are not supported as the router would have to compute
+the server's hash of each value.
+"""
+import logging
+from bisect import bisect_right
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List
+
+import pymongo
+from bson import Binary, Decimal128, Int64, MaxKey, MinKey, ObjectId, Regex, Timestamp
+
+
+class ShardRouterException(Exception):
+    pass
+
+
+def bson_order(v) -> tuple:
+    """
+    A sort key that orders values the way MongoDB compares them: by the BSON
+    type order (MinKey, null, numbers, strings, objects, binary, ObjectId,
+    bool, date, timestamp, regex, MaxKey) and then by value.
+    """
+    if isinstance(v, MinKey):
+        return (0,)
+    elif v is None:
+        return (1,)
+    elif isinstance(v, bool):  # before int as bool is an int
+        return (8, v)
+    elif isinstance(v, (int, float, Int64)):
+        return (2, v)
+    elif isinstance(v, Decimal128):
+        return (2, v.to_decimal())
+    elif isinstance(v, Decimal):
+        return (2, v)
+    elif isinstance(v, str):
+        return (3, v.encode("utf-8"))
+    elif isinstance(v, dict):
+        return (4, tuple((bson_order(x)[0], k, bson_order(x)) for k, x in v.items()))
+    elif isinstance(v, (list, tuple)):
+        raise ShardRouterException(f"A shard key can't be an array: {v}")
+    elif isinstance(v, (bytes, Binary)):
+        return (6, len(v), getattr(v, "subtype", 0), bytes(v))
+    elif isinstance(v, ObjectId):
+        return (7, v.binary)
+    elif isinstance(v, datetime):
+        return (9, v.replace(tzinfo=None))
+    elif isinstance(v, Timestamp):
+        return (10, v.time, v.inc)
+    elif isinstance(v, Regex):
+        return (11, v.pattern, v.flags)
+    elif isinstance(v, MaxKey):
+        return (12,)
+    else:
+        raise ShardRouterException(f"Can't route on a shard key value of type {type(v).__name__}: {v}")
+
+
+def get_path(doc: dict, path: str):
+    """
+    The value of a dotted field path, None if it is missing (a missing
+    shard key is routed as null).
+    """
+    for name in path.split("."):
+        if not isinstance(doc, dict) or name not in doc:
+            return None
+        doc = doc[name]
+    return doc
+
+
+class ConfigChunkSource(object):
+    """
+    Read the shard key and chunk ranges of a sharded collection from the
+    config database (through mongos).
+    """
+
+    def __init__(self, client: pymongo.MongoClient, namespace: str):
+        self._client = client
+        self._namespace = namespace
+
+    @property
+    def namespace(self) -> str:
+        return self._namespace
+
+    def _collection_doc(self) -> dict:
+        doc = self._client["config"]["collections"].find_one({"_id": self._namespace})
+        if doc is None or doc.get("dropped"):
+            raise ShardRouterException(f"'{self._namespace}' is not a sharded collection")
+        return doc
+
+    def shard_key(self) -> dict:
+        return self._collection_doc()["key"]
+
+    def chunks(self) -> List[dict]:
+        """
+        The {"min", "max", "shard"} of each chunk. Chunks are keyed by the
+        collection uuid from 5.0 and by namespace before that.
+        """
+        doc = self._collection_doc()
+        query = {"ns": self._namespace}
+        if "uuid" in doc:
+            query = {"$or": [query, {"uuid": doc["uuid"]}]}
+        return list(self._client["config"]["chunks"].find(query, {"_id": 0, "min": 1, "max": 1, "shard": 1}))
+
+    def shards(self) -> List[str]:
+        return [s["_id"] for s in self._client["config"]["shards"].find({}, {"_id": 1})]
+
+
+class StaticChunkSource(object):
+    """
+    A fixed shard key and set of chunks, for tests and for routing without
+    access to the config database.
+    """
+
+    def __init__(self, shard_key: dict, chunks: List[dict], shards: List[str] = None):
+        self._shard_key = shard_key
+        self._chunks = chunks
+        self._shards = shards or sorted({c["shard"] for c in chunks})
+
+    def shard_key(self) -> dict:
+        return self._shard_key
+
+    def chunks(self) -> List[dict]:
+        return self._chunks
+
+    def shards(self) -> List[str]:
+        return self._shards
+
+
+class ShardRouter(object):
+
+    def __init__(self, source):
+        """
+        :param source: a `ConfigChunkSource` or an object with the same methods
+        """
+        self._log = logging.getLogger(__name__)
+        self._source = source
+        self._fields = []
+        self._mins = []
+        self._shards = []
+        self.refresh()
+
+    @property
+    def source(self):
+        return self._source
+
+    @property
+    def fields(self) -> List[str]:
+        return self._fields
+
+    def refresh(self):
+        """
+        Reread the shard key and chunk ranges from the source.
+        """
+        shard_key = self._source.shard_key()
+        if any(v == "hashed" for v in shard_key.values()):
+            raise ShardRouterException(f"Hashed shard key {shard_key} is not supported")
+        self._fields = list(shard_key)
+        chunks = sorted(self._source.chunks(), key=lambda c: self.order(c["min"]))
+        if not chunks:
+            raise ShardRouterException("No chunks found for the collection")
+        self._mins = [self.order(c["min"]) for c in chunks]
+        self._shards = [c["shard"] for c in chunks]
+        self._log.info(f"Routing on {shard_key} across {len(set(self._shards))} shard(s) and {len(chunks)} chunk(s)")
+
+    def key(self, doc: dict) -> dict:
+        """
+        The shard key of a document.
+        """
+        return {f: get_path(doc, f) for f in self._fields}
+
+    def order(self, key: dict) -> tuple:
+        return tuple(bson_order(key.get(f)) for f in self._fields)
+
+    def shard_for(self, doc: dict) -> str:
+        i = bisect_right(self._mins, self.order(self.key(doc))) - 1
+        return self._shards[max(i, 0)]
+
+    def group(self, docs: Iterable[dict]) -> Dict[str, List[dict]]:
+        """
+        Split docs into a list per shard, keeping their order within each shard.
+        """
+        groups = {}
+        for doc in docs:
+            groups.setdefault(self.shard_for(doc), []).append(doc)
+        return groups
+
+    def split_points(self, docs: Iterable[dict], chunk_count: int) -> List[dict]:
+        """
+        Shard key values that divide a sample of docs into up to chunk_count
+        ranges with roughly the same number of docs in each.
+        """
+        keys = {}
+        for doc in docs:
+            key = self.key(doc)
+            keys.setdefault(self.order(key), key)
+        ordered = [keys[k] for k in sorted(keys)]
+        points = []
+        for i in range(1, chunk_count):
+            point = ordered[i * len(ordered) // chunk_count] if ordered else None
+            if point is not None and (not points or points[-1] != point):
+                points.append(point)
+        return points
+
+
+def pre_split(client: pymongo.MongoClient, namespace: str, router: ShardRouter,
+              docs: Iterable[dict], chunk_count: int = 0) -> int:
+    """
+    Split an empty sharded collection at shard key values sampled from docs
+    and move the chunks round robin across the shards.
+
+    :param chunk_count: the number of chunks to make (default: one per shard)
+    :return: the number of chunks after splitting, 0 if the collection wasn't empty
+    """
+    log = logging.getLogger(__name__)
+    database, collection = namespace.split(".", 1)
+    if client[database][collection].count_documents({}, limit=1):
+        log.warning(f"Not pre-splitting '{namespace}' as it is not empty")
+        return 0
+
+    shards = router.source.shards()
+    chunk_count = chunk_count or len(shards)
+    for point in router.split_points(docs, chunk_count):
+        try:
+            client.admin.command("split", namespace, middle=point)
+        except pymongo.errors.OperationFailure as e:  # e.g. already a chunk boundary
+            log.warning(f"Can't split '{namespace}' at {point}: {e}")
+
+    chunks = sorted(router.source.chunks(), key=lambda c: router.order(c["min"]))
+    for i, chunk in enumerate(chunks):
+        target = shards[i % len(shards)]
+        if chunk["shard"] != target:
+            client.admin.command("moveChunk", namespace, bounds=[chunk["min"], chunk["max"]], to=target)
+    router.refresh()
+    log.info(f"Pre-split '{namespace}' into {len(chunks)} chunk(s) across {len(shards)} shard(s)")
+    return len(chunks)
@@ -68,7 +68,7 @@ using **--splitsize** chunks until it is consumed.
         print("No input file specified to split")
         sys.exit(0)
 
-    files = []
+    results = []
 
     for source in args.filenames:
 
@@ -76,57 +76,54 @@ using **--splitsize** chunks until it is consumed.
             print(f"No such input file:'{source}'")
             continue
 
-        splitter = File_Splitter(source, args.hasheader)
-        # if splitter.has_header:
-        #     print(f"{source} has a header line")
-
-        if args.autosplit:
-            if args.verbose:
-                print(f"Autosplitting: '{source}' into approximately {args.autosplit} parts")
-            for name, size in splitter.autosplit(args.autosplit):
-                files.append((name, size))
-        else:
-            if args.verbose:
-                print("Splitting '%s' using %i splitsize" % (args.filenames[0], args.splitsize))
-            for name, size in splitter.splitfile(args.splitsize):
-                files.append((name, size))
-
-        # print( "Split '%s' into %i parts"  % ( args.filenames[ 0 ], len( files )))
-
-        #print(f"{source} has {splitter.line_count}")
-        count = 1
-        total_size = 0
-        original_lines = splitter.line_count
-        total_new_lines = 0
-
-        results = list(files)
-        for name, lines in results:
-            total_new_lines = total_new_lines + lines
+        for count, (name, lines) in enumerate(split_file(source, args.autosplit, args.splitsize,
+                                                         args.hasheader, args.verbose), 1):
             if args.verbose:
                 print(f"{count:4}. '{name:20}'. Lines : {lines:6}")
+            results.append((name, lines))
 
-            count = count + 1
-        if len(files) > 1:
-            if args.verbose:
-                print(f"{source} {original_lines:16}")
-
-        # if len(files) > 1:
-        #     if args.verbose:
-        #         print("{} {:16} {:17}".format(" " * (len(i) + 7), total_lines, total_size))
-
-        if splitter.has_header:
-            print("Has_header")
-            original_lines = original_lines - 1
-        if files and (total_new_lines != original_lines):
-            raise ValueError(f"Lines of '{source}' and total lines of pieces"\
-                             f"{files}"
-                             f"\ndo not match:"
-                             f"\noriginal_lines : {original_lines}"
-                             f"\npieces lines   : {total_new_lines}")
-
+    return results
 
 
-    return results
+def split_file(source: str, autosplit: int = None, splitsize: int = None,
+               has_header: bool = False, verbose: bool = False):
+    """
+    Split source, yielding (name, lines) for each piece as it is written so
+    that the pieces of a large file can be processed (or printed) while it
+    is still being split.
+
+    Once the last piece has been yielded the line counts of the pieces are
+    checked against the line count of source.
+    """
+    splitter = File_Splitter(source, has_header)
+
+    if autosplit:
+        if verbose:
+            print(f"Autosplitting: '{source}' into approximately {autosplit} parts")
+        pieces = splitter.autosplit(autosplit)
+    else:
+        if verbose:
+            print("Splitting '%s' using %i splitsize" % (source, splitsize))
+        pieces = splitter.splitfile(splitsize)
+
+    piece_count = 0
+    total_new_lines = 0
+    for name, lines in pieces:
+        piece_count = piece_count + 1
+        total_new_lines = total_new_lines + lines
+        yield name, lines
+
+    original_lines = splitter.line_count
+    if piece_count > 1 and verbose:
+        print(f"{source} {original_lines:16}")
+
+    if splitter.has_header:
+        original_lines = original_lines - 1
+    if piece_count and (total_new_lines != original_lines):
+        raise ValueError(f"Lines of '{source}' and total lines of its {piece_count} pieces"
+                         f"\ndo not match:"
+                         f"\noriginal_lines : {original_lines}"
+                         f"\npieces lines   : {total_new_lines}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,73 @@
+"""
+=======================================
+startup - measure entry point start up
+=======================================
+
+Time how long each entry point takes to import in a fresh interpreter, and
+list the heavy dependencies it loads. Each is imported **--repeat** times
+and the fastest time is reported.
+
+    python -m pymongoimport.startup
+
+`pwc` and `splitfile` must not load `pymongo` or `requests`. `requests` and
+`dateutil` are only imported by the code that reads a URL or parses a date
+without a format, and `toml` when a field file is read or written.
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import List, Tuple
+
+ENTRY_POINTS = {
+    "pymongoimport": "pymongoimport.pymongoimport_main",
+    "pymultiimport": "pymongoimport.pymongomultiimport_main",
+    "splitfile": "pymongoimport.splitfile",
+    "pwc": "pymongoimport.pwc",
+}
+
+HEAVY_MODULES = ["pymongo", "requests", "dateutil", "toml", "configargparse", "pyarrow", "openpyxl"]
+
+MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+
+def measure(module: str, repeat: int = 5) -> Tuple[float, List[str]]:
+    """
+    Import module in `repeat` fresh interpreters.
+
+    :return: (the fastest import in seconds, the heavy modules it loaded)
+    """
+    best = None
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", MEASURE.format(module=module, heavy=HEAVY_MODULES)])
+        elapsed, loaded = json.loads(output)
+        best = elapsed if best is None else min(best, elapsed)
+    return best, loaded
+
+
+def startup(*argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="times to import each entry point [default: %(default)s]")
+    parser.add_argument("entry_points", nargs="*",
+                        help=f"entry points to measure, from {list(ENTRY_POINTS)} [default: all]")
+    args = parser.parse_args(*argv)
+    unknown = [e for e in args.entry_points if e not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry points: {unknown}")
+
+    print(f"{'entry point':<16}{'ms':>8}  loads")
+    for name in args.entry_points or ENTRY_POINTS:
+        elapsed, loaded = measure(ENTRY_POINTS[name], args.repeat)
+        print(f"{name:<16}{elapsed * 1000:>8.1f}  {', '.join(loaded)}")
+
+
+if __name__ == "__main__":
+    startup(sys.argv[1:])
@@ -0,0 +1,67 @@
+"""
+=====================================
+Time-series collections
+=====================================
+
+A field file with a `timeseries = "time"` field (and optionally a
+`timeseries = "meta"` field and a `granularity`) makes the import target a
+time-series collection, which is created before the first insert::
+
+    [pickup_datetime]
+    type = "datetime"
+    format = "%Y-%m-%d %H:%M:%S"
+    timeseries = "time"
+    granularity = "minutes"
+
+    [vendor_id]
+    type = "int"
+    timeseries = "meta"
+
+The server stores the documents in buckets of the same meta value and
+close times, so each batch is sorted by meta and then time before it is
+inserted. That way consecutive documents go into the same bucket rather
+than hopping between buckets.
+"""
+import logging
+from typing import Callable
+
+import pymongo
+
+from pymongoimport.shardrouter import bson_order, get_path
+
+
+def ensure_timeseries_collection(database: pymongo.database.Database, name: str, options: dict) -> bool:
+    """
+    Create the time-series collection `name` unless it already exists.
+
+    :param options: the `timeseries` options, see `FieldFile.timeseries_options`
+    :return: True if the collection was created
+    """
+    log = logging.getLogger(__name__)
+    existing = list(database.list_collections(filter={"name": name}))
+    if not existing:
+        log.info(f"Creating time-series collection '{database.name}.{name}' with {options}")
+        try:
+            database.create_collection(name, timeseries=options)
+            return True
+        except pymongo.errors.CollectionInvalid:  # another process got there first
+            existing = list(database.list_collections(filter={"name": name}))
+
+    info = existing[0]
+    current = info.get("options", {}).get("timeseries")
+    if info.get("type") != "timeseries" or current is None:
+        log.warning(f"'{database.name}.{name}' already exists and is not a time-series collection")
+    elif any(current.get(k) != v for k, v in options.items()):
+        log.warning(f"'{database.name}.{name}' already exists with time-series options {current} not {options}")
+    return False
+
+
+def batch_order(options: dict) -> Callable[[dict], tuple]:
+    """
+    A sort key that orders the docs of a batch by meta field and then time.
+    """
+    time_field = options["timeField"]
+    meta_field = options.get("metaField")
+    if meta_field is None:
+        return lambda doc: bson_order(get_path(doc, time_field))
+    return lambda doc: (bson_order(get_path(doc, meta_field)), bson_order(get_path(doc, time_field)))
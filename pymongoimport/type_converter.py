@@ -1,11 +1,21 @@
 import datetime
 from datetime import timezone
 
-from dateutil.parser import parse as date_parse
+
+def date_parse(v):
+    """
+    `dateutil.parser.parse`, imported on first use as most imports give a
+    format (or typed values) and never need it.
+    """
+    from dateutil.parser import parse
+    return parse(v)
 
 
 class Converter(object):
-    type_fields = ["int", "float", "str", "datetime", "date", "timestamp"]
+    type_fields = ["int", "float", "str", "bool", "datetime", "date", "timestamp", "any"]
+
+    TRUE_VALUES = ["true", "t", "yes", "y", "1"]
+    FALSE_VALUES = ["false", "f", "no", "n", "0", ""]
 
     def __init__(self, log=None, utctime=False):
 
@@ -16,9 +26,11 @@ class Converter(object):
             "int": Converter.to_int,
             "float": Converter.to_float,
             "str": Converter.to_str,
+            "bool": Converter.to_bool,
             "datetime": self.to_datetime,
             "date": self.to_datetime,
-            "timestamp": Converter.to_timestamp
+            "timestamp": Converter.to_timestamp,
+            "any": Converter.to_any
         }
 
         if self._utctime:
@@ -41,8 +53,30 @@ class Converter(object):
     def to_str(v):
         return str(v)
 
+    @staticmethod
+    def to_any(v):
+        """
+        Pass a value through unchanged, e.g. the lists, dicts and bytes of
+        nested or binary Arrow columns.
+        """
+        return v
+
+    @staticmethod
+    def to_bool(v):
+        if isinstance(v, bool):
+            return v
+        s = str(v).strip().lower()
+        if s in Converter.TRUE_VALUES:
+            return True
+        elif s in Converter.FALSE_VALUES:
+            return False
+        else:
+            raise ValueError(f"Cannot convert '{v}' to bool")
+
     def to_datetime(self, v, format=None):
-        if v == "NULL":
+        if isinstance(v, datetime.datetime):  # already typed e.g. from Arrow/Parquet
+            return v
+        elif v == "NULL":
             return None
         elif format is None:
             return date_parse(v)  # much slower than strptime, avoid for large jobs
@@ -66,6 +100,12 @@ class Converter(object):
     def convert_time(self, t, v, f=None):
         return self._converter[t](v, f)
 
+    def convert_strict(self, t, v):
+        """
+        As `convert` but raise a ValueError if v can't be converted to t.
+        """
+        return self._converter[t](v)
+
     def convert(self, t, v):
         """
         Use type entry for the field in the fieldConfig file (.ff) to determine what type
@@ -78,6 +118,21 @@ class Converter(object):
 
         return v
 
+    @staticmethod
+    def widen_type(a: str, b: str) -> str:
+        """
+        The narrowest type that can hold values of type `a` and `b`. `None`
+        means no value has been seen yet.
+        """
+        if a is None or a == b:
+            return b
+        elif b is None:
+            return a
+        elif {a, b} == {"int", "float"}:
+            return "float"
+        else:
+            return "str"
+
     @staticmethod
     def guess_type(s:str)->str:
         """
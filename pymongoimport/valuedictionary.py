@@ -0,0 +1,85 @@
+"""
+=====================================
+Value dictionaries
+=====================================
+
+Columns like vendor IDs, borough names or payment types repeat a handful of
+values millions of times. Rather than convert each cell and keep a new
+object for it in every doc, `LineToDictParser` keeps a dictionary of raw
+value to converted value for such columns. Each distinct value is converted
+once, and every doc in a batch shares the same value object (for a `str`
+column this interns the strings).
+
+Whether a column gets a dictionary depends on the field file:
+
+cardinality = "low"
+    always. The dictionary may hold up to `LOW_CARDINALITY_LIMIT` values.
+cardinality = "high"
+    never.
+no cardinality
+    the column is sampled: it starts with a dictionary which is dropped
+    for good once it holds more than `DEFAULT_LIMIT` distinct values (the
+    column then gets a `ConversionMemo` instead).
+
+Values that fail to convert are never added, so every bad cell is still
+reported.
+"""
+import logging
+
+
+class ValueDictionary(dict):
+
+    DEFAULT_LIMIT = 1024
+    LOW_CARDINALITY_LIMIT = 65536
+
+    def __init__(self, field: str, limit: int = None, hinted: bool = False):
+        """
+        :param field: the field file field the values belong to
+        :param limit: the number of distinct values kept before the dictionary is
+               dropped (`DEFAULT_LIMIT` if None)
+        :param hinted: True if the field file declares the column low cardinality
+        """
+        super().__init__()
+        self._field = field
+        self._limit = limit if limit is not None else ValueDictionary.DEFAULT_LIMIT
+        self._hinted = hinted
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def field(self) -> str:
+        return self._field
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @staticmethod
+    def for_field(field_file, field: str):
+        """
+        The dictionary for `field` or None if it is declared high cardinality.
+        """
+        cardinality = field_file.cardinality_value(field)
+        if cardinality == "low":
+            return ValueDictionary(field, ValueDictionary.LOW_CARDINALITY_LIMIT, hinted=True)
+        elif cardinality == "high":
+            return None
+        else:
+            return ValueDictionary(field)
+
+    def add(self, raw: str, value) -> bool:
+        """
+        Remember the converted `value` of `raw`.
+
+        :return: False if the column has too many distinct values and the
+                 dictionary should be dropped
+        """
+        self.misses = self.misses + 1
+        if len(self) >= self._limit:
+            if self._hinted:
+                logging.getLogger(__name__).warning(f"Field '{self._field}' has more than {self._limit} "
+                                                    f"distinct values but is declared cardinality = \"low\"")
+            self.clear()
+            return False
+        self[raw] = value
+        return True
@@ -0,0 +1,178 @@
+"""
+=====================================
+DirectoryWatcher
+=====================================
+
+Watch a spool directory and yield each file once it has been completely
+written, so that files can be imported seconds after they land.
+
+On Linux, if `inotify_simple` is installed, the watcher waits for
+`IN_CLOSE_WRITE` and `IN_MOVED_TO` events. Otherwise it polls the directory
+and treats a file as complete when its size and modification time have not
+changed for `settle` seconds. Files already in the directory when the watcher
+starts are returned too. With inotify a file that was modified less than
+`settle` seconds before the watcher started (and so may have been closed
+before the watch began, leaving no event to wait for) is checked again
+`settle` seconds later and returned if it hasn't changed.
+
+Only the top level of the directory is watched. Field files and hidden files
+are ignored, so writers can use a hidden name while a file is being written
+and rename it when it is complete.
+"""
+import os
+import time
+from typing import Dict, Iterator, List, Set, Tuple
+
+from pymongoimport.filediscovery import IGNORED_EXTENSIONS
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+
+class DirectoryWatcher(object):
+
+    def __init__(self, path: str, poll_interval: float = 1.0, settle: float = 2.0, use_inotify: bool = True):
+        """
+        :param path: the directory to watch
+        :param poll_interval: seconds between scans (or the inotify read timeout)
+        :param settle: seconds a polled file must be unchanged before it is complete
+        :param use_inotify: use inotify if it is available
+        """
+        if not os.path.isdir(path):
+            raise OSError(f"No such directory: '{path}'")
+        self._path = path
+        self._poll_interval = poll_interval
+        self._settle = settle
+        self._pending: Dict[str, Tuple[Tuple[int, float], float]] = {}
+        self._seen: Set[Tuple[str, int, float]] = set()
+        self._stopped = False
+        if use_inotify and INotify is not None:
+            self._inotify = INotify()
+            self._inotify.add_watch(path, flags.CLOSE_WRITE | flags.MOVED_TO)
+        else:
+            self._inotify = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify is not None
+
+    def stop(self):
+        self._stopped = True
+
+    @staticmethod
+    def is_candidate(name: str) -> bool:
+        return not name.startswith(".") and os.path.splitext(name)[1].lower() not in IGNORED_EXTENSIONS
+
+    def _scan(self) -> Dict[str, Tuple[int, float]]:
+        current = {}
+        with os.scandir(self._path) as it:
+            for entry in it:
+                if self.is_candidate(entry.name) and entry.is_file():
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:  # moved away while we were looking
+                        continue
+                    current[entry.path] = (st.st_size, st.st_mtime)
+        return current
+
+    def _mark(self, name: str, signature: Tuple[int, float]) -> bool:
+        """
+        Record that this version of a file has been returned. False if it already had been.
+        """
+        key = (name, signature[0], signature[1])
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        return True
+
+    def poll(self) -> List[str]:
+        """
+        Scan the directory once and return the files that have become complete
+        since the last scan, oldest first.
+        """
+        now = time.monotonic()
+        current = self._scan()
+        ready = []
+        for name, signature in current.items():
+            if (name, signature[0], signature[1]) in self._seen:
+                continue
+            previous = self._pending.get(name)
+            if previous and previous[0] == signature and now - previous[1] >= self._settle:
+                del self._pending[name]
+                if self._mark(name, signature):
+                    ready.append((signature[1], name))
+            elif previous is None or previous[0] != signature:
+                self._pending[name] = (signature, now)
+        for name in list(self._pending):
+            if name not in current:
+                del self._pending[name]
+        return [name for _, name in sorted(ready)]
+
+    def _recheck(self) -> List[str]:
+        """
+        Return the recently modified files found at start up that have been
+        unchanged for `settle` seconds. A file that has changed is given
+        another `settle` seconds.
+        """
+        now = time.monotonic()
+        ready = []
+        for name, (signature, since) in list(self._pending.items()):
+            if now - since < self._settle:
+                continue
+            try:
+                current = self._scan_one(name)
+            except FileNotFoundError:
+                del self._pending[name]
+                continue
+            if current != signature:
+                self._pending[name] = (current, now)
+                continue
+            del self._pending[name]
+            if self._mark(name, signature):
+                ready.append((signature[1], name))
+        return [name for _, name in sorted(ready)]
+
+    def _inotify_files(self) -> Iterator[str]:
+        # files that were complete before we started watching
+        cutoff = time.time() - self._settle
+        existing = sorted((s[1], n, s) for n, s in self._scan().items())
+        now = time.monotonic()
+        for mtime, name, signature in existing:
+            if mtime > cutoff:  # may still be being written, check again later
+                self._pending[name] = (signature, now)
+            elif self._mark(name, signature):
+                yield name
+        while not self._stopped:
+            timeout = self._poll_interval
+            if self._pending:
+                timeout = min(timeout, self._settle)
+            for event in self._inotify.read(timeout=int(timeout * 1000)):
+                name = os.path.join(self._path, event.name)
+                if self.is_candidate(event.name) and os.path.isfile(name):
+                    self._pending.pop(name, None)
+                    if self._mark(name, self._scan_one(name)):
+                        yield name
+            yield from self._recheck()
+
+    @staticmethod
+    def _scan_one(name: str) -> Tuple[int, float]:
+        st = os.stat(name)
+        return st.st_size, st.st_mtime
+
+    def files(self) -> Iterator[str]:
+        """
+        Yield complete files until `stop` is called.
+        """
+        if self._inotify:
+            yield from self._inotify_files()
+            return
+        while not self._stopped:
+            yield from self.poll()
+            if not self._stopped:
+                time.sleep(self._poll_interval)
@@ -0,0 +1,196 @@
+"""
+=====================================
+XLSXReader
+=====================================
+
+Stream rows from the sheets of an Excel workbook. The workbook is opened in
+openpyxl read only mode and rows are read with `iter_rows(values_only=True)`
+so memory use does not grow with the size of the sheet. This is the Excel
+counterpart of `FileReader` and provides the same `name`, `header_line` and
+`readline()` interface so it can be driven by `FileWriter` and
+`LineToDictParser`.
+
+Cell values are handed to the parser as the Python objects openpyxl returns
+(ints, floats, datetimes and strings) so they are not round tripped through
+strings.
+
+Each sheet is expected to hold a single table. Unless a `header_row` is given
+the header is taken to be the first row among the first `SAMPLE_ROWS` rows
+whose cells are all strings and that has as many non empty cells as the
+widest row in the sample, which skips the title rows above a table. Empty
+rows are skipped.
+
+Requires `openpyxl`.
+"""
+import datetime
+import itertools
+import os
+from typing import Iterator, List
+
+from pymongoimport.fieldfile import FieldFile
+from pymongoimport.type_converter import Converter
+
+
+class XLSXReaderException(Exception):
+    pass
+
+
+def load_workbook(name: str):
+    try:
+        import openpyxl
+    except ImportError:
+        raise XLSXReaderException("Reading Excel files requires openpyxl (pip install openpyxl)")
+    return openpyxl.load_workbook(filename=name, read_only=True, data_only=True)
+
+
+class XLSXReader(object):
+
+    EXTENSIONS = [".xlsx", ".xlsm"]
+    SAMPLE_ROWS = 50
+
+    def __init__(self,
+                 name: str,
+                 sheets: List[str] = None,
+                 header_row: int = None,
+                 limit: int = 0):
+        """
+        :param name: an Excel workbook
+        :param sheets: the sheets to read (default: all sheets in workbook order)
+        :param header_row: 1 based row number of the header, 0 for no header,
+                           None to detect the header row in each sheet
+        :param limit: Only read up to limit rows (0 for all rows)
+        """
+        self._name = name
+        self._limit = limit
+        self._header_row = header_row
+        self._header_line = None
+        self._workbook = load_workbook(name)
+
+        if sheets:
+            for s in sheets:
+                if s not in self._workbook.sheetnames:
+                    raise XLSXReaderException(f"No sheet '{s}' in '{name}' (sheets: {self._workbook.sheetnames})")
+            self._sheets = sheets
+        else:
+            self._sheets = self._workbook.sheetnames
+
+    @staticmethod
+    def is_xlsx_file(name: str) -> bool:
+        return os.path.splitext(name)[1].lower() in XLSXReader.EXTENSIONS
+
+    @staticmethod
+    def sheet_names(name: str) -> List[str]:
+        workbook = load_workbook(name)
+        try:
+            return workbook.sheetnames
+        finally:
+            workbook.close()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def sheets(self) -> List[str]:
+        return self._sheets
+
+    @property
+    def header_line(self) -> List[str]:
+        return self._header_line
+
+    @staticmethod
+    def find_header(rows: List[tuple]) -> int:
+        """
+        Return the 0 based index of the header in a sample of rows or -1 if
+        no row looks like a header.
+        """
+        widths = [sum(1 for v in r if v is not None) for r in rows]
+        width = max(widths, default=0)
+        if width == 0:
+            return -1
+        for i, row in enumerate(rows):
+            if widths[i] == width and all(isinstance(v, str) for v in row if v is not None):
+                return i
+        return -1
+
+    def _sheet_rows(self, sheet_name: str) -> Iterator[tuple]:
+        worksheet = self._workbook[sheet_name]
+
+        if self._header_row is None:
+            sample = list(worksheet.iter_rows(max_row=XLSXReader.SAMPLE_ROWS, values_only=True))
+            header_index = XLSXReader.find_header(sample)
+            header_row = header_index + 1
+        else:
+            header_row = self._header_row
+
+        if header_row > 0:
+            header = next(worksheet.iter_rows(min_row=header_row, max_row=header_row, values_only=True), ())
+            header = list(header)
+            while header and header[-1] is None:  # trailing empty columns are not part of the table
+                header.pop()
+            self._header_line = [str(h) if h is not None else f"blank-{i}" for i, h in enumerate(header)]
+            width = len(header)
+        else:
+            width = worksheet.max_column
+
+        for row in worksheet.iter_rows(min_row=header_row + 1, values_only=True):
+            if all(v is None for v in row):
+                continue
+            if width is None:  # sheet dimensions not recorded in the file
+                pass
+            elif len(row) > width:
+                row = row[:width]
+            elif len(row) < width:
+                row = row + (None,) * (width - len(row))
+            yield row
+
+    def readline(self, limit: int = 0) -> Iterator[tuple]:
+        rows = itertools.chain.from_iterable(self._sheet_rows(s) for s in self._sheets)
+        if limit > 0:
+            yield from itertools.islice(rows, limit)
+        else:
+            yield from rows
+
+    @staticmethod
+    def guess_type(v) -> str:
+        if isinstance(v, bool):
+            return "bool"
+        elif isinstance(v, int):
+            return "int"
+        elif isinstance(v, float):
+            return "int" if v.is_integer() else "float"
+        elif isinstance(v, (datetime.datetime, datetime.date)):
+            return "datetime"
+        else:
+            return "str"
+
+    widen_type = staticmethod(Converter.widen_type)
+
+    @staticmethod
+    def generate_field_file(name: str, ff_filename: str = None, sheets: List[str] = None,
+                            header_row: int = None) -> FieldFile:
+        """
+        Write a field file using the header and the first `SAMPLE_ROWS` data rows of
+        the first sheet. A column's type is widened until it covers every sampled value.
+        """
+        if ff_filename is None:
+            ff_filename = FieldFile.make_default_tff_name(name)
+
+        reader = XLSXReader(name, sheets=sheets, header_row=header_row)
+        sample = list(reader.readline(limit=XLSXReader.SAMPLE_ROWS))
+        if not sample or not reader.header_line:
+            raise XLSXReaderException(f"Can't find a header and a data row in '{name}'")
+
+        types = [None] * len(reader.header_line)
+        for row in sample:
+            for i, value in enumerate(row[:len(types)]):
+                if value is not None:
+                    types[i] = XLSXReader.widen_type(types[i], XLSXReader.guess_type(value))
+
+        toml_dict = {}
+        for key, t in zip(reader.header_line, types):
+            key = key.strip().replace('$', '_').replace('.', '_')
+            toml_dict[key] = {"type": t or "str", "name": key}
+
+        FieldFile.write_field_file(ff_filename, toml_dict)
+        return FieldFile(ff_filename)
@@ -51,6 +51,12 @@ by the parser.
                       "dateutils",
                       "toml"],
 
+    extras_require={"arrow": ["pyarrow"],
+                    "json": ["orjson"],
+                    "excel": ["openpyxl"],
+                    "watch": ["inotify_simple"],
+                    "compression": ["zstandard", "python-snappy"]},
+
     packages=find_packages(),
 
     data_files=[("test", glob.glob("data/*.ff") +
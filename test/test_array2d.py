@@ -0,0 +1,54 @@
+import unittest
+
+from pymongoimport.excelreader.array2d import Array2d
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._a = Array2d([(1, 2, 3), (4, 5, 6)])
+
+    def test_dimensions(self):
+        self.assertEqual(self._a.len_x(), 3)
+        self.assertEqual(self._a.len_y(), 2)
+        self.assertEqual(self._a.xy(2, 1), 6)
+        self.assertEqual(self._a.xy(0, 1), 4)
+        with self.assertRaises(IndexError):
+            self._a.xy(1, 2)
+        empty = Array2d([])
+        self.assertEqual((empty.len_x(), empty.len_y()), (0, 0))
+
+    def test_not_uniform(self):
+        with self.assertRaises(ValueError):
+            Array2d([(1, 2), (3,)])
+
+    def test_order(self):
+        self.assertEqual(list(self._a.row_first()), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(list(self._a.col_first()), [1, 4, 2, 5, 3, 6])
+        self.assertEqual([list(r) for r in self._a.row_order()], [[1, 2, 3], [4, 5, 6]])
+        self.assertEqual([list(c) for c in self._a.col_order()], [[1, 4], [2, 5], [3, 6]])
+
+    def test_views(self):
+        col = self._a.col(1)
+        self.assertEqual(len(col), 2)
+        self.assertEqual(col[0], 2)
+        self.assertEqual(col[-1], 5)
+        self.assertEqual(col, [2, 5])
+        self.assertEqual(self._a.row(1)[1:], [5, 6])
+        with self.assertRaises(IndexError):
+            col[2]
+
+    def test_transpose(self):
+        t = self._a.transpose()
+        self.assertEqual((t.len_x(), t.len_y()), (2, 3))
+        self.assertEqual([list(r) for r in t.row_order()], [[1, 4], [2, 5], [3, 6]])
+
+    def test_from_rows(self):
+        a = Array2d.from_rows(iter([(1, 2, 3), (4,), (5, 6, 7, 8)]))
+        self.assertEqual(list(a.row_first()), [1, 2, 3, 4, None, None, 5, 6, 7])
+        a = Array2d.from_rows([(1, 2, 3)], width=2)
+        self.assertEqual(list(a.row_first()), [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, date
+
+from pymongoimport.fieldfile import FieldFile
+from pymongoimport.linetodictparser import LineToDictParser
+from pymongoimport.doctimestamp import DocTimeStamp
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    import pyarrow.ipc
+    from pymongoimport.arrowreader import ArrowReader
+except ImportError:
+    pyarrow = None
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._table = pyarrow.table({
+            "item": ["Screws", "Bolts", "Nails", "Nuts"] * 25,
+            "amount": list(range(100)),
+            "price": [0.5 * i for i in range(100)],
+            "in_stock": [i % 2 == 0 for i in range(100)],
+            "last_order": [date(2016, 1, 1 + i % 28) for i in range(100)],
+        })
+        self._parquet = os.path.join(self._dir, "inventory.parquet")
+        pyarrow.parquet.write_table(self._table, self._parquet, row_group_size=10)
+        self._arrow = os.path.join(self._dir, "inventory.arrow")
+        with pyarrow.ipc.new_file(self._arrow, self._table.schema) as writer:
+            for batch in self._table.to_batches(max_chunksize=25):
+                writer.write_batch(batch)
+
+    def tearDown(self):
+        for name in os.listdir(self._dir):
+            os.unlink(os.path.join(self._dir, name))
+        os.rmdir(self._dir)
+
+    def test_is_arrow_file(self):
+        self.assertTrue(ArrowReader.is_arrow_file("x.parquet"))
+        self.assertTrue(ArrowReader.is_arrow_file("x.feather"))
+        self.assertFalse(ArrowReader.is_arrow_file("x.csv"))
+
+    def test_field_types(self):
+        ff = ArrowReader.generate_field_file(self._parquet)
+        self.assertEqual(ff.field_filename, os.path.join(self._dir, "inventory.tff"))
+        self.assertEqual(ff.fields(), ["item", "amount", "price", "in_stock", "last_order"])
+        self.assertEqual([ff.type_value(k) for k in ff.fields()], ["str", "int", "float", "bool", "datetime"])
+
+    def test_read(self):
+        for name in [self._parquet, self._arrow]:
+            rows = list(ArrowReader(name).readline())
+            self.assertEqual(len(rows), 100)
+            self.assertEqual(rows[3], ("Nuts", 3, 1.5, False, datetime(2016, 1, 4)))
+            self.assertEqual(len(list(ArrowReader(name).readline(limit=7))), 7)
+            self.assertEqual(len(list(ArrowReader(name, limit=30).readline())), 30)
+            self.assertEqual(len(list(ArrowReader(name, limit=30).readline(limit=7))), 7)
+
+    def test_projection(self):
+        ff = ArrowReader.generate_field_file(self._parquet)
+        parser = LineToDictParser(ff,
+                                  locator=False,
+                                  timestamp=DocTimeStamp.NO_TIMESTAMP,
+                                  include=["item"],
+                                  where="amount > 95")
+        self.assertEqual(parser.input_fields, ["item", "amount"])
+        reader = ArrowReader(self._parquet, fields=ff.fields(), columns=parser.input_fields)
+        self.assertEqual(reader.columns, ["item", "amount"])
+        docs = [parser.parse_list(row, i) for i, row in enumerate(reader.readline(), 1)]
+        docs = [d for d in docs if d is not None]
+        self.assertEqual(docs, [{"item": "Screws"}, {"item": "Bolts"}, {"item": "Nails"}, {"item": "Nuts"}])
+
+    def test_parse_native(self):
+        ff = ArrowReader.generate_field_file(self._arrow)
+        parser = LineToDictParser(ff, locator=False, timestamp=DocTimeStamp.NO_TIMESTAMP)
+        row = next(ArrowReader(self._arrow, fields=ff.fields()).readline())
+        self.assertEqual(parser.parse_list(row, 1), {"item": "Screws",
+                                                     "amount": 0,
+                                                     "price": 0.0,
+                                                     "in_stock": True,
+                                                     "last_order": datetime(2016, 1, 1)})
+
+    def test_nested(self):
+        table = pyarrow.table({
+            "item": ["Screws", "Bolts"],
+            "sizes": [[4, 6], []],
+            "supplier": [{"name": "Acme", "country": "IE"}, {"name": "Bolt Co", "country": "UK"}],
+            "photo": [b"\x89PNG", None],
+        })
+        name = os.path.join(self._dir, "nested.parquet")
+        pyarrow.parquet.write_table(table, name)
+        ff = ArrowReader.generate_field_file(name)
+        self.assertEqual([ff.type_value(k) for k in ff.fields()], ["str", "any", "any", "any"])
+        parser = LineToDictParser(ff, locator=False, timestamp=DocTimeStamp.NO_TIMESTAMP)
+        docs = [parser.parse_list(row, i) for i, row in enumerate(ArrowReader(name).readline(), 1)]
+        self.assertEqual(docs[0], {"item": "Screws",
+                                   "sizes": [4, 6],
+                                   "supplier": {"name": "Acme", "country": "IE"},
+                                   "photo": b"\x89PNG"})
+        self.assertEqual(docs[1]["sizes"], [])
+        self.assertNotIn("photo", docs[1])  # a missing value, as for any other type
+
+    def test_partition(self):
+        for name, groups in [(self._parquet, 10), (self._arrow, 4)]:
+            reader = ArrowReader(name)
+            self.assertEqual(reader.row_group_count(), groups)
+            parts = reader.partition(3)
+            self.assertEqual(len(parts), 3)
+            self.assertEqual(sum(parts, []), list(range(groups)))
+            total = 0
+            for row_groups in parts:
+                self.assertEqual(reader.first_row_number(row_groups), total + 1)
+                total = total + len(list(ArrowReader(name, row_groups=row_groups).readline()))
+            self.assertEqual(total, 100)
+            self.assertEqual(len(ArrowReader(name).partition(50)), groups)
+
+
+if __name__ == "__main__":
+    unittest.main()
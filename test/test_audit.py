@@ -62,6 +62,15 @@ class Test_Audit(unittest.TestCase):
         self.assertEqual(3, self._audit.get_last_batch_id())
         self._audit.end_batch(id1)
 
+    def test_imported_files(self):
+        batch_id = self._audit.start_batch(doc={"test": "doc"})
+        self._audit.add_imported_file(batch_id, ("/data/a.csv", 100, 1.0), "db.a")
+        self._audit.add_imported_file(batch_id, ("/data/b.csv", 200, 2.0), "db.b")
+        self._audit.end_batch(batch_id)
+        self.assertEqual(self._audit.imported_files("db.a"), {("/data/a.csv", 100, 1.0)})
+        self.assertEqual(self._audit.imported_files(), {("/data/a.csv", 100, 1.0), ("/data/b.csv", 200, 2.0)})
+        self.assertEqual(self._audit.imported_files("db.c"), set())
+
 
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+import pymongoimport.excelreader
+from pymongoimport.excelreader.crosstab import CrossTabLayout, CrossTabException, column_index, cell_index
+
+try:
+    import openpyxl
+    from pymongoimport.excelreader.crosstab import CrossTabWorkbook
+except ImportError:
+    openpyxl = None
+
+
+def f(path):
+    return os.path.join(os.path.dirname(pymongoimport.excelreader.__file__), path)
+
+
+ROWS = [
+    ("Title",),
+    ("Q1. Do you like tests?",),
+    (None, None, "Total", "Gender", None),
+    (None, None, None, "Male", "Female"),
+    ("Base", None, 10, 6, 4),
+    (None,),
+    ("Q1. ", "Yes", 7, 5, 2),
+    (None, None, 0.7, 0.833, 0.5),
+    (None, "No", 3, 1, "-"),
+    (None, None, 0.3, 0.167, "-"),
+    (None,),
+    (None, None, 99, 99, 99),
+]
+
+LAYOUT = {"question_cell": "A2", "statement_cell": "", "group_row": 3, "subgroup_row": 4,
+          "base_row": 5, "first_response_row": 7}
+
+
+class Test(unittest.TestCase):
+
+    def test_index(self):
+        self.assertEqual(column_index("A"), 1)
+        self.assertEqual(column_index("ab"), 28)
+        self.assertEqual(column_index(3), 3)
+        self.assertEqual(cell_index("B10"), (10, 2))
+        with self.assertRaises(CrossTabException):
+            cell_index("10B")
+
+    def test_parse(self):
+        doc = CrossTabLayout(LAYOUT).parse("Q1", iter(ROWS))
+        self.assertEqual(doc["question"], "Q1. Do you like tests?")
+        self.assertEqual(doc["base"], {"Total": 10, "Gender": {"Male": 6, "Female": 4}})
+        self.assertEqual(len(doc["responses"]), 2)
+        self.assertEqual(doc["responses"][0]["response"], "Yes")
+        self.assertEqual(doc["responses"][0]["values"]["Total"], {"count": 7, "percent": 0.7})
+        self.assertEqual(doc["responses"][1]["values"]["Gender"]["Female"], {"count": None, "percent": None})
+
+    def test_groups(self):
+        layout = CrossTabLayout(LAYOUT, groups={"All": "C", "Sex": {"F": "E"}})
+        self.assertEqual(layout.max_column, 5)
+        doc = layout.parse("Q1", ROWS)
+        self.assertEqual(doc["base"], {"All": 10, "Sex": {"F": 4}})
+        self.assertEqual(doc["responses"][0]["values"], {"All": {"count": 7, "percent": 0.7},
+                                                         "Sex": {"F": {"count": 2, "percent": 0.5}}})
+
+    def test_read(self):
+        with self.assertRaises(CrossTabException):
+            CrossTabLayout({"colour": "blue"})
+        layout = CrossTabLayout.read(f("emeadevit.xtab"))
+        self.assertTrue(layout.match_sheet("Q12a"))
+        self.assertFalse(layout.match_sheet("Summary"))
+        self.assertEqual(layout["response_column"], "B")
+
+    @unittest.skipIf(openpyxl is None, "openpyxl is not installed")
+    def test_workbook(self):
+        workbook = CrossTabWorkbook(f("emeadevit.xlsx"), CrossTabLayout.read(f("emeadevit.xtab")))
+        doc = workbook.read_sheet("Q3")
+        self.assertTrue(doc["question"].startswith("Q3. How strongly"))
+        self.assertEqual(doc["base"]["Total"], 1516)
+        self.assertEqual(doc["base"]["Gender"], {"Male": 1015, "Female": 501})
+        self.assertEqual([r["response"] for r in doc["responses"]],
+                         ["Strongly agree", "Somewhat Agree", "Neither agree nor disagree",
+                          "Somewhat Disagree", "Strongly disagree"])
+        self.assertEqual(doc["responses"][4]["values"]["Age"]["16-24"], {"count": None, "percent": None})
+        docs = list(workbook.docs(poolsize=2))
+        self.assertEqual([d["question_id"] for d in docs], workbook.sheet_names())
+        self.assertEqual(docs[2], doc)
+
+
+if __name__ == "__main__":
+    unittest.main()
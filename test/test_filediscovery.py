@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pymongoimport.filediscovery import discover_files, file_key, read_filelist
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        for name, size in [("a.csv", 10), ("a.tff", 5), ("sub/b.csv", 30), ("sub/deeper/c.txt", 20),
+                           (".hidden/d.csv", 1), ("sub/.e.csv", 1)]:
+            path = os.path.join(self._dir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write("x" * size)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def p(self, name):
+        return os.path.join(self._dir, name)
+
+    def test_directory(self):
+        self.assertEqual(list(discover_files([self._dir])),
+                         [self.p("a.csv"), self.p("sub/b.csv"), self.p("sub/deeper/c.txt")])
+
+    def test_glob(self):
+        self.assertEqual(list(discover_files([self.p("*.csv")])), [self.p("a.csv")])
+        self.assertEqual(list(discover_files([self.p("**/*.csv")])), [self.p("a.csv"), self.p("sub/b.csv")])
+        self.assertEqual(list(discover_files([self.p("*")])),
+                         [self.p("a.csv"), self.p("sub/b.csv"), self.p("sub/deeper/c.txt")])
+
+    def test_duplicates_and_missing(self):
+        names = [self.p("a.csv"), self._dir, "missing.csv", "http://example.com/x.csv"]
+        self.assertEqual(list(discover_files(names)),
+                         [self.p("a.csv"), self.p("sub/b.csv"), self.p("sub/deeper/c.txt"),
+                          "missing.csv", "http://example.com/x.csv"])
+
+    def test_sort_by_size(self):
+        self.assertEqual(list(discover_files([self._dir], sort_by_size=True)),
+                         [self.p("sub/b.csv"), self.p("sub/deeper/c.txt"), self.p("a.csv")])
+
+    def test_skip(self):
+        skip = {file_key(self.p("sub/b.csv"))}
+        self.assertEqual(list(discover_files([self._dir], skip=skip)),
+                         [self.p("a.csv"), self.p("sub/deeper/c.txt")])
+        with open(self.p("sub/b.csv"), "a") as f:  # a changed file is imported again
+            f.write("more")
+        self.assertIn(self.p("sub/b.csv"), list(discover_files([self._dir], skip=skip)))
+
+    def test_read_filelist(self):
+        filelist = self.p("files.txt")
+        with open(filelist, "w") as f:
+            f.write("a.csv\n\n# comment\n  sub/b.csv  \r\n")
+        self.assertEqual(read_filelist(filelist), ["a.csv", "sub/b.csv"])
+
+
+if __name__ == "__main__":
+    unittest.main()
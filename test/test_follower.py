@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pymongoimport.follower import FileFollower
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._name = os.path.join(self._dir, "log.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def append(self, text):
+        with open(self._name, "a") as f:
+            f.write(text)
+
+    def follower(self, **kwargs):
+        return FileFollower(self._name, poll_interval=0, **kwargs)
+
+    def test_follow(self):
+        self.append("a,b\n1,2\n3,")
+        follower = self.follower(has_header=True)
+        rows = follower.readline()
+        self.assertEqual(next(rows), ["1", "2"])
+        self.assertEqual(follower.header_line, ["a", "b"])
+        self.assertIsNone(next(rows))  # "3," is incomplete
+        self.append("4\n\n5,6\n")
+        self.assertEqual(next(rows), ["3", "4"])
+        self.assertEqual(next(rows), ["5", "6"])
+        self.assertIsNone(next(rows))
+        follower.stop()
+        self.assertEqual(list(rows), [])
+
+    def test_checkpoint(self):
+        self.append("1,2\n3,4\n")
+        follower = self.follower()
+        rows = follower.readline()
+        self.assertEqual(next(rows), ["1", "2"])
+        follower.commit()
+        self.assertEqual(next(rows), ["3", "4"])  # read but not committed
+
+        self.append("5,6\n")
+        follower = self.follower()
+        self.assertEqual(follower.first_line_number, 2)
+        rows = follower.readline()
+        self.assertEqual(next(rows), ["3", "4"])
+        self.assertEqual(next(rows), ["5", "6"])
+        follower.commit()
+
+        follower = self.follower()
+        self.assertEqual(follower.first_line_number, 4)
+        self.assertEqual(follower.offset, os.path.getsize(self._name))
+
+    def test_truncate(self):
+        self.append("1,2\n3,4\n")
+        follower = self.follower()
+        rows = follower.readline()
+        self.assertEqual([next(rows), next(rows), next(rows)], [["1", "2"], ["3", "4"], None])
+        with open(self._name, "w") as f:
+            f.write("7,8\n")
+        self.assertEqual(next(rows), ["7", "8"])
+
+    def test_replaced(self):
+        self.append("1,2\n")
+        follower = self.follower()
+        rows = follower.readline()
+        self.assertEqual(next(rows), ["1", "2"])
+        follower.commit()
+        os.rename(self._name, self._name + ".1")
+        self.append("9,9\n")
+        self.assertIsNone(next(rows))
+        self.assertEqual(next(rows), ["9", "9"])
+        self.assertEqual(self.follower().first_line_number, 1)  # checkpoint was for the old file
+
+
+if __name__ == "__main__":
+    unittest.main()
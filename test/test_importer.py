@@ -0,0 +1,130 @@
+import argparse
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+
+import pymongo
+
+from pymongoimport.argparser import add_standard_args
+from pymongoimport.command import ImportCommand
+from pymongoimport.pymongoimport_main import Importer
+from pymongoimport.pymongomultiimport_main import run_pool
+
+path_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def f(path):
+    return os.path.join(path_dir, path)
+
+
+def parse_args(args):
+    return add_standard_args(argparse.ArgumentParser()).parse_args(args)
+
+
+class PoolImporter(object):
+    """
+    Records which worker process set it up and ran each file.
+    """
+
+    def __init__(self, dir):
+        self._dir = dir
+
+    def setup_log_handlers(self):
+        pass
+
+    def warm_up(self):
+        open(os.path.join(self._dir, f"init-{os.getpid()}"), "w").close()
+
+    def run(self, filename, row_groups=None):
+        if filename == "bad.csv":
+            raise ValueError("can't import")
+        with open(os.path.join(self._dir, f"run-{filename}"), "w") as run:
+            run.write(str(os.getpid()))
+
+
+class Test(unittest.TestCase):
+    """
+    MongoClient connects lazily so none of these tests need a server.
+    """
+
+    def test_shared_client(self):
+        importer = Importer(None, None, parse_args(["--database", "TEST_IMPORTER", "x.csv"]))
+        client = importer.client
+        self.assertIs(importer.client, client)
+        self.assertIs(importer.collection, importer.collection)
+        self.assertEqual(importer.collection.full_name, "TEST_IMPORTER.imported")
+        copy = pickle.loads(pickle.dumps(importer))
+        self.assertIsNone(copy._client)
+        client.close()
+
+    def test_given_client(self):
+        client = pymongo.MongoClient(connect=False)
+        importer = Importer(None, None, parse_args(["x.csv"]), client=client)
+        self.assertIs(importer.client, client)
+        client.close()
+
+    def test_field_file_cache(self):
+        client = pymongo.MongoClient(connect=False)
+        collection = client["TEST_IMPORTER"]["test"]
+        field_files = {}
+        cmds = [ImportCommand(collection=collection, field_filename=f("data/10k.tff"),
+                              field_files=field_files) for _ in range(2)]
+        for cmd in cmds:
+            cmd.pre_execute(f("data/10k.txt"))
+        self.assertEqual(list(field_files), [f("data/10k.tff")])
+        self.assertIs(cmds[0].fieldinfo, cmds[1].fieldinfo)
+        client.close()
+
+    def test_default_field_file(self):
+        importer = Importer(None, None, parse_args(["a.csv", "b.csv"]))
+        self.assertEqual(importer.command("a.csv")._field_filename, "a.tff")
+        self.assertEqual(importer.command("b.csv")._field_filename, "b.tff")
+        importer.client.close()
+
+    def test_record_imported(self):
+        class ManifestAudit(object):
+            def __init__(self):
+                self.files = []
+
+            def add_imported_file(self, batch_id, key, namespace):
+                self.files.append((batch_id, key[0], namespace))
+
+        audit = ManifestAudit()
+        client = pymongo.MongoClient(connect=False)
+        importer = Importer(audit, 7, parse_args(["--database", "db", "--collection", "c", "x.csv"]), client=client)
+        importer.record_imported(f("data/10k.txt"))
+        importer.record_imported("http://example.com/x.csv")  # not a local file
+        importer.record_imported("/dev/stdin")
+        self.assertEqual(audit.files, [(7, f("data/10k.txt"), "db.c")])
+
+        importer = Importer(audit, 7, parse_args(["--limit", "10", "x.csv"]), client=client)
+        importer.record_imported(f("data/10k.txt"))  # not a complete import
+        self.assertEqual(len(audit.files), 1)
+        client.close()
+
+    def test_pool(self):
+        dir = tempfile.mkdtemp()
+        try:
+            units = [(f"{i}.csv", {"row_groups": [i]}) for i in range(20)] + [("bad.csv", {})]
+            completed = Counter()
+            failed = run_pool(units, 3, PoolImporter(dir), multiprocessing.get_context("fork"), completed=completed)
+            self.assertEqual(failed, 1)
+            self.assertEqual(completed, Counter(f"{i}.csv" for i in range(20)))
+            files = os.listdir(dir)
+            init_pids = {n.split("-")[1] for n in files if n.startswith("init-")}
+            self.assertLessEqual(len(init_pids), 3)  # each worker is set up once
+            run_pids = set()
+            for i in range(20):
+                with open(os.path.join(dir, f"run-{i}.csv")) as run:
+                    run_pids.add(run.read())
+            self.assertTrue(run_pids <= init_pids)
+        finally:
+            shutil.rmtree(dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import pymongo
+
+from pymongoimport.fieldfile import FieldFile, FieldFileException
+from pymongoimport.indexes import DeferredIndexes, field_file_indexes, field_index_model, index_model
+from pymongoimport.pymongoimport_main import pymongoimport_main
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_index_model(self):
+        model = index_model({"v": 2, "key": {"a": 1, "b": -1}, "name": "a_1_b_-1", "unique": True})
+        self.assertEqual(model.document, {"key": {"a": 1, "b": -1}, "name": "a_1_b_-1", "unique": True})
+
+    def test_field_index_model(self):
+        self.assertEqual(field_index_model("a", True).document["key"], {"a": 1})
+        self.assertEqual(field_index_model("a", -1).document["key"], {"a": -1})
+        self.assertTrue(field_index_model("a", "unique").document["unique"])
+        self.assertEqual(field_index_model("a", "2dsphere").document["key"], {"a": "2dsphere"})
+        self.assertRaises(FieldFileException, field_index_model, "a", "sideways")
+
+    def test_field_file_indexes(self):
+        ff_name = os.path.join(self._dir, "indexed.tff")
+        with open(ff_name, "w") as ff:
+            ff.write('[Borough]\ntype = "str"\nname = "borough"\nindex = true\n'
+                     '[Count]\ntype = "int"\n'
+                     '[Code]\ntype = "str"\nindex = "unique"\n')
+        models = field_file_indexes(FieldFile(ff_name))
+        self.assertEqual([m.document["key"] for m in models], [{"borough": 1}, {"Code": 1}])
+        self.assertEqual(field_file_indexes(None), [])
+
+    def test_unique_indexes_kept(self):
+        class Collection(object):
+            full_name = "TEST_INDEXES.indexed"
+            dropped = []
+
+            def list_indexes(self):
+                return [{"name": "_id_", "key": {"_id": 1}},
+                        {"name": "a_1", "key": {"a": 1}, "unique": True},
+                        {"name": "b_1", "key": {"b": 1}}]
+
+            def drop_index(self, name):
+                self.dropped.append(name)
+
+        collection = Collection()
+        indexes = DeferredIndexes(collection)
+        self.assertEqual(indexes.drop(), ["b_1"])
+        self.assertEqual(collection.dropped, ["b_1"])
+        self.assertEqual([s["name"] for s in indexes.specs], ["b_1"])
+
+    def test_long_running_not_deferred(self):
+        for mode in [["--watch", self._dir], ["--follow", "x.csv"]]:
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit, msg=mode):
+                pymongoimport_main(["--deferindexes"] + mode)
+
+
+class TestDeferredIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self._client = pymongo.MongoClient()
+        self._collection = self._client["TEST_INDEXES"]["indexed"]
+        self._collection.drop()
+
+    def tearDown(self):
+        self._client.drop_database("TEST_INDEXES")
+        self._client.close()
+
+    def test_drop_and_build(self):
+        self._collection.create_index("a", unique=True)
+        self._collection.create_index([("b", 1), ("c", -1)])
+        indexes = DeferredIndexes(self._collection)
+        self.assertEqual(indexes.drop(), ["b_1_c_-1"])  # the unique index is kept
+        self.assertEqual(sorted(self._collection.index_information()), ["_id_", "a_1"])
+        self._collection.insert_many([{"a": i, "b": i, "c": i} for i in range(100)])
+        indexes.build([field_index_model("d", True)])
+        info = self._collection.index_information()
+        self.assertEqual(sorted(info), ["_id_", "a_1", "b_1_c_-1", "d_1"])
+        self.assertTrue(info["a_1"]["unique"])
+
+
+if __name__ == "__main__":
+    unittest.main()
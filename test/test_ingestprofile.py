@@ -0,0 +1,51 @@
+import argparse
+import unittest
+
+from pymongoimport.argparser import add_standard_args
+from pymongoimport.filewriter import FileWriter
+from pymongoimport.ingestprofile import IngestProfile, available_compressors, profile_settings
+from pymongoimport.pymongoimport_main import Importer
+
+
+def parse_args(args):
+    return add_standard_args(argparse.ArgumentParser()).parse_args(args)
+
+
+class Test(unittest.TestCase):
+
+    def test_profiles(self):
+        bulk = profile_settings(IngestProfile.BULK)
+        durable = profile_settings("durable")
+        self.assertFalse(bulk.ordered)
+        self.assertFalse(bulk.j)
+        self.assertGreater(bulk.in_flight, 1)
+        self.assertEqual(durable.w, "majority")
+        self.assertTrue(durable.j)
+        self.assertTrue(durable.ordered)
+        self.assertEqual(durable.in_flight, 1)
+        self.assertGreater(bulk.batch_size, durable.batch_size)
+
+    def test_compressors(self):
+        compressors = available_compressors()
+        self.assertEqual(compressors[-1], "zlib")
+
+    def test_args(self):
+        args = parse_args(["--profile", "durable", "x.csv"])
+        self.assertEqual(args.profile, IngestProfile.DURABLE)
+        self.assertIsNone(parse_args(["x.csv"]).profile)
+
+    def test_client(self):
+        client = Importer.make_client(parse_args(["--profile", "durable", "x.csv"]))
+        self.assertEqual(client.write_concern.document, {"w": "majority", "j": True})
+        client.close()
+        client = Importer.make_client(parse_args(["--profile", "bulk", "x.csv"]))
+        self.assertEqual(client.write_concern.document, {"w": 1, "j": False})
+        client.close()
+
+    def test_row_size(self):
+        self.assertEqual(FileWriter.row_size(["ab", "cde"]), 5)
+        self.assertEqual(FileWriter.row_size({"a": "ab", "b": 1}), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
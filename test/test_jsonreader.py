@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from pymongoimport.dicttodictparser import DictToDictParser
+from pymongoimport.doctimestamp import DocTimeStamp
+from pymongoimport.jsonreader import InvalidJSON, JSONLineReader, JSONLineReaderException
+from pymongoimport.linetodictparser import ErrorResponse
+from pymongoimport.rejects import ParseErrors
+
+path_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def f(path):
+    return os.path.join(path_dir, path)
+
+
+class Test(unittest.TestCase):
+
+    def test_is_json_file(self):
+        self.assertTrue(JSONLineReader.is_json_file("a.jsonl"))
+        self.assertTrue(JSONLineReader.is_json_file("a.NDJSON"))
+        self.assertTrue(JSONLineReader.is_json_file("https://example.com/a.json?x=1"))
+        self.assertFalse(JSONLineReader.is_json_file("a.csv"))
+
+    def test_readline(self):
+        docs = list(JSONLineReader(f("data/inventory.jsonl")).readline())
+        self.assertEqual(len(docs), 4)  # blank line skipped
+        self.assertEqual(docs[0]["Amount"], 300)
+        self.assertEqual(docs[3]["Supplier"], {"name": "Acme", "country": "IE"})
+        self.assertEqual(len(list(JSONLineReader(f("data/inventory.jsonl")).readline(limit=2))), 2)
+
+    def test_invalid_json(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as bad:
+            bad.write('{"a": 1}\n{"a": \n')
+        try:
+            docs = list(JSONLineReader(bad.name).readline())
+            self.assertEqual(docs[0], {"a": 1})
+            self.assertIsInstance(docs[1], InvalidJSON)
+            self.assertEqual(docs[1].line, '{"a": \n')
+
+            errors = ParseErrors()
+            parser = DictToDictParser(locator=False, errors=errors)
+            self.assertEqual([parser.parse_list(d, i) for i, d in enumerate(docs, 1)], [{"a": 1}, None])
+            self.assertEqual(errors.totals[ParseErrors.MALFORMED], 1)
+            parser = DictToDictParser(locator=False, onerror=ErrorResponse.Fail)
+            self.assertRaises(ValueError, parser.parse_list, docs[1], 2)
+        finally:
+            os.unlink(bad.name)
+
+    def test_not_json_lines(self):
+        for text in ['[\n  {"a": 1},\n  {"a": 2}\n]\n', '{\n  "a": 1\n}\n', '{"a": 1,\n "b": 2}\n']:
+            with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as pretty:
+                pretty.write(text)
+            try:
+                self.assertRaises(JSONLineReaderException, list, JSONLineReader(pretty.name).readline())
+            finally:
+                os.unlink(pretty.name)
+
+    def test_byte_ranges(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as big:
+            for i in range(1000):
+                big.write(f'{{"n": {i}, "pad": "{"x" * (i % 37)}"}}\n')
+                if i % 100 == 0:
+                    big.write("\n")  # blank lines aren't counted
+        try:
+            for parts in [1, 2, 3, 7, 64]:
+                ranges = JSONLineReader.byte_ranges(big.name, parts)
+                self.assertEqual(len(ranges), parts)
+                self.assertEqual(ranges[0][0], 0)
+                self.assertEqual(ranges[-1][1], os.path.getsize(big.name))
+                seen = []
+                for r, first in zip(ranges, JSONLineReader.first_line_numbers(big.name, ranges)):
+                    docs = list(JSONLineReader(big.name, byte_range=r, first_line_number=first).readline())
+                    if docs:
+                        self.assertEqual(first, docs[0]["n"] + 1)  # the line number of a single reader
+                    seen.extend(d["n"] for d in docs)
+                self.assertEqual(seen, list(range(1000)), parts)
+        finally:
+            os.unlink(big.name)
+
+    def test_generate_field_file(self):
+        ff = JSONLineReader.generate_field_file(f("data/inventory.jsonl"), f("data/inventory_json_test.tff"))
+        try:
+            self.assertEqual(ff.type_value("Amount"), "int")
+            self.assertEqual(ff.type_value("Last Order"), "datetime")
+            self.assertEqual(ff.type_value("Supplier"), "str")
+        finally:
+            os.unlink(ff.field_filename)
+
+    def test_parser(self):
+        docs = list(JSONLineReader(f("data/inventory.jsonl")).readline())
+
+        parser = DictToDictParser(locator=False)
+        self.assertEqual(parser.parse_list(dict(docs[0]), 1), docs[0])
+
+        ff = JSONLineReader.generate_field_file(f("data/inventory.jsonl"), f("data/inventory_json_test.tff"))
+        try:
+            parser = DictToDictParser(ff,
+                                      locator=True,
+                                      exclude=["Supplier"],
+                                      where="Last_Order >= date('2017-01-01')")
+            parsed = [parser.parse_list(dict(d), i) for i, d in enumerate(docs, 1)]
+            self.assertEqual(parsed[0], None)
+            self.assertEqual(parsed[1], {"Inventory Item": "Bolts",
+                                         "Amount": 150,
+                                         "Last Order": datetime(2017, 2, 3),
+                                         "locator": {"line": 2}})
+            self.assertEqual(parser.row_filter.rejected, 2)
+        finally:
+            os.unlink(ff.field_filename)
+
+        parser = DictToDictParser(include=["Amount"], locator=False, timestamp=DocTimeStamp.BATCH_TIMESTAMP,
+                                  where="Supplier['country'] == 'UK'")
+        parsed = [parser.parse_list(dict(d), i) for i, d in enumerate(docs, 1)]
+        self.assertEqual([p["Amount"] for p in parsed if p], [25])
+        self.assertTrue(isinstance([p for p in parsed if p][0]["timestamp"], datetime))
+
+    def test_not_an_object(self):
+        errors = ParseErrors()
+        parser = DictToDictParser(locator=False, errors=errors, where="a > 1")
+        self.assertEqual(parser.parse_list([1, 2], 1), None)
+        self.assertEqual(parser.parse_list(3, 2), None)
+        self.assertEqual(parser.parse_list({"a": 2}, 3), {"a": 2})
+        self.assertEqual(errors.totals[ParseErrors.MALFORMED], 2)
+
+        parser = DictToDictParser(locator=False, onerror=ErrorResponse.Fail)
+        self.assertRaises(ValueError, parser.parse_list, "x", 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import os
+import unittest
+from datetime import datetime
+
+from pymongoimport.fieldfile import FieldFile, FieldFileException
+from pymongoimport.filereader import FileReader
+from pymongoimport.linetodictparser import LineToDictParser
+from pymongoimport.doctimestamp import DocTimeStamp
+from pymongoimport.docdecorator import DocDecorator
+from pymongoimport.valuedictionary import ValueDictionary
+from pymongoimport.conversionmemo import ConversionMemo
+
+path_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def f(path):
+    return os.path.join(path_dir, path)
+
+
+class Test(unittest.TestCase):
+
+    def first_row(self, filename, delimiter="|"):
+        reader = FileReader(f(filename), has_header=False, delimiter=delimiter)
+        return next(reader.readline())
+
+    def test_no_projection(self):
+        ff = FieldFile(f("data/10k.tff"))
+        parser = LineToDictParser(ff, locator=False, timestamp=DocTimeStamp.NO_TIMESTAMP)
+        doc = parser.parse_list(self.first_row("data/10k.txt"), 1)
+        self.assertEqual(list(doc.keys()), ff.fields())
+        self.assertEqual(doc["test_id"], 17)
+        self.assertEqual(doc["test_date"], datetime(2013, 5, 2))
+
+    def test_include(self):
+        ff = FieldFile(f("data/10k.tff"))
+        parser = LineToDictParser(ff,
+                                  locator=False,
+                                  timestamp=DocTimeStamp.NO_TIMESTAMP,
+                                  include=["make", "test_id"])
+        doc = parser.parse_list(self.first_row("data/10k.txt"), 1)
+        self.assertEqual(doc, {"test_id": 17, "make": "SUZUKI"})
+
+    def test_exclude(self):
+        ff = FieldFile(f("data/10k.tff"))
+        parser = LineToDictParser(ff,
+                                  locator=False,
+                                  timestamp=DocTimeStamp.NO_TIMESTAMP,
+                                  exclude=["test_date", "first_use_date"])
+        doc = parser.parse_list(self.first_row("data/10k.txt"), 1)
+        self.assertEqual(len(doc), len(ff.fields()) - 2)
+        self.assertFalse("test_date" in doc)
+        self.assertFalse("first_use_date" in doc)
+
+    def test_skip_in_field_file(self):
+        ff = FieldFile(f("data/10k_projected.tff"))
+        self.assertTrue(ff.skip_value("model"))
+        self.assertFalse(ff.skip_value("make"))
+        parser = LineToDictParser(ff, locator=False, timestamp=DocTimeStamp.NO_TIMESTAMP)
+        doc = parser.parse_list(self.first_row("data/10k.txt"), 1)
+        for k in ["model", "colour", "fuel_type"]:
+            self.assertFalse(k in doc)
+        self.assertEqual(doc["make"], "SUZUKI")
+
+        # an explicit include overrides skip
+        parser = LineToDictParser(ff,
+                                  locator=False,
+                                  timestamp=DocTimeStamp.NO_TIMESTAMP,
+                                  include=["model"])
+        doc = parser.parse_list(self.first_row("data/10k.txt"), 1)
+        self.assertEqual(doc, {"model": "UNCLASSIFIED"})
+
+    def test_bad_projection(self):
+        ff = FieldFile(f("data/10k.tff"))
+        with self.assertRaises(FieldFileException):
+            LineToDictParser(ff, include=["nosuchfield"])
+
+    def test_timestamp(self):
+        ff = FieldFile(f("data/10k.tff"))
+        row = self.first_row("data/10k.txt")
+        parser = LineToDictParser(ff, locator=True, timestamp=DocTimeStamp.DOC_TIMESTAMP)
+        doc = parser.parse_list(row, 7)
+        self.assertEqual(doc["locator"], {"line": 7})
+        self.assertTrue(isinstance(doc["timestamp"], datetime))
+        parser = LineToDictParser(ff, locator=False, timestamp=DocTimeStamp.BATCH_TIMESTAMP)
+        first = parser.parse_list(row, 1)
+        second = parser.parse_list(row, 2)
+        self.assertFalse("locator" in first)
+        self.assertIs(first["timestamp"], second["timestamp"])
+
+    def test_decorator(self):
+        ff = FieldFile(f("data/10k.tff"))
+        decorator = DocDecorator(locator=True, filename="10k.txt", batch_id=3)
+        parser = LineToDictParser(ff, include=["make"], decorator=decorator)
+        doc = parser.parse_list(self.first_row("data/10k.txt"), 1)
+        self.assertEqual(doc, {"make": "SUZUKI", "locator": {"line": 1}, "filename": "10k.txt", "batch_id": 3})
+        self.assertFalse(DocDecorator())
+
+    def test_value_dictionary(self):
+        ff = FieldFile(f("data/10k.tff"))
+        parser = LineToDictParser(ff, locator=False)
+        row = self.first_row("data/10k.txt")
+        first = parser.parse_list(list(row), 1)
+        second = parser.parse_list([(c + " ")[:-1] for c in row], 2)  # new str objects
+        self.assertEqual(first, second)
+        self.assertIs(first["make"], second["make"])
+        self.assertIs(first["test_date"], second["test_date"])
+
+        ValueDictionary.DEFAULT_LIMIT, limit = 2, ValueDictionary.DEFAULT_LIMIT
+        try:
+            parser = LineToDictParser(ff, locator=False)
+        finally:
+            ValueDictionary.DEFAULT_LIMIT = limit
+        test_id = [p[0] for p in parser.plan].index(0)
+        for i in range(3):
+            row[0] = str(i)
+            self.assertEqual(parser.parse_list(row, i)["test_id"], i)
+        self.assertIsInstance(parser.plan[test_id][-1], ConversionMemo)
+        self.assertIsNotNone(parser.plan[test_id + 1][-1])
+
+    def test_cardinality(self):
+        ff = FieldFile(f("data/10k.tff"))
+        ff.field_dict["make"]["cardinality"] = "high"
+        ff.field_dict["model"]["cardinality"] = "low"
+        plan = {p[1]: p[-1] for p in LineToDictParser(ff).plan}
+        self.assertIsNone(plan["make"])
+        self.assertEqual(plan["model"].limit, ValueDictionary.LOW_CARDINALITY_LIMIT)
+
+    def test_conversion_memo(self):
+        memo = ConversionMemo("test_date", capacity=2)
+        memo.add("a", 1)
+        memo.add("b", 2)
+        self.assertEqual(memo["a"], 1)
+        memo.add("c", 3)  # evicts "b", the least recently used
+        self.assertEqual(list(memo.keys()), ["a", "c"])
+
+        memo = ConversionMemo("test_id")
+        for i in range(ConversionMemo.WINDOW - 1):
+            self.assertTrue(memo.add(str(i), i))
+        self.assertFalse(memo.add("last", 0))  # no hits in the window
+        self.assertEqual(len(memo), 0)
+
+    def test_cache_stats(self):
+        ff = FieldFile(f("data/10k.tff"))
+        row = self.first_row("data/10k.txt")
+        ValueDictionary.DEFAULT_LIMIT, limit = 1, ValueDictionary.DEFAULT_LIMIT
+        ConversionMemo.PAUSE_ROWS, pause_rows = 5, ConversionMemo.PAUSE_ROWS
+        try:
+            parser = LineToDictParser(ff, locator=False, include=["test_id", "test_date", "make"])
+            make = ff.fields().index("make")
+            for i in range(3):
+                row[0] = row[make] = str(i)
+                parser.parse_list(row, i)
+            memos = {p[1]: p[-1] for p in parser.plan}
+            self.assertIsInstance(memos["test_id"], ConversionMemo)
+            self.assertIsInstance(memos["test_date"], ValueDictionary)
+            self.assertIsNone(memos["make"])  # a str column doesn't get a memo
+            stats = parser.cache_stats()
+            self.assertEqual(stats["test_date"], (2, 1))
+            self.assertEqual(stats["test_id"], (0, 3))
+
+            parser.drop_values(memos["test_id"])  # as if its hit rate were low
+            self.assertIsNone(parser.plan[0][-1])
+            for i in range(5):
+                parser.parse_list(row, i)
+            self.assertIs(parser.plan[0][-1], memos["test_id"])
+        finally:
+            ValueDictionary.DEFAULT_LIMIT = limit
+            ConversionMemo.PAUSE_ROWS = pause_rows
+
+
+if __name__ == "__main__":
+    unittest.main()
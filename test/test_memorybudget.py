@@ -0,0 +1,119 @@
+import itertools
+import os
+import threading
+import time
+import unittest
+
+from pymongoimport.fieldfile import FieldFile
+from pymongoimport.filereader import FileReader
+from pymongoimport.filewriter import FileWriter
+from pymongoimport.linetodictparser import LineToDictParser
+from pymongoimport.memorybudget import MemoryBudget, current_rss, parse_size, peak_rss
+
+path_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def f(path):
+    return os.path.join(path_dir, path)
+
+
+class InsertResult(object):
+
+    def __init__(self, docs):
+        self.inserted_ids = list(range(len(docs)))
+
+
+class SlowCollection(object):
+    """
+    Just enough of a collection for FileWriter, recording how many inserts
+    overlap.
+    """
+
+    def __init__(self, delay):
+        self._delay = delay
+        self._lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.batches = []
+
+    def insert_many(self, docs, ordered=True):
+        with self._lock:
+            self.running = self.running + 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self._delay)
+        with self._lock:
+            self.running = self.running - 1
+            self.batches.append(len(docs))
+        return InsertResult(docs)
+
+
+class Test(unittest.TestCase):
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size("1000"), 1000)
+        self.assertEqual(parse_size("512K"), 512 * 1024)
+        self.assertEqual(parse_size("1.5g"), 1536 * 1024 * 1024)
+        self.assertEqual(parse_size("64MB"), 64 * 1024 * 1024)
+        self.assertRaises(ValueError, parse_size, "lots")
+
+    def test_rss(self):
+        self.assertGreater(current_rss(), 0)
+        self.assertGreaterEqual(peak_rss(), current_rss() // 2)
+
+    def test_budget(self):
+        rss = [100]
+        budget = MemoryBudget(150, rss=lambda: rss[0])
+        self.assertFalse(budget.exceeded())
+        rss[0] = 200
+        self.assertTrue(budget.exceeded())
+        self.assertTrue(budget.exceeded())
+        self.assertEqual(budget.throttled, 2)
+
+        # the RSS doesn't fall once the inserts drain, so it becomes the floor
+        slack = 150 // MemoryBudget.SLACK_FRACTION
+        rss[0] = 140
+        budget.drained()
+        self.assertEqual(budget.limit, 140 + slack)
+        rss[0] = 140 + slack
+        self.assertFalse(budget.exceeded())
+        rss[0] = 141 + slack
+        self.assertTrue(budget.exceeded())
+
+        # but the floor is never raised past the budget
+        rss[0] = 200
+        with self.assertLogs("pymongoimport.memorybudget", "WARNING"):
+            budget.drained()
+        self.assertEqual(budget.limit, 150 + slack)
+        self.assertTrue(budget.exceeded())
+        budget.drained()
+        self.assertEqual(budget.limit, 150 + slack)
+        rss[0] = 50
+        budget.drained()
+        self.assertEqual(budget.limit, 150)
+
+    def write(self, budget, delay):
+        collection = SlowCollection(delay)
+        reader = FileReader(f("data/10k.txt"), has_header=False, delimiter="|")
+        parser = LineToDictParser(FieldFile(f("data/10k.tff")), locator=False)
+        writer = FileWriter(collection, reader, parser, batch_size=2500, in_flight=4, memory_budget=budget)
+        self.assertEqual(writer.write(), 10000)
+        return collection
+
+    def test_backpressure(self):
+        collection = self.write(None, delay=0.5)
+        self.assertGreater(collection.max_running, 1)
+        self.assertEqual(collection.batches, [2500] * 4)
+
+        growing = itertools.count(1)
+        collection = self.write(MemoryBudget(0, rss=lambda: next(growing)), delay=0.01)  # always over
+        self.assertEqual(collection.max_running, 1)
+        self.assertEqual(collection.batches, [MemoryBudget.CHECK_ROWS] * 10)
+
+        # over the budget once, but the RSS stays put after the inserts drain
+        collection = self.write(MemoryBudget(100, rss=lambda: 110), delay=0.5)
+        self.assertGreater(collection.max_running, 1)
+        self.assertEqual(collection.batches, [MemoryBudget.CHECK_ROWS] + [2500] * 3 + [1500])
+
+
+if __name__ == "__main__":
+    unittest.main()
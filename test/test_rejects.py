@@ -0,0 +1,106 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pymongoimport.fieldfile import FieldFile
+from pymongoimport.filereader import FileReader
+from pymongoimport.linetodictparser import ErrorResponse, LineToDictParser
+from pymongoimport.rejects import ParseErrors, RejectStream
+
+path_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def f(path):
+    return os.path.join(path_dir, path)
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._rejects = os.path.join(self._dir, "rejects.jsonl")
+        self._ff = FieldFile(f("data/10k.tff"))
+        reader = FileReader(f("data/10k.txt"), has_header=False, delimiter="|")
+        self._row = next(reader.readline())
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def read_rejects(self):
+        if not os.path.isfile(self._rejects):
+            return []
+        with open(self._rejects) as rejects:
+            return [json.loads(line) for line in rejects]
+
+    def test_reject_stream(self):
+        stream = RejectStream(self._rejects, batch_size=2)
+        stream.reject({"line": 1})
+        self.assertEqual(self.read_rejects(), [])
+        stream.reject({"line": 2})
+        stream.reject({"line": 3})
+        self.assertEqual([r["line"] for r in self.read_rejects()], [1, 2])
+        stream.flush()
+        self.assertEqual([r["line"] for r in self.read_rejects()], [1, 2, 3])
+        self.assertEqual(stream.count, 3)
+
+    def test_malformed_row(self):
+        parser = LineToDictParser(self._ff, locator=False)
+        self.assertRaises(ValueError, parser.parse_list, self._row[:-1], 1)
+
+        errors = ParseErrors("10k.txt", RejectStream(self._rejects))
+        parser = LineToDictParser(self._ff, locator=False, errors=errors)
+        self.assertIsNone(parser.parse_list(self._row[:-1], 5))
+        self.assertIsNotNone(parser.parse_list(self._row, 6))
+        parser.end_batch()
+        rejects = self.read_rejects()
+        self.assertEqual(len(rejects), 1)
+        self.assertEqual(rejects[0]["line"], 5)
+        self.assertEqual(rejects[0]["raw"], self._row[:-1])
+        self.assertEqual(rejects[0]["filename"], "10k.txt")
+        self.assertEqual(errors.totals, {ParseErrors.MALFORMED: 1})
+
+    def test_missing_value(self):
+        row = list(self._row)
+        row[1] = None  # e.g. a Parquet null
+        errors = ParseErrors("10k.txt", RejectStream(self._rejects))
+        parser = LineToDictParser(self._ff, locator=False, errors=errors)
+        doc = parser.parse_list(row, 1)
+        self.assertNotIn(self._ff.fields()[1], doc)
+        parser.end_batch()
+        self.assertEqual(self.read_rejects(), [])
+        self.assertEqual(errors.totals, {})
+        self.assertEqual(errors.missing_totals, {self._ff.fields()[1]: 1})
+
+    def test_conversion_error(self):
+        row = list(self._row)
+        row[0] = "seventeen"  # test_id is an int
+        errors = ParseErrors("10k.txt", RejectStream(self._rejects))
+        parser = LineToDictParser(self._ff, locator=False, errors=errors)
+        for i in range(3):
+            doc = parser.parse_list(row, i + 1)
+            self.assertEqual(doc["test_id"], "seventeen")
+        self.assertEqual(errors.totals, {"test_id": 3})
+        parser.end_batch()
+        rejects = self.read_rejects()
+        self.assertEqual(len(rejects), 3)
+        self.assertEqual(rejects[0]["field"], "test_id")
+
+        errors = ParseErrors("10k.txt")
+        parser = LineToDictParser(self._ff, locator=False, onerror=ErrorResponse.Ignore, errors=errors)
+        parser.parse_list(row, 1)
+        self.assertEqual(errors.totals, {})
+
+    def test_muted(self):
+        errors = ParseErrors()
+        parser = LineToDictParser(self._ff, locator=False, errors=errors)
+        row = list(self._row)
+        row[0] = "x"
+        with errors.muted():
+            parser.parse_list(row, 1)
+        self.assertEqual(errors.totals, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import unittest
+from datetime import datetime
+
+from pymongoimport.fieldfile import FieldFile
+from pymongoimport.filereader import FileReader
+from pymongoimport.linetodictparser import LineToDictParser
+from pymongoimport.rowfilter import RowFilter, RowFilterException
+
+path_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def f(path):
+    return os.path.join(path_dir, path)
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._ff = FieldFile(f("data/10k.tff"))
+        reader = FileReader(f("data/10k.txt"), has_header=False, delimiter="|")
+        self._rows = list(reader.readline(limit=100))
+
+    def test_identifier(self):
+        self.assertEqual(RowFilter.identifier("Date of Transfer"), "Date_of_Transfer")
+        self.assertEqual(RowFilter.identifier("Old/New"), "Old_New")
+        self.assertEqual(RowFilter.identifier("1st"), "_1st")
+
+    def test_converted_columns(self):
+        rf = RowFilter("test_mileage > 50000 and make == 'FORD'", self._ff)
+        self.assertEqual(rf.columns, ["make", "test_mileage"])
+        matched = [r for r in self._rows if rf(r)]
+        expected = [r for r in self._rows if int(r[6]) > 50000 and r[8] == "FORD"]
+        self.assertEqual(matched, expected)
+        self.assertEqual(rf.matched, len(expected))
+        self.assertEqual(rf.rejected, len(self._rows) - len(expected))
+
+    def test_raw_columns(self):
+        rf = RowFilter("raw_test_date[:7] == '2013-05'", self._ff)
+        matched = [r for r in self._rows if rf(r)]
+        self.assertEqual(matched, [r for r in self._rows if r[2].startswith("2013-05")])
+
+    def test_date_constant(self):
+        rf = RowFilter("test_date >= date('2013-06-01') and test_date.year == 2013", self._ff)
+        matched = [r for r in self._rows if rf(r)]
+        self.assertEqual(matched, [r for r in self._rows if "2013-06-01" <= r[2] < "2014"])
+
+    def test_type_mismatch_rejects(self):
+        rf = RowFilter("make > 10", self._ff)
+        self.assertFalse(rf(self._rows[0]))
+        for expr in ["test_mileage / (test_mileage - test_mileage) > 1",  # ZeroDivisionError
+                     "test_mileage.year == 2013",  # AttributeError
+                     "make[100] == 'F'"]:  # IndexError
+            rf = RowFilter(expr, self._ff)
+            self.assertFalse(rf(self._rows[0]), expr)
+        rf = RowFilter("missing[0] == 1")  # a dict key that isn't there
+        self.assertFalse(rf({}))
+
+    def test_bad_expressions(self):
+        for expr in ["nosuchcolumn == 1",
+                     "make.__class__",
+                     "__import__('os')",
+                     "[x for x in make]",
+                     "make ==",
+                     "open('x')",
+                     "test_mileage > int('x')",
+                     "test_date > date('not a date')"]:
+            with self.assertRaises(RowFilterException, msg=expr):
+                RowFilter(expr, self._ff)
+
+    def test_parser_filter(self):
+        parser = LineToDictParser(self._ff, where="make == 'SUZUKI'")
+        docs = [parser.parse_list(r, i) for i, r in enumerate(self._rows, 1)]
+        docs = [d for d in docs if d is not None]
+        self.assertTrue(len(docs) > 0)
+        for d in docs:
+            self.assertEqual(d["make"], "SUZUKI")
+            self.assertTrue(isinstance(d["test_date"], datetime))
+        self.assertEqual(parser.row_filter.rejected, len(self._rows) - len(docs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import pymongo
+
+from pymongoimport.command import ImportCommand
+from pymongoimport.fieldfile import FieldFile
+from pymongoimport.linetodictparser import LineToDictParser
+from pymongoimport.schemadrift import detect_drift, evolve_field_file, guess_column_type, make_evolved_tff_name
+
+path_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def f(path):
+    return os.path.join(path_dir, path)
+
+
+INVENTORY = '''
+[Item]
+type = "str"
+[Amount]
+type = "int"
+name = "amount"
+["Last Order"]
+type = "datetime"
+format = "%d-%b-%Y"
+'''
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._ff_name = os.path.join(self._dir, "inventory.tff")
+        with open(self._ff_name, "w") as ff:
+            ff.write(INVENTORY)
+        self._ff = FieldFile(self._ff_name)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_detect_drift(self):
+        self.assertIsNone(detect_drift(self._ff, ["Item", "Amount", "Last Order"]))
+        self.assertIsNone(detect_drift(self._ff, ["a", "b", "c"]))  # unrelated header
+        drift = detect_drift(self._ff, ["Last Order", "amount", "Price"])
+        self.assertEqual(drift.columns, ["Last Order", "Amount", None])
+        self.assertEqual(drift.added, ["Price"])
+        self.assertEqual(drift.missing, ["Item"])
+
+    def test_blank_header_columns(self):
+        ff = FieldFile(f("data/AandE_Data_2011-04-10.tff"))
+        with open(f("data/AandE_Data_2011-04-10.csv"), newline="") as csv_file:
+            header = next(csv.reader(csv_file))
+        self.assertEqual(header[:3], ["", "", "SHA"])
+        self.assertIsNone(detect_drift(ff, header))
+
+        drift = detect_drift(ff, header[1:])  # one blank column dropped
+        self.assertEqual(drift.added, [])
+        self.assertEqual(drift.missing, ["blank-1"])
+        self.assertNotIn("", drift.columns)
+        evolved = evolve_field_file(ff, header[1:], [], os.path.join(self._dir, "AandE.tff"))
+        self.assertEqual(evolved.fields()[:2], ["blank-0", "SHA"])
+
+    def test_guess_column_type(self):
+        self.assertEqual(guess_column_type(["1", "2", ""]), "int")
+        self.assertEqual(guess_column_type(["1", "2.5"]), "float")
+        self.assertEqual(guess_column_type(["1", "x"]), "str")
+        self.assertEqual(guess_column_type(["", None]), "str")
+
+    def test_evolve(self):
+        header = ["Last Order", "Item", "Price", "Amount"]
+        rows = [["31-Dec-2017", "Nails", "0.5", "25"], ["29-Feb-2016", "Nuts", "1", "75"]]
+        evolved_name = make_evolved_tff_name(self._ff_name, "/data/inventory-2018.csv")
+        self.assertEqual(evolved_name, os.path.join(self._dir, "inventory.inventory-2018.tff"))
+        evolved = evolve_field_file(self._ff, header, rows, evolved_name)
+        self.assertEqual(evolved.fields(), header)
+        self.assertEqual(evolved.type_value("Price"), "float")
+        self.assertEqual(evolved.name_value("Amount"), "amount")
+        self.assertEqual(evolved.format_value("Last Order"), "%d-%b-%Y")
+        doc = LineToDictParser(evolved, locator=False).parse_list(rows[0], 1)
+        self.assertEqual(doc["amount"], 25)
+        self.assertEqual(doc["Price"], 0.5)
+        self.assertEqual(doc["Item"], "Nails")
+        self.assertIsNone(evolve_field_file(self._ff, ["Item", "Amount", "Last Order"], [], evolved_name))
+
+    def test_import_command(self):
+        csv_name = os.path.join(self._dir, "inventory-2018.csv")
+        with open(csv_name, "w") as csv_file:
+            csv_file.write("Item,Amount,Supplier,Last Order\nNails,25,Acme,31-Dec-2017\n")
+        collection = pymongo.MongoClient(connect=False)["TEST_SCHEMADRIFT"]["inventory"]
+        cmd = ImportCommand(collection, field_filename=self._ff_name, has_header=True)
+        cmd.pre_execute(csv_name)
+        self.assertEqual(cmd.fieldinfo.fields(), ["Item", "Amount", "Supplier", "Last Order"])
+        self.assertTrue(os.path.isfile(os.path.join(self._dir, "inventory.inventory-2018.tff")))
+
+
+if __name__ == "__main__":
+    unittest.main()
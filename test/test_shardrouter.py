@@ -0,0 +1,70 @@
+import unittest
+from datetime import datetime
+
+from bson import MaxKey, MinKey, ObjectId
+
+from pymongoimport.shardrouter import ShardRouter, ShardRouterException, StaticChunkSource, bson_order
+
+
+def chunk(lo, hi, shard):
+    return {"min": {"borough": lo}, "max": {"borough": hi}, "shard": shard}
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        # deliberately out of order, the router sorts them
+        self._source = StaticChunkSource({"borough": 1},
+                                         [chunk("M", "Q", "shard1"),
+                                          chunk(MinKey(), "B", "shard0"),
+                                          chunk("B", "M", "shard2"),
+                                          chunk("Q", MaxKey(), "shard0")])
+
+    def test_bson_order(self):
+        values = [MaxKey(), datetime(2020, 1, 1), True, ObjectId(), {"a": 1}, "abc", 2.5, 1, None, MinKey()]
+        ordered = sorted(values, key=bson_order)
+        self.assertEqual(ordered[0].__class__, MinKey)
+        self.assertEqual(ordered[1:9], [None, 1, 2.5, "abc", {"a": 1}, values[3], True, datetime(2020, 1, 1)])
+        self.assertEqual(ordered[-1].__class__, MaxKey)
+        self.assertRaises(ShardRouterException, bson_order, [1, 2])
+
+    def test_shard_for(self):
+        router = ShardRouter(self._source)
+        self.assertEqual(router.fields, ["borough"])
+        self.assertEqual(router.shard_for({"borough": "Bronx"}), "shard2")
+        self.assertEqual(router.shard_for({"borough": "B"}), "shard2")  # min is inclusive
+        self.assertEqual(router.shard_for({"borough": "Manhattan"}), "shard1")
+        self.assertEqual(router.shard_for({"borough": "Queens"}), "shard0")
+        self.assertEqual(router.shard_for({"borough": 7}), "shard0")  # numbers sort before strings
+        self.assertEqual(router.shard_for({"other": "x"}), "shard0")  # missing is null
+
+    def test_group(self):
+        router = ShardRouter(self._source)
+        docs = [{"borough": b, "n": i} for i, b in enumerate(["Queens", "Bronx", "Manhattan", "Brooklyn", "Queens"])]
+        groups = router.group(docs)
+        self.assertEqual(list(groups), ["shard0", "shard2", "shard1"])
+        self.assertEqual([d["n"] for d in groups["shard0"]], [0, 4])
+        self.assertEqual([d["n"] for d in groups["shard2"]], [1, 3])
+
+    def test_compound_key(self):
+        source = StaticChunkSource({"a": 1, "b.c": 1},
+                                   [{"min": {"a": MinKey(), "b.c": MinKey()}, "max": {"a": 5, "b.c": 0}, "shard": "s0"},
+                                    {"min": {"a": 5, "b.c": 0}, "max": {"a": MaxKey(), "b.c": MaxKey()}, "shard": "s1"}])
+        router = ShardRouter(source)
+        self.assertEqual(router.shard_for({"a": 5, "b": {"c": -1}}), "s0")
+        self.assertEqual(router.shard_for({"a": 5, "b": {"c": 1}}), "s1")
+
+    def test_split_points(self):
+        router = ShardRouter(self._source)
+        docs = [{"borough": str(i)} for i in range(10, 90)]
+        self.assertEqual(router.split_points(docs, 4), [{"borough": "30"}, {"borough": "50"}, {"borough": "70"}])
+        self.assertEqual(router.split_points([{"borough": "x"}] * 10, 3), [{"borough": "x"}])
+        self.assertEqual(router.split_points([], 3), [])
+
+    def test_hashed(self):
+        source = StaticChunkSource({"borough": "hashed"}, [chunk(MinKey(), MaxKey(), "shard0")])
+        self.assertRaises(ShardRouterException, ShardRouter, source)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+
+from pymongoimport.startup import ENTRY_POINTS, measure
+
+
+class Test(unittest.TestCase):
+
+    def test_light_entry_points(self):
+        for name in ["pwc", "splitfile"]:
+            _, loaded = measure(ENTRY_POINTS[name], repeat=1)
+            self.assertEqual(loaded, [], name)
+
+    def test_deferred_imports(self):
+        _, loaded = measure(ENTRY_POINTS["pymongoimport"], repeat=1)
+        for module in ["requests", "dateutil", "toml"]:
+            self.assertNotIn(module, loaded)
+        _, loaded = measure("pymongoimport.linetodictparser", repeat=1)
+        self.assertNotIn("pymongo", loaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import io
+import os
+import subprocess
+import sys
+import unittest
+
+from pymongoimport.filereader import FileReader
+from pymongoimport.tokenizer import TokenizerType
+
+path_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def f(path):
+    return os.path.join(path_dir, path)
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._stdin = sys.stdin
+
+    def tearDown(self):
+        sys.stdin = self._stdin
+
+    def test_is_stdin(self):
+        self.assertTrue(FileReader.is_stdin("-"))
+        self.assertTrue(FileReader.is_stdin("/dev/stdin"))
+        self.assertFalse(FileReader.is_stdin("data.csv"))
+
+    def test_read_stdin(self):
+        sys.stdin = io.StringIO('a,b\n1,"x, y"\n3,4\n')
+        reader = FileReader("-", has_header=True, tokenizer=TokenizerType.ARROW)
+        self.assertEqual(list(reader.readline()), [["1", "x, y"], ["3", "4"]])
+        self.assertEqual(reader.header_line, ["a", "b"])
+
+    def test_pipe(self):
+        script = ("from pymongoimport.filereader import FileReader; "
+                  "print(sum(1 for _ in FileReader('-', delimiter='|').readline()))")
+        with open(f("data/10k.txt"), "rb") as data:
+            result = subprocess.run([sys.executable, "-c", script], stdin=data, stdout=subprocess.PIPE,
+                                    cwd=os.path.dirname(path_dir), check=True)
+        with open(f("data/10k.txt"), "rb") as data:
+            self.assertEqual(int(result.stdout), sum(1 for _ in data))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from pymongoimport.fieldfile import FieldFile, FieldFileException
+from pymongoimport.timeseries import batch_order
+
+TRIPS = '''
+[VendorID]
+type = "int"
+name = "vendor"
+timeseries = "meta"
+
+[tpep_pickup_datetime]
+type = "datetime"
+name = "pickup"
+timeseries = "time"
+granularity = "minutes"
+
+[trip_distance]
+type = "float"
+'''
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def field_file(self, text):
+        name = os.path.join(self._dir, "ts.tff")
+        with open(name, "w") as ff:
+            ff.write(text)
+        return FieldFile(name)
+
+    def test_options(self):
+        ff = self.field_file(TRIPS)
+        self.assertEqual(ff.timeseries_options(),
+                         {"timeField": "pickup", "metaField": "vendor", "granularity": "minutes"})
+        ff = self.field_file('[t]\ntype = "date"\ntimeseries = "time"\n')
+        self.assertEqual(ff.timeseries_options(), {"timeField": "t"})
+        ff = self.field_file('[t]\ntype = "date"\n')
+        self.assertIsNone(ff.timeseries_options())
+
+    def test_invalid(self):
+        self.assertRaises(FieldFileException, self.field_file, '[t]\ntype = "str"\ntimeseries = "time"\n')
+        self.assertRaises(FieldFileException, self.field_file, '[t]\ntype = "date"\ntimeseries = "clock"\n')
+        self.assertRaises(FieldFileException, self.field_file,
+                          '[t]\ntype = "date"\ntimeseries = "time"\ngranularity = "days"\n')
+        self.assertRaises(FieldFileException, self.field_file, '[m]\ntype = "int"\ntimeseries = "meta"\n')
+        self.assertRaises(FieldFileException, self.field_file,
+                          '[m]\ntype = "int"\ngranularity = "hours"\n[t]\ntype = "date"\ntimeseries = "time"\n')
+        self.assertRaises(FieldFileException, self.field_file,
+                          '[t]\ntype = "date"\ntimeseries = "time"\n[u]\ntype = "date"\ntimeseries = "time"\n')
+
+    def test_batch_order(self):
+        docs = [{"vendor": 2, "pickup": datetime(2020, 1, 1, 10)},
+                {"vendor": 1, "pickup": datetime(2020, 1, 1, 12)},
+                {"vendor": 2, "pickup": datetime(2020, 1, 1, 9)},
+                {"vendor": 1, "pickup": datetime(2020, 1, 1, 11)},
+                {"pickup": datetime(2020, 1, 1, 8)}]
+        docs.sort(key=batch_order({"timeField": "pickup", "metaField": "vendor"}))
+        self.assertEqual([(d.get("vendor"), d["pickup"].hour) for d in docs],
+                         [(None, 8), (1, 11), (1, 12), (2, 9), (2, 10)])
+        docs.sort(key=batch_order({"timeField": "pickup"}))
+        self.assertEqual([d["pickup"].hour for d in docs], [8, 9, 10, 11, 12])
+
+
+if __name__ == "__main__":
+    unittest.main()
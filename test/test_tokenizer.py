@@ -0,0 +1,76 @@
+import os
+import unittest
+
+from pymongoimport.filereader import FileReader
+from pymongoimport.tokenizer import (CSVTokenizer, SplitTokenizer, ArrowTokenizer,
+                                     TokenizerType, make_tokenizer, peek)
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+path_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def f(path):
+    return os.path.join(path_dir, path)
+
+
+class Test(unittest.TestCase):
+
+    def read(self, filename, tokenizer, delimiter=",", has_header=False, limit=0):
+        reader = FileReader(f(filename), has_header=has_header, delimiter=delimiter, tokenizer=tokenizer)
+        return [list(r) for r in reader.readline(limit=limit)], reader
+
+    def test_split_matches_csv(self):
+        csv_rows, _ = self.read("data/10k.txt", TokenizerType.CSV, delimiter="|")
+        split_rows, _ = self.read("data/10k.txt", TokenizerType.SPLIT, delimiter="|")
+        self.assertEqual(len(csv_rows), 10000)
+        self.assertEqual(csv_rows, split_rows)
+
+    def test_auto(self):
+        rows, reader = self.read("data/10k.txt", TokenizerType.AUTO, delimiter="|")
+        self.assertTrue(isinstance(reader.tokenizer, SplitTokenizer))
+        self.assertEqual(len(rows), 10000)
+
+        csv_rows, _ = self.read("data/uk_property_prices.csv", TokenizerType.CSV)
+        rows, reader = self.read("data/uk_property_prices.csv", TokenizerType.AUTO)
+        self.assertTrue(isinstance(reader.tokenizer, CSVTokenizer))
+        self.assertEqual(csv_rows, rows)
+
+    def test_split_check_quotes(self):
+        lines = ['a,b,c\n', '"x,y",2,3\r\n', '4,5,6\n']
+        rows = list(SplitTokenizer(",", check_quotes=True).rows(lines))
+        self.assertEqual(rows, [["a", "b", "c"], ["x,y", "2", "3"], ["4", "5", "6"]])
+
+    def test_make_tokenizer(self):
+        self.assertTrue(isinstance(make_tokenizer("csv"), CSVTokenizer))
+        self.assertTrue(isinstance(make_tokenizer(TokenizerType.SPLIT), SplitTokenizer))
+        self.assertTrue(isinstance(make_tokenizer(TokenizerType.AUTO, sample=['"a",b\n']), CSVTokenizer))
+        self.assertTrue(isinstance(make_tokenizer(TokenizerType.AUTO, sample=['a,b\n']), SplitTokenizer))
+
+    def test_peek(self):
+        sample, lines = peek(iter(range(10)), 3)
+        self.assertEqual(sample, [0, 1, 2])
+        self.assertEqual(list(lines), list(range(10)))
+
+    def test_header_and_limit(self):
+        rows, reader = self.read("data/inventory.csv", TokenizerType.SPLIT, has_header=True, limit=2)
+        self.assertEqual(reader.header_line, ["Inventory Item", "Amount", " Last Order"])
+        self.assertEqual(len(rows), 2)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow(self):
+        csv_rows, _ = self.read("data/uk_property_prices.csv", TokenizerType.CSV, has_header=True)
+        arrow_rows, reader = self.read("data/uk_property_prices.csv", TokenizerType.ARROW, has_header=True)
+        self.assertTrue(isinstance(reader.tokenizer, ArrowTokenizer))
+        self.assertEqual(csv_rows, arrow_rows)
+
+        csv_rows, _ = self.read("data/10k.txt", TokenizerType.CSV, delimiter="|", limit=10)
+        arrow_rows, _ = self.read("data/10k.txt", TokenizerType.ARROW, delimiter="|", limit=10)
+        self.assertEqual(csv_rows, arrow_rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -26,6 +26,22 @@ class Test(unittest.TestCase):
         self.assertEqual(datetime.datetime(2018, 5, 25, 11, 30),
                          c.convert_time("datetime", "11:30am 25-May-2018", "%I:%M%p %d-%b-%Y"))
 
+    def test_bool(self):
+        c = Converter()
+        self.assertEqual(True, c.convert("bool", "True"))
+        self.assertEqual(True, c.convert("bool", "y"))
+        self.assertEqual(False, c.convert("bool", "0"))
+        self.assertEqual(False, c.convert("bool", False))
+        self.assertEqual("maybe", c.convert("bool", "maybe"))
+
+    def test_native_values(self):
+        c = Converter()
+        d = datetime.datetime(2018, 5, 25, 11, 30)
+        self.assertEqual(d, c.convert("datetime", d))
+        self.assertEqual(d, c.convert_time("datetime", d, "%Y"))
+        self.assertEqual(10, c.convert("int", 10))
+        self.assertEqual(1.5, c.convert("float", 1.5))
+
 
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.test_autosplit']
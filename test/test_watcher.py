@@ -0,0 +1,109 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from pymongoimport.fieldfile import FieldFileException
+from pymongoimport.pymongoimport_main import watch_directory
+from pymongoimport.watcher import DirectoryWatcher
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def write(self, name, text="a,b\n"):
+        path = os.path.join(self._dir, name)
+        with open(path, "a") as f:
+            f.write(text)
+        return path
+
+    def test_missing_directory(self):
+        with self.assertRaises(OSError):
+            DirectoryWatcher(os.path.join(self._dir, "missing"))
+
+    def test_poll(self):
+        watcher = DirectoryWatcher(self._dir, settle=0, use_inotify=False)
+        a = self.write("a.csv")
+        self.write("a.tff")
+        self.write(".b.csv.part")
+        self.assertEqual(watcher.poll(), [])  # seen once, not yet known to be complete
+        self.assertEqual(watcher.poll(), [a])
+        self.assertEqual(watcher.poll(), [])  # only returned once
+
+        os.utime(a, (0, 1))  # rewritten
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(watcher.poll(), [a])
+
+    def test_settle(self):
+        watcher = DirectoryWatcher(self._dir, settle=3600, use_inotify=False)
+        self.write("a.csv")
+        watcher.poll()
+        self.assertEqual(watcher.poll(), [])
+
+    def test_files(self):
+        watcher = DirectoryWatcher(self._dir, poll_interval=0.01, settle=0)
+        a = self.write("a.csv")
+        os.utime(a, (0, 1))  # complete before the watcher started
+        found = []
+
+        def consume():
+            for name in watcher.files():
+                found.append(name)
+                if len(found) == 2:
+                    watcher.stop()
+
+        t = threading.Thread(target=consume)
+        t.start()
+        b = self.write("b.csv")
+        t.join(10)
+        watcher.stop()
+        self.assertFalse(t.is_alive())
+        self.assertEqual(found, [a, b])
+
+    def test_recently_modified(self):
+        class INotify(object):  # no events: the file was closed before the watch began
+            def read(self, timeout):
+                return []
+
+        a = self.write("a.csv")  # modified just before the watcher started
+        watcher = DirectoryWatcher(self._dir, poll_interval=0.01, settle=0.2, use_inotify=False)
+        watcher._inotify = INotify()
+        found = []
+
+        def consume():
+            for name in watcher.files():
+                found.append(name)
+                watcher.stop()
+
+        t = threading.Thread(target=consume)
+        t.start()
+        t.join(10)
+        watcher.stop()
+        self.assertFalse(t.is_alive())
+        self.assertEqual(found, [a])
+
+    def test_watch_directory_failures(self):
+        class Importer(object):
+            def run(self, filename):
+                if filename.endswith("stop.csv"):
+                    raise KeyboardInterrupt
+                raise FieldFileException("no field file")
+
+        bad = self.write("bad.csv")
+        os.utime(bad, (0, 1))
+        stop = self.write("stop.csv")
+        os.utime(stop, (0, 2))
+        failed = os.path.join(self._dir, "failed")
+        watch_directory(Importer(), self._dir, logging.getLogger(__name__), poll_interval=0.1, failed_dir=failed)
+        self.assertEqual(os.listdir(failed), ["bad.csv"])  # and the watcher carried on to stop.csv
+
+
+if __name__ == "__main__":
+    unittest.main()
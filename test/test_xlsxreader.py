@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from pymongoimport.linetodictparser import LineToDictParser
+from pymongoimport.doctimestamp import DocTimeStamp
+from pymongoimport.pymongomultiimport_main import work_units
+
+try:
+    import openpyxl
+    from pymongoimport.xlsxreader import XLSXReader, XLSXReaderException
+except ImportError:
+    openpyxl = None
+
+
+@unittest.skipIf(openpyxl is None, "openpyxl is not installed")
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._xlsx = os.path.join(self._dir, "inventory.xlsx")
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Stock"
+        ws.append(["Inventory report"])
+        ws.append([])
+        ws.append(["item", "amount", "price", "last order"])
+        for i in range(20):
+            ws.append([["Screws", "Bolts", "Nails", "Nuts"][i % 4], i, 0.5 * i, datetime(2016, 1, 1 + i)])
+        ws = wb.create_sheet("Archive")
+        ws.append(["item", "amount", "price", "last order"])
+        ws.append(["Washers", 100, 1.25, datetime(2015, 6, 1)])
+        wb.save(self._xlsx)
+
+    def tearDown(self):
+        for name in os.listdir(self._dir):
+            os.unlink(os.path.join(self._dir, name))
+        os.rmdir(self._dir)
+
+    def test_is_xlsx_file(self):
+        self.assertTrue(XLSXReader.is_xlsx_file("x.xlsx"))
+        self.assertTrue(XLSXReader.is_xlsx_file("X.XLSM"))
+        self.assertFalse(XLSXReader.is_xlsx_file("x.csv"))
+
+    def test_find_header(self):
+        self.assertEqual(XLSXReader.find_header([("title",), (), ("a", "b"), ("x", 1)]), 2)
+        self.assertEqual(XLSXReader.find_header([(1, 2)]), -1)
+        self.assertEqual(XLSXReader.find_header([]), -1)
+
+    def test_widen_type(self):
+        self.assertEqual(XLSXReader.widen_type(None, "int"), "int")
+        self.assertEqual(XLSXReader.widen_type("int", "float"), "float")
+        self.assertEqual(XLSXReader.widen_type("datetime", "int"), "str")
+
+    def test_read(self):
+        reader = XLSXReader(self._xlsx, sheets=["Stock"])
+        rows = list(reader.readline())
+        self.assertEqual(reader.header_line, ["item", "amount", "price", "last order"])
+        self.assertEqual(len(rows), 20)
+        self.assertEqual(rows[3], ("Nuts", 3, 1.5, datetime(2016, 1, 4)))
+        self.assertEqual(len(list(XLSXReader(self._xlsx).readline(limit=7))), 7)
+
+    def test_sheets(self):
+        self.assertEqual(XLSXReader.sheet_names(self._xlsx), ["Stock", "Archive"])
+        self.assertEqual(len(list(XLSXReader(self._xlsx).readline())), 21)
+        rows = list(XLSXReader(self._xlsx, sheets=["Archive"]).readline())
+        self.assertEqual(rows, [("Washers", 100, 1.25, datetime(2015, 6, 1))])
+        with self.assertRaises(XLSXReaderException):
+            XLSXReader(self._xlsx, sheets=["Missing"])
+
+    def test_header_row(self):
+        reader = XLSXReader(self._xlsx, sheets=["Stock"], header_row=3)
+        self.assertEqual(len(list(reader.readline())), 20)
+        reader = XLSXReader(self._xlsx, sheets=["Archive"], header_row=0)
+        self.assertEqual(len(list(reader.readline())), 2)
+
+    def test_generate_field_file(self):
+        ff = XLSXReader.generate_field_file(self._xlsx, sheets=["Stock"])
+        self.assertEqual(ff.field_filename, os.path.join(self._dir, "inventory.tff"))
+        self.assertEqual(ff.fields(), ["item", "amount", "price", "last order"])
+        self.assertEqual([ff.type_value(k) for k in ff.fields()], ["str", "int", "float", "datetime"])
+
+        parser = LineToDictParser(ff, locator=False, timestamp=DocTimeStamp.NO_TIMESTAMP)
+        rows = XLSXReader(self._xlsx, sheets=["Stock"]).readline()
+        doc = parser.parse_list(next(rows), 1)
+        self.assertEqual(doc, {"item": "Screws", "amount": 0, "price": 0.0, "last order": datetime(2016, 1, 1)})
+
+    def test_work_units(self):
+        units = work_units([self._xlsx], 2)
+        self.assertEqual(next(units), (self._xlsx, {"sheets": ["Stock"]}))
+        # the field file is written once, before any sheet is handed out
+        self.assertTrue(os.path.isfile(os.path.join(self._dir, "inventory.tff")))
+        self.assertEqual(list(units), [(self._xlsx, {"sheets": ["Archive"]})])
+
+
+if __name__ == "__main__":
+    unittest.main()